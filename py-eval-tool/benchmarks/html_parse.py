@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+html_parse.py
+HTML 解析のベンチマーク（アーカイブ済みのページ）
+
+生HTMLアーカイブ（scrapers/archive.py）に保存したエピソードページ・目次ページを、
+パーサ（html.parser / lxml）と絞り込み解析の有無の組み合わせごとに解析・抽出し、ページあたりの時間を表示します。
+変更前と同じ「html.parser でページ全体を解析」を基準とし、抽出結果（タイトル・本文・除去カテゴリ、目次の項目）が
+基準と一致しないページの数もあわせて表示します。
+
+使用方法（py-eval-tool ディレクトリで実行）:
+    python -m benchmarks.html_parse
+    python -m benchmarks.html_parse syosetu/n2596la --repeat 5
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from scrapers import parsing
+from scrapers.archive import RawArchive
+from scrapers.kakuyomu.list_episodes import extract_embedded_index
+from scrapers.reextract import SCRAPERS
+from scrapers.syosetu.list_episodes import TOC_PARTS, _extract_episode_list, _extract_last_page
+
+SYOSETU_EPISODE = re.compile(r'/[^/]+/\d+/$')
+
+
+def load_pages(archive: RawArchive, refs: List[str]) -> List[Tuple[str, str, str, bytes]]:
+    """アーカイブから (site, work_id, url, html) を読み込む（refs が空ならアーカイブ済みのすべての作品）"""
+    if refs:
+        manifests = [archive.load_manifest(*ref.split("/", 1)) for ref in refs]
+        missing = [ref for ref, manifest in zip(refs, manifests) if manifest is None]
+        if missing:
+            raise SystemExit(f"アーカイブがありません: {', '.join(missing)}")
+    else:
+        manifests = list(archive.iter_manifests())
+    return [
+        (manifest["site"], manifest["work_id"], url, archive.read_blob(digest))
+        for manifest in manifests
+        for url, digest in manifest["pages"].items()
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def site_scraper(site: str):
+    return SCRAPERS[site](use_checkpoint=False)
+
+
+def page_extractor(site: str, work_id: str, url: str) -> Tuple[str, Callable[[bytes], object]]:
+    """ページの種類と、解析から抽出までを行う関数（抽出結果は比較のため scraped_at を除く）"""
+    scraper = site_scraper(site)
+
+    def episode(html: bytes):
+        data = scraper.parse_episode(html, url)
+        return data and (data["episode_title"], data["content"], data["removed_categories"])
+
+    if site == "syosetu":
+        if SYOSETU_EPISODE.search(url):
+            return "episode", episode
+
+        def toc(html: bytes):
+            soup = parsing.parse_html(html, TOC_PARTS)
+            return _extract_episode_list(soup), _extract_last_page(soup, work_id)
+        return "index", toc
+
+    if "/episodes/" in url:
+        return "episode", episode
+    return "index", lambda html: extract_embedded_index(parsing.parse_html(html), work_id)
+
+
+def run_config(pages, extractors, parser: str, partial: bool, repeat: int) -> Tuple[Dict[str, float], List[object]]:
+    """パーサと絞り込みの設定で全ページを repeat 回抽出し、種類ごとの ms/ページと抽出結果を返す"""
+    parsing.HTML_PARSER, parsing.PARTIAL_PARSE = parser, partial
+    elapsed: Dict[str, float] = {}
+    results: List[object] = []
+    # スクレイパーの警告表示は集計に含めない
+    with contextlib.redirect_stdout(io.StringIO()):
+        for (_, _, _, html), (kind, extract) in zip(pages, extractors):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                result = extract(html)
+            elapsed[kind] = elapsed.get(kind, 0.0) + time.perf_counter() - started
+            results.append(result)
+    counts = {kind: sum(1 for k, _ in extractors if k == kind) for kind in elapsed}
+    return {kind: elapsed[kind] * 1000 / (counts[kind] * repeat) for kind in elapsed}, results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="HTML 解析のベンチマーク（アーカイブ済みのページ）")
+    parser.add_argument("works", nargs="*", help="site/work_id（省略時はアーカイブ済みのすべての作品）")
+    parser.add_argument("--repeat", type=int, default=3, help="ページごとの解析回数")
+    args = parser.parse_args(argv)
+
+    archive = RawArchive.from_env() or RawArchive()
+    pages = load_pages(archive, args.works)
+    if not pages:
+        raise SystemExit(f"アーカイブ済みのページがありません: {archive.archive_dir}")
+    extractors = [page_extractor(site, work_id, url) for site, work_id, url, _ in pages]
+
+    configs = [("html.parser", False), ("html.parser", True)]
+    if parsing.LXML_AVAILABLE:
+        configs += [("lxml", False), ("lxml", True)]
+    else:
+        print("lxml がインストールされていないため、html.parser のみ計測します（pip install lxml）")
+
+    kinds = sorted({kind for kind, _ in extractors})
+    print(f"{len(pages)} ページ（" + "、".join(f"{kind} {sum(1 for k, _ in extractors if k == kind)}" for kind in kinds) + "）")
+    print(f"{'parser':<12} {'partial':>7} " + " ".join(f"{kind + ' ms':>12}" for kind in kinds) + f" {'speedup':>8} {'mismatch':>9}")
+    baseline_ms, baseline = None, None
+    for name, partial in configs:
+        ms, results = run_config(pages, extractors, name, partial, args.repeat)
+        total = sum(ms[kind] * sum(1 for k, _ in extractors if k == kind) for kind in kinds)
+        if baseline is None:
+            baseline_ms, baseline = total, results
+        mismatch = sum(1 for a, b in zip(baseline, results) if a != b)
+        print(f"{name:<12} {'yes' if partial else 'no':>7} " + " ".join(f"{ms[kind]:>12.2f}" for kind in kinds)
+              + f" {baseline_ms / total:>7.1f}x {mismatch:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
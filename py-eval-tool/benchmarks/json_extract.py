@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+json_extract.py
+モデル出力からの JSON 抽出ベンチマーク
+
+旧実装（正規表現ベース）と現行の extract_json_from_text を、
+崩れたモデル出力のコーパスに対して比較し、EvalOut 検証成功率と処理時間を表示します。
+
+使用方法（py-eval-tool ディレクトリで実行）:
+    python -m benchmarks.json_extract
+    python -m benchmarks.json_extract --corpus path/to/outputs.jsonl --repeat 500
+
+コーパス形式（1行1件の JSONL）:
+    {"name": "...", "defect": "...", "text": "モデルの生出力"}
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from pydantic import ValidationError
+
+from eval import EvalOut, extract_json_from_text
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "corpus" / "eval_outputs.jsonl"
+
+
+def legacy_extract_json_from_text(text: str) -> Dict[str, Any]:
+    """変更前の抽出ロジック（比較用）"""
+    code_block = re.search(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", text, re.IGNORECASE)
+    if code_block:
+        return json.loads(code_block.group(1).strip())
+    brace_match = re.search(r"\{[\s\S]*\}", text)
+    if brace_match:
+        return json.loads(brace_match.group(0))
+    return json.loads(text)
+
+
+def load_corpus(path: Path) -> List[Dict[str, str]]:
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def run_extractor(extractor: Callable[[str], Dict[str, Any]], corpus: List[Dict[str, str]], repeat: int) -> Dict[str, Any]:
+    results: Dict[str, bool] = {}
+    for case in corpus:
+        try:
+            EvalOut.model_validate(extractor(case["text"]))
+            results[case["name"]] = True
+        except (ValueError, ValidationError):
+            results[case["name"]] = False
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for case in corpus:
+            try:
+                extractor(case["text"])
+            except ValueError:
+                pass
+    elapsed = time.perf_counter() - start
+
+    return {
+        "results": results,
+        "ok": sum(results.values()),
+        "us_per_call": elapsed / (repeat * len(corpus)) * 1e6,
+    }
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="JSON 抽出ベンチマーク")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="モデル出力コーパス (JSONL)")
+    parser.add_argument("--repeat", type=int, default=200, help="計測の繰り返し回数")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    legacy = run_extractor(legacy_extract_json_from_text, corpus, args.repeat)
+    current = run_extractor(extract_json_from_text, corpus, args.repeat)
+
+    print(f"{'case':<32} {'defect':<44} legacy current")
+    for case in corpus:
+        name = case["name"]
+        mark = lambda ok: "OK" if ok else "NG"
+        print(f"{name:<32} {case['defect']:<44} {mark(legacy['results'][name]):<6} {mark(current['results'][name])}")
+    print()
+    print(f"legacy : {legacy['ok']}/{len(corpus)} valid, {legacy['us_per_call']:.1f} us/call")
+    print(f"current: {current['ok']}/{len(corpus)} valid, {current['us_per_call']:.1f} us/call")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+keepalive.py
+取得エンジンの接続管理ベンチマーク（リプレイしたクロール）
+
+ローカルの HTTP サーバでページを配信し、同じクロールを
+旧実装（20リクエストごとにクライアントを作り直し、1.6〜5 秒待機）と現行の FetchEngine
+（クロール全体で keep-alive 接続を使い回す）で実行して、所要時間と新規接続数を比較します。
+サーバは新規接続ごとに --connect_delay 秒待ってから応答し、TLS ハンドシェイクの往復を模擬します。
+
+使用方法（py-eval-tool ディレクトリで実行）:
+    python -m benchmarks.keepalive
+    python -m benchmarks.keepalive --archive syosetu/n2596la   # アーカイブ済みの作品をリプレイ
+    python -m benchmarks.keepalive --pages 200 --min_interval 0.5
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from scrapers.archive import RawArchive
+from scrapers.engine import USER_AGENTS, FetchEngine
+from scrapers.politeness import HostPoliteness
+
+
+class LegacyRefreshEngine(FetchEngine):
+    """変更前の接続管理（比較用）: 20リクエストごとにクライアントを作り直し、UA を変えて待機する"""
+
+    REFRESH_EVERY = 20
+
+    def __init__(self, *args, refresh_sleep=(1.6, 5.0), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.refresh_sleep = refresh_sleep
+        self.request_count = 0
+        self._retired: List[httpx.AsyncClient] = []
+        self._client_lock: Optional[asyncio.Lock] = None
+
+    async def _acquire_client(self) -> httpx.AsyncClient:
+        if self._client_lock is None:
+            self._client_lock = asyncio.Lock()
+        async with self._client_lock:
+            self.request_count += 1
+            if self._client is not None and self.request_count % self.REFRESH_EVERY == 0:
+                self._retired.append(self._client)
+                self._client = None
+                self.headers['User-Agent'] = random.choice(USER_AGENTS)
+                await asyncio.sleep(random.uniform(*self.refresh_sleep))
+            if self._client is None:
+                self._client = self._new_client()
+            return self._client
+
+    async def aclose(self):
+        for client in self._retired:
+            await client.aclose()
+        self._retired = []
+        await super().aclose()
+
+
+class ReplayServer:
+    """パス → 本文 の辞書を HTTP/1.1（keep-alive）で配信するローカルサーバ"""
+
+    def __init__(self, pages: Dict[str, bytes], connect_delay: float, response_delay: float):
+        self.pages = pages
+        self.connect_delay = connect_delay
+        self.response_delay = response_delay
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        # 新規接続のハンドシェイク相当の待ち
+        await asyncio.sleep(self.connect_delay)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                target = request_line.decode("latin-1").split(" ")[1]
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                await asyncio.sleep(self.response_delay)
+                body = self.pages.get(target)
+                status = b"200 OK" if body is not None else b"404 Not Found"
+                body = body or b""
+                writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Type: text/html; charset=utf-8\r\nContent-Length: "
+                             + str(len(body)).encode() + b"\r\n\r\n" + body)
+                await writer.drain()
+                self.requests += 1
+        except (ConnectionError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+
+def synthetic_pages(count: int, size: int) -> Dict[str, bytes]:
+    body = ("<p>" + "本文。「会話」" * 8 + "</p>") * max(1, size // 120)
+    return {f"/work/{i}/": f"<html><body>{body}</body></html>".encode("utf-8") for i in range(1, count + 1)}
+
+
+def archived_pages(ref: str) -> Dict[str, bytes]:
+    """アーカイブ（site/work_id）のページをパスごとに読み込む"""
+    site, work_id = ref.split("/", 1)
+    archive = RawArchive()
+    manifest = archive.load_manifest(site, work_id)
+    if manifest is None:
+        raise SystemExit(f"アーカイブがありません: {ref}")
+    pages = {}
+    for url, digest in manifest["pages"].items():
+        parsed = urlparse(url)
+        pages[parsed.path + (f"?{parsed.query}" if parsed.query else "")] = archive.read_blob(digest)
+    return pages
+
+
+async def crawl(engine_factory, pages: Dict[str, bytes], connect_delay: float, response_delay: float) -> Dict:
+    server = ReplayServer(pages, connect_delay, response_delay)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    urls = [f"http://127.0.0.1:{port}{path}" for path in pages]
+
+    engine = engine_factory()
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    try:
+        async for _ in engine.map_in_order(engine.get, urls):
+            pass
+    finally:
+        await engine.aclose()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    listener.close()
+    await listener.wait_closed()
+    return {
+        "pages": len(urls),
+        "elapsed": elapsed,
+        "pages_per_sec": len(urls) / elapsed if elapsed else 0.0,
+        "connections": server.connections,
+        "cpu_ms_per_page": cpu * 1000 / len(urls) if urls else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="取得エンジンの接続管理ベンチマーク")
+    parser.add_argument("--archive", help="リプレイするアーカイブ済みの作品（site/work_id）。省略時は合成ページ")
+    parser.add_argument("--pages", type=int, default=100, help="合成ページ数")
+    parser.add_argument("--page_size", type=int, default=20000, help="合成ページの本文サイズ（バイト目安）")
+    parser.add_argument("--connect_delay", type=float, default=0.15, help="新規接続ごとの待ち（秒、TLS ハンドシェイク相当）")
+    parser.add_argument("--response_delay", type=float, default=0.03, help="リクエストごとのサーバ処理時間（秒）")
+    parser.add_argument("--per_host", type=int, default=2, help="1ホストあたりの同時リクエスト数")
+    parser.add_argument("--min_interval", type=float, default=0.0, help="同一ホストへのリクエスト開始間隔の最小値（秒）")
+    parser.add_argument("--refresh_sleep", default="1.6,5.0", help="旧実装のリフレッシュ時の待機（秒、最小,最大）")
+    args = parser.parse_args()
+
+    pages = archived_pages(args.archive) if args.archive else synthetic_pages(args.pages, args.page_size)
+    refresh_sleep = tuple(float(v) for v in args.refresh_sleep.split(","))
+
+    def politeness():
+        return HostPoliteness(args.per_host, args.min_interval)
+
+    engines = {
+        "legacy (refresh every 20)": lambda: LegacyRefreshEngine(politeness(), http2=False, refresh_sleep=refresh_sleep),
+        "keep-alive": lambda: FetchEngine(politeness(), http2=False),
+    }
+    print(f"{'mode':<28} {'pages':>6} {'elapsed[s]':>11} {'pages/s':>9} {'connections':>12} {'CPU ms/page':>12}")
+    for name, factory in engines.items():
+        result = asyncio.run(crawl(factory, pages, args.connect_delay, args.response_delay))
+        print(f"{name:<28} {result['pages']:>6} {result['elapsed']:>11.2f} {result['pages_per_sec']:>9.1f} "
+              f"{result['connections']:>12} {result['cpu_ms_per_page']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
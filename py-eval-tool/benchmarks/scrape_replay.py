@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+scrape_replay.py
+スクレイパーのエンドツーエンドベンチマーク（記録した応答のリプレイ）
+
+SyosetuScraper / KakuyomuScraper を、記録した応答を返す ReplayTransport（scrapers/replay.py）の上で
+目次の取得から統合JSONの構築まで実行し、作品ごとのページ数・所要時間・ページ/秒・CPU 時間/ページを表示します。
+サイトにアクセスせずに、取得・解析・クリーニングの性能と回帰を確認できます。
+
+使用方法（py-eval-tool ディレクトリで実行）:
+    python -m benchmarks.scrape_replay record syosetu n2596la --episodes 30   # 実際に取得して記録
+    python -m benchmarks.scrape_replay import syosetu/n2596la kakuyomu/1177354054881234567  # 生HTMLアーカイブから取り込み
+    python -m benchmarks.scrape_replay run
+    python -m benchmarks.scrape_replay run --latency 0.2 --jitter 0.1 --per_host 2 --min_interval 0.5
+    python -m benchmarks.scrape_replay run --parse_workers 0   # 解析プロセスを使わない場合と比較
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from scrapers.archive import RawArchive
+from scrapers.engine import FetchEngine
+from scrapers.parse_pool import ParsePool, parse_workers_from_env
+from scrapers.politeness import HostPoliteness
+from scrapers.reextract import SCRAPERS
+from scrapers.replay import FixtureStore, RecordingTransport, ReplayTransport
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent / "fixtures" / "replay"
+
+
+def build_scraper(site: str, politeness: HostPoliteness, transport_wrapper, parse_workers: Optional[int] = None):
+    """キャッシュ・アーカイブ・チェックポイントを使わないスクレイパー（毎回すべてのページを取得する）"""
+    engine = FetchEngine(politeness, transport_wrapper=transport_wrapper)
+    return SCRAPERS[site](engine=engine, use_checkpoint=False, parse_workers=parse_workers)
+
+
+def record(store: FixtureStore, site: str, work_id: str, episodes: Optional[int]) -> None:
+    scraper = build_scraper(
+        site,
+        HostPoliteness.from_env(min_interval=SCRAPERS[site].default_min_interval),
+        lambda inner: RecordingTransport(store, inner),
+    )
+    data = scraper.extract_novel_data(work_id, episodes)
+    if not data:
+        raise SystemExit(f"取得に失敗しました: {site}/{work_id}")
+    store.add_work(site, work_id, episodes)
+    store.save()
+    print(f"記録しました: {site}/{work_id}（{data['scraped_episodes']} 話、累計 {len(store.responses)} 応答）")
+
+
+async def replay_work(store: FixtureStore, work: Dict, args) -> Dict:
+    transport = ReplayTransport(store, args.latency, args.jitter)
+    scraper = build_scraper(work["site"], HostPoliteness(args.per_host, args.min_interval), lambda inner: transport, args.parse_workers)
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    # スクレイパーの進捗表示は集計に含めない
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = await scraper.aextract_novel_data(work["work_id"], work["limit"])
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    pages = transport.requests
+    return {
+        "work": f"{work['site']}/{work['work_id']}",
+        "episodes": data["scraped_episodes"] if data else 0,
+        "pages": pages,
+        "elapsed": elapsed,
+        "pages_per_sec": pages / elapsed if elapsed else 0.0,
+        "cpu_ms_per_page": cpu * 1000 / pages if pages else 0.0,
+        "missing": len(transport.missing),
+    }
+
+
+def run(store: FixtureStore, args) -> None:
+    if not store.works:
+        raise SystemExit(f"フィクスチャがありません: {store.fixture_dir}（record / import で作成してください）")
+    if args.parse_workers is None:
+        args.parse_workers = parse_workers_from_env()
+    pool = ParsePool.shared(args.parse_workers)
+    if pool is not None:
+        # ワーカーの起動・ウォームアップは計測に含めない
+        pool.wait_until_warm()
+        print(f"解析プロセス: {args.parse_workers}（CPU ms/page は取得ループのプロセスのみ）")
+    print(f"{'work':<36} {'episodes':>8} {'pages':>6} {'elapsed[s]':>11} {'pages/s':>9} {'CPU ms/page':>12}")
+    for work in store.works:
+        results = [asyncio.run(replay_work(store, work, args)) for _ in range(args.repeat)]
+        # 複数回実行した場合は所要時間が中央値の回を表示する
+        result = sorted(results, key=lambda r: r["elapsed"])[len(results) // 2]
+        print(f"{result['work']:<36} {result['episodes']:>8} {result['pages']:>6} {result['elapsed']:>11.2f} "
+              f"{result['pages_per_sec']:>9.1f} {result['cpu_ms_per_page']:>12.2f}")
+        if result["missing"]:
+            print(f"  警告: 記録に無い URL が {result['missing']} 件ありました（記録し直してください）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スクレイパーのエンドツーエンドベンチマーク（記録した応答のリプレイ）")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES, help="フィクスチャの保存先")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = sub.add_parser("record", help="実際に取得して応答を記録する")
+    record_parser.add_argument("site", choices=list(SCRAPERS))
+    record_parser.add_argument("work_id")
+    record_parser.add_argument("--episodes", type=int, default=None, help="話数制限")
+
+    import_parser = sub.add_parser("import", help="生HTMLアーカイブの作品を取り込む")
+    import_parser.add_argument("works", nargs="+", help="site/work_id")
+
+    run_parser = sub.add_parser("run", help="記録した応答をリプレイして計測する")
+    run_parser.add_argument("--latency", type=float, default=0.0, help="応答ごとの待ち（秒）")
+    run_parser.add_argument("--jitter", type=float, default=0.0, help="応答ごとに加えるゆらぎの最大値（秒）")
+    run_parser.add_argument("--per_host", type=int, default=4, help="1ホストあたりの同時リクエスト数")
+    run_parser.add_argument("--min_interval", type=float, default=0.0, help="同一ホストへのリクエスト開始間隔の最小値（秒）")
+    run_parser.add_argument("--repeat", type=int, default=3, help="作品ごとの実行回数（中央値を表示）")
+    run_parser.add_argument("--parse_workers", type=int, default=None, help="解析プロセス数（0 でワーカースレッド。既定: SCRAPER_PARSE_WORKERS）")
+    args = parser.parse_args()
+
+    store = FixtureStore(args.fixtures)
+    if args.command == "record":
+        record(store, args.site, args.work_id, args.episodes)
+    elif args.command == "import":
+        archive = RawArchive.from_env() or RawArchive()
+        for ref in args.works:
+            site, work_id = ref.split("/", 1)
+            if not store.import_archive(archive, site, work_id):
+                raise SystemExit(f"アーカイブがありません: {ref}")
+        store.save()
+        print(f"取り込みました: {len(args.works)} 作品（累計 {len(store.responses)} 応答）")
+    else:
+        run(store, args)
+
+
+if __name__ == "__main__":
+    main()
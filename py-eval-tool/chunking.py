@@ -0,0 +1,120 @@
+"""
+chunking.py
+評価用チャンクプランナー
+
+エピソードを順に受け取り、トークン予算を超える直前でチャンクを閉じます。
+一括（preprocess_novel）とストリーミング（スクレイピングと並行した評価）の両方で使用します。
+プロバイダにコンテキスト長超過で拒否されたモデルは、プロセス内で予算を引き下げます。
+"""
+
+from typing import Optional
+
+import tiktoken
+
+DEFAULT_CHUNK_TOKENS = 40000
+MIN_CHUNK_TOKENS = 2000
+# 拒否されたチャンクのトークン数に掛ける係数（新しい予算）
+REJECTED_BUDGET_RATIO = 0.75
+
+# モデルごとのチャンク予算（コンテキスト長超過で引き下げたもの）
+_MODEL_BUDGETS: dict[str, int] = {}
+
+_TOKENIZER = None
+
+
+def count_tokens(text: str) -> int:
+    """cl100k_base でのトークン数（モデル間の概算用）"""
+    global _TOKENIZER
+    if _TOKENIZER is None:
+        _TOKENIZER = tiktoken.get_encoding("cl100k_base")
+    return len(_TOKENIZER.encode(text))
+
+
+def budget_for(agent: Optional[str]) -> int:
+    """モデルのチャンク予算（未調整なら既定値）"""
+    return _MODEL_BUDGETS.get(agent, DEFAULT_CHUNK_TOKENS)
+
+
+def tighten_budget(agent: str, rejected_tokens: int) -> int:
+    """
+    コンテキスト長超過で拒否されたチャンクのトークン数から、そのモデルの予算を引き下げる。
+    以降このプロセスでは、引き下げた予算でチャンクを組む。
+    """
+    budget = max(MIN_CHUNK_TOKENS, min(budget_for(agent), int(rejected_tokens * REJECTED_BUDGET_RATIO)))
+    if budget < budget_for(agent):
+        print(f"[CHUNK] {agent} のチャンク予算を {budget_for(agent)} → {budget} トークンに引き下げます")
+        _MODEL_BUDGETS[agent] = budget
+    return budget
+
+
+def split_text(text: str) -> tuple[str, str]:
+    """本文を中央に近い改行（なければ中央）で2つに分ける"""
+    middle = len(text) // 2
+    before, after = text.rfind("\n", 0, middle), text.find("\n", middle)
+    candidates = [i for i in (before, after) if 0 < i < len(text) - 1]
+    cut = min(candidates, key=lambda i: abs(i - middle)) + 1 if candidates else middle
+    return text[:cut], text[cut:]
+
+
+def split_chunk(episodes: list[dict]) -> list[tuple[list[dict], int]]:
+    """
+    チャンクをトークン数がほぼ半分になるように2つに分ける。
+    エピソードが1話だけの場合は、本文を前半・後半に分ける。
+    """
+    if len(episodes) == 1:
+        episode = episodes[0]
+        halves = split_text(episode["text"])
+        return [
+            ([{**episode, "title": f"{episode.get('title', '')}（{label}）", "text": text}], count_tokens(text))
+            for label, text in zip(("前半", "後半"), halves)
+        ]
+
+    counts = [count_tokens(episode["text"]) for episode in episodes]
+    half, running, cut = sum(counts) / 2, 0, 1
+    for i, tokens in enumerate(counts[:-1], start=1):
+        running += tokens
+        cut = i
+        if running >= half:
+            break
+    return [(episodes[:cut], sum(counts[:cut])), (episodes[cut:], sum(counts[cut:]))]
+
+
+class ChunkPlanner:
+    """
+    エピソードをトークン予算内のチャンクにまとめる。
+    agent を指定した場合は、そのモデルの現在の予算（引き下げ後の値）を都度参照する。
+    """
+
+    def __init__(self, budget_tokens: Optional[int] = None, agent: Optional[str] = None):
+        self._budget_tokens = budget_tokens
+        self.agent = agent
+        self._episodes: list[dict] = []
+        self._tokens = 0
+
+    @property
+    def budget_tokens(self) -> int:
+        if self._budget_tokens is not None:
+            return self._budget_tokens
+        return budget_for(self.agent)
+
+    def add(self, episode: dict) -> Optional[tuple[list[dict], int]]:
+        """
+        エピソードを追加する。追加すると予算を超える場合は、それまでのチャンクを閉じて返す。
+        返却: (エピソード一覧, 本文トークン数) または None
+        """
+        token_count = count_tokens(episode["text"])
+        closed = None
+        if self._episodes and self._tokens + token_count > self.budget_tokens:
+            closed = (self._episodes, self._tokens)
+            self._episodes, self._tokens = [], 0
+        self._episodes.append(episode)
+        self._tokens += token_count
+        return closed
+
+    def flush(self) -> Optional[tuple[list[dict], int]]:
+        """残っているエピソードを最後のチャンクとして返す"""
+        if not self._episodes:
+            return None
+        closed = (self._episodes, self._tokens)
+        self._episodes, self._tokens = [], 0
+        return closed
@@ -11,8 +11,10 @@ import httpx
 from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
 import prompts
-from llm import ANTHROPIC, QWEN, LLMAgent, ALL_MODELS
-import tiktoken
+from llm import ANTHROPIC, QWEN, LOCAL, LLMAgent, ALL_MODELS, ContextLengthError, estimate_cost
+from chunking import MIN_CHUNK_TOKENS, ChunkPlanner, budget_for, count_tokens, split_chunk, tighten_budget
+from summaries import EpisodeSummarizer
+from scrapers.checkpoint import write_json
 from scrapers.syosetu.scraper import SyosetuScraper
 from scrapers.kakuyomu.scraper import KakuyomuScraper
 
@@ -88,34 +90,223 @@ class EvalOut(BaseModel):
     comments: Comments
     final_summary: str
 
+class SubEvalOut(BaseModel):
+    """分割評価（Map）1チャンク分のレビュー"""
+    title: str
+    episode_range: str
+    overall_score: float = Field(ge=0, le=100)
+    scores: Scores
+    comments: Comments
+
+class FinalSummaryOut(BaseModel):
+    """統合（Reduce）呼び出しの出力。スコアはローカルで算出する"""
+    comments: Comments
+    final_summary: str
+
 
 # -----------------------------
 # 2) JSON抽出ユーティリティ
 # -----------------------------
-def extract_json_from_text(text: str) -> Dict[str, Any]:
+_JSON_DECODER = json.JSONDecoder()
+# 修復後の候補は文字列内の生の改行などの制御文字も許容する
+_LENIENT_JSON_DECODER = json.JSONDecoder(strict=False)
+
+# 構造位置（区切り記号の直後・直前）に現れる全角/スマート引用符
+_FULLWIDTH_QUOTES = "“”＂"
+_QUOTE_AFTER_DELIM = re.compile(rf"(?<=[{{\[,:])(\s*)[{_FULLWIDTH_QUOTES}]")
+_QUOTE_BEFORE_DELIM = re.compile(rf"[{_FULLWIDTH_QUOTES}](?=\s*[:,}}\]])")
+
+
+def _scan_balanced_objects(text: str) -> list[tuple[int, int]]:
     """
-    モデルがコードブロックや説明を返しても、
-    JSON部分のみ安全に抽出する。
-    - 最初の '{' から最後の '}' までを抽出
-    - 失敗時は json.loads を直接試す
+    テキストを1回だけ走査し、トップレベルで括弧の対応が取れた { ... } の範囲を返す。
+    文字列リテラル内の括弧やエスケープは無視する。
+    """
+    spans: list[tuple[int, int]] = []
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+    for idx, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            # トップレベル外（説明文中）の引用符は文字列として扱わない
+            if depth > 0:
+                in_string = True
+        elif ch == "{":
+            if depth == 0:
+                start = idx
+            depth += 1
+        elif ch == "}" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                spans.append((start, idx + 1))
+    # 閉じられていない末尾のオブジェクトも修復候補として残す
+    if depth > 0 and start >= 0:
+        spans.append((start, len(text)))
+    return spans
+
+
+def _repair_json(candidate: str) -> str:
+    """
+    モデル出力によくある JSON の崩れをローカルで修復する。
+    - 構造位置の全角/スマート引用符を半角に置換
+    - 末尾カンマ（`,}` / `,]`）の除去
+    - キー/要素間の欠落カンマの補完（例: `}` の直後に `"final_summary"`）
+    - 閉じられていない括弧の補完
     """
+    text = _QUOTE_AFTER_DELIM.sub(r'\1"', candidate)
+    text = _QUOTE_BEFORE_DELIM.sub('"', text)
+
+    out: list[str] = []
+    stack: list[str] = []
+    in_string = False
+    escaped = False
+    # 直前の有意な文字が値の終端（文字列・数値・リテラル・閉じ括弧）かどうか
+    value_ended = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+                value_ended = True
+            continue
+        if ch.isspace():
+            out.append(ch)
+            continue
+        if ch in "}]":
+            # 末尾カンマを取り除く
+            idx = len(out) - 1
+            while idx >= 0 and out[idx].isspace():
+                idx -= 1
+            if idx >= 0 and out[idx] == ",":
+                del out[idx]
+            if stack:
+                stack.pop()
+            out.append(ch)
+            value_ended = True
+            continue
+        # 値の直後（空白や閉じ記号を挟んで）に次の値が始まる場合はカンマを補う
+        separated = bool(out) and (out[-1].isspace() or out[-1] in '"}]')
+        if value_ended and separated and (ch in '"{[' or ch.isdigit() or ch == "-"):
+            out.append(",")
+        if ch == '"':
+            in_string = True
+            value_ended = False
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            value_ended = False
+        elif ch in ",:":
+            value_ended = False
+        else:
+            # 数値・true/false/null の途中
+            value_ended = True
+        out.append(ch)
+
+    if in_string:
+        out.append('"')
+    out.extend(reversed(stack))
+    return "".join(out)
+
+
+def _decode_object(candidate: str, decoder: json.JSONDecoder = _JSON_DECODER) -> Optional[Dict[str, Any]]:
+    try:
+        obj, _ = decoder.raw_decode(candidate)
+    except json.JSONDecodeError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _iter_nested_dicts(obj: Any):
+    """オブジェクトとその配下の dict を列挙する（{"result": {...}} のような包みに対応）"""
+    if isinstance(obj, dict):
+        yield obj
+        for value in obj.values():
+            yield from _iter_nested_dicts(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _iter_nested_dicts(value)
+
 
-    # 1) ```json ... ``` ブロックを優先
-    code_block = re.search(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", text, re.IGNORECASE)
-    if code_block:
-        candidate = code_block.group(1).strip()
-        return json.loads(candidate)
+def _candidate_rank(obj: Dict[str, Any], model: type[BaseModel]) -> tuple[int, int, int]:
+    """候補の優先度: (スキーマ検証に通るか, 一致キー数, サイズ)"""
+    try:
+        model.model_validate(obj)
+        valid = 1
+    except ValidationError:
+        valid = 0
+    matched = len(set(obj).intersection(model.model_fields))
+    return valid, matched, len(obj)
 
-    # 2) 最も大きい { } を抽出
-    brace_match = re.search(r"\{[\s\S]*\}", text)
-    if brace_match:
-        candidate = brace_match.group(0)
-        return json.loads(candidate)
 
-    # 3) 最後の手段: 直接パース
+def extract_json_from_text(text: str, model: Optional[type[BaseModel]] = None) -> Dict[str, Any]:
+    """
+    モデルがコードブロックや説明を返しても、
+    JSON部分のみ安全に抽出する。
+    - テキストを1回走査して括弧の対応が取れた { } 候補を列挙（入れ子を途中で切らない）
+    - 各候補を json.JSONDecoder.raw_decode でパースし、スキーマ（既定は EvalOut）に最も近いものを選ぶ
+    - スキーマに合う候補が無い場合のみ、ローカル修復（末尾カンマ・欠落カンマ・全角引用符）を試す
+    - 候補が無い場合は json.JSONDecodeError を送出
+    """
+    model = model or EvalOut
+    spans = _scan_balanced_objects(text)
+
+    best: Optional[Dict[str, Any]] = None
+    best_rank: tuple[int, int, int] = (-1, -1, -1)
+    for repair in (False, True):
+        for start, end in spans:
+            candidate = text[start:end]
+            if repair:
+                obj = _decode_object(_repair_json(candidate), _LENIENT_JSON_DECODER)
+            else:
+                obj = _decode_object(candidate)
+            if obj is None:
+                continue
+            for sub in _iter_nested_dicts(obj):
+                rank = _candidate_rank(sub, model)
+                if rank > best_rank:
+                    best, best_rank = sub, rank
+        if best is not None and best_rank[0] == 1:
+            return best
+    if best is not None:
+        return best
+
+    # 最後の手段: 直接パース（エラー位置を含む例外をそのまま返す）
     return json.loads(text)
 
 
+def extract_batch_items(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    まとめ評価の応答から、work_id を持つ評価オブジェクトを作品ごとに取り出す。
+    配列の要素は個別に抽出・修復するため、一部の要素が崩れていても他の作品は取り出せる。
+    同じ work_id が複数ある場合は EvalOut として検証に通るものを優先する。
+    """
+    items: Dict[str, Dict[str, Any]] = {}
+    for start, end in _scan_balanced_objects(text):
+        candidate = text[start:end]
+        obj = _decode_object(candidate) or _decode_object(_repair_json(candidate), _LENIENT_JSON_DECODER)
+        if obj is None:
+            continue
+        for sub in _iter_nested_dicts(obj):
+            work_id = sub.get("work_id")
+            if not isinstance(work_id, str):
+                continue
+            if work_id not in items or _candidate_rank(sub, EvalOut) > _candidate_rank(items[work_id], EvalOut):
+                items[work_id] = sub
+    return items
+
+
 # -----------------------------
 # 3) モデル呼び出しアダプタ
 # -----------------------------
@@ -325,130 +516,736 @@ def compute_output_path(input_path: Path, agent: str) -> Path:
 # -----------------------------
 # 5) メイン処理
 # -----------------------------
+WORKS_DIR = Path(__file__).resolve().parent.parent / "storage" / "works"
+
 def build_prompt(novel_json_str: str) -> str:
     return PROMPT_TEMPLATE.replace("{novel_json}", novel_json_str)
 
 
-def preprocess_novel(input_file: Path) -> list[dict]:
-    """Preprocess novel by grouping episodes to stay under token limits"""
-    
-    novel_dict = json.loads(Path(input_file).read_text(encoding="utf-8"))
-    episodes = novel_dict["episodes"]
-    tokenizer = tiktoken.get_encoding("cl100k_base")
-    
-    sub_novels = []
-    current_group_tokens = 0
-    current_group = []
-    
-    for episode in episodes:
-        text = episode["text"]
-        token_count = len(tokenizer.encode(text))
-
-        # If adding this episode would exceed the limit, start a new group
-        if current_group_tokens + token_count > 40000:
-            sub_novels.append({**novel_dict, "episodes": current_group})
-            current_group = [episode]
-            current_group_tokens = token_count
-        else:
-            current_group.append(episode)
-            current_group_tokens += token_count
+def preprocess_novel(novel_dict: dict, agent: Optional[str] = None) -> list[tuple[dict, int]]:
+    """
+    トークン上限を超えないようにエピソードをグルーピングする。
+    agent を指定した場合は、そのモデルの（コンテキスト長超過で引き下げた）予算を使う。
+    返却: [(サブ小説データ, 本文トークン数)]
+    """
+    planner = ChunkPlanner(agent=agent)
+    chunks = [planner.add(episode) for episode in novel_dict["episodes"]]
+    chunks.append(planner.flush())
+    return [({**novel_dict, "episodes": episodes}, tokens) for episodes, tokens in filter(None, chunks)]
 
-    # Add the final group
-    if current_group:
-        sub_novels.append({**novel_dict, "episodes": current_group})
 
-    return sub_novels
+def episode_range_of(sub_novel: dict) -> str:
+    """サブ小説データに含まれるエピソード番号の範囲（例: "1 - 12"）"""
+    episodes = sub_novel["episodes"]
+    first = episodes[0].get("number", 1)
+    last = episodes[-1].get("number", len(episodes))
+    return f"{first} - {last}"
 
 
-async def run_claude(input_file: Path, agent) -> Path:
-    sub_novels = preprocess_novel(input_file)
-    if len(sub_novels) == 1:
-        novel_json_str = json.dumps(sub_novels[0], ensure_ascii=False, indent=2)
+def aggregate_sub_reviews(sub_reviews: list[SubEvalOut], weights: list[int]) -> tuple[float, Scores]:
+    """
+    サブレビューのスコアを文量（トークン数）で加重平均する。
+    LLM に再計算させず、同じ入力からは常に同じ最終スコアになる。
+    """
+    if not sum(weights):
+        weights = [1] * len(sub_reviews)
+    total = sum(weights)
+
+    def weighted(values: list[float]) -> float:
+        return round(sum(v * w for v, w in zip(values, weights)) / total, 2)
+
+    overall_score = weighted([r.overall_score for r in sub_reviews])
+    scores = Scores(**{
+        field: weighted([getattr(r.scores, field) for r in sub_reviews])
+        for field in Scores.model_fields
+    })
+    return overall_score, scores
+
+
+# スクレイパーが差分更新・除去カテゴリの集計のためにエピソードへ残す項目（評価プロンプトには含めない）
+CRAWL_EPISODE_FIELDS = ("updated_at", "removed_categories", "stats")
+
+
+def prompt_novel(novel_json: dict) -> dict:
+    """評価プロンプトに埋め込む作品データ（エピソードから取得用の項目を除く）"""
+    episodes = novel_json.get("episodes")
+    if not episodes:
+        return novel_json
+    return {
+        **novel_json,
+        "episodes": [{k: v for k, v in episode.items() if k not in CRAWL_EPISODE_FIELDS} for episode in episodes],
+    }
+
+
+def dumps_novel(novel_json: dict) -> str:
+    return json.dumps(prompt_novel(novel_json), ensure_ascii=False, indent=2)
+
+
+async def run_claude(novel_json: dict, agent) -> Dict[str, Any]:
+    """
+    Map-Reduce 方式の評価。
+    Map: エピソード範囲ごとにサブレビューを取得し SubEvalOut として検証
+    Reduce: スコアはローカルで加重平均し、LLM にはコメントの統合と講評のみを依頼
+    """
+    sub_novels = preprocess_novel(novel_json, agent)
+    if len(sub_novels) == 1 and sub_novels[0][1] <= budget_for(agent):
+        novel_json_str = dumps_novel(sub_novels[0][0])
         prompt = prompts.EVAL_NOVEL_USER_PROMPT.replace("{novel_json}", novel_json_str)
         messages = [{"role": "user", "content": prompt}]
-        result = await LLMAgent(agent).call(messages)
-        return result
-    else:
-        sub_novel_results = []
-        for sub_novel in sub_novels:
-            novel_json_str = json.dumps(sub_novel, ensure_ascii=False, indent=2)
-            prompt = prompts.EVAL_SUB_NOVEL_USER_PROMPT.replace("{novel_json}", novel_json_str)
-            messages = [{"role": "user", "content": prompt}]
+        try:
             result = await LLMAgent(agent).call(messages)
-            await asyncio.sleep(3)
-            sub_novel_results.append(result)
-        
-        prompt = prompts.EVAL_FULL_NOVEL_USER_PROMPT.replace("{sub_reviews}", "\n".join(sub_novel_results))
-        messages = [{"role": "user", "content": prompt}]
+            return extract_json_from_text(result)
+        except ContextLengthError as e:
+            print(f"[WARN] コンテキスト長超過のため分割して評価します: {e}")
+            tighten_budget(agent, sub_novels[0][1])
+            sub_novels = preprocess_novel(novel_json, agent)
+    if len(sub_novels) == 1:
+        # 1話だけで予算を超える作品は、本文を分割して評価する
+        sub_novels = [({**novel_json, "episodes": episodes}, tokens) for episodes, tokens in split_chunk(novel_json["episodes"])]
+
+    sub_reviews: list[SubEvalOut] = []
+    weights: list[int] = []
+    for sub_novel, token_count in sub_novels:
+        sub_reviews.append(await map_sub_novel(agent, sub_novel))
+        await asyncio.sleep(3)
+        weights.append(token_count)
+
+    return await reduce_sub_reviews(agent, novel_json.get("title"), sub_reviews, weights)
+
+
+async def map_sub_novel(agent: str, sub_novel: dict) -> SubEvalOut:
+    """
+    Map: エピソード範囲1つ分のサブレビューを取得する。
+    コンテキスト長超過で拒否された場合は、モデルの予算を引き下げてチャンクを半分ずつ評価し、
+    1つのサブレビューにまとめて返す。
+    """
+    novel_json_str = dumps_novel(sub_novel)
+    prompt = prompts.EVAL_SUB_NOVEL_USER_PROMPT.replace("{novel_json}", novel_json_str)
+    messages = [{"role": "user", "content": prompt}]
+    try:
         result = await LLMAgent(agent).call(messages)
-        return result
+    except ContextLengthError as e:
+        token_count = sum(count_tokens(episode["text"]) for episode in sub_novel["episodes"])
+        if token_count <= MIN_CHUNK_TOKENS:
+            raise
+        print(f"[WARN] エピソード {episode_range_of(sub_novel)} がコンテキスト長を超えたため分割して再評価します: {e}")
+        tighten_budget(agent, token_count)
+        halves = split_chunk(sub_novel["episodes"])
+        reviews = await asyncio.gather(*(
+            map_sub_novel(agent, {**sub_novel, "episodes": episodes}) for episodes, _ in halves
+        ))
+        return merge_sub_reviews(sub_novel, list(reviews), [tokens for _, tokens in halves])
+    payload = extract_json_from_text(result, SubEvalOut)
+    # 範囲はモデルの自己申告ではなく実際のチャンクから決める
+    payload["episode_range"] = episode_range_of(sub_novel)
+    return SubEvalOut.model_validate(payload)
+
+
+def merge_sub_reviews(sub_novel: dict, sub_reviews: list[SubEvalOut], weights: list[int]) -> SubEvalOut:
+    """分割して評価したサブレビューを、元のエピソード範囲1つ分のサブレビューにまとめる"""
+    overall_score, scores = aggregate_sub_reviews(sub_reviews, weights)
+    comments = Comments(**{
+        field: [item for r in sub_reviews for item in getattr(r.comments, field)]
+        for field in Comments.model_fields
+    })
+    return SubEvalOut(
+        title=sub_reviews[0].title,
+        episode_range=episode_range_of(sub_novel),
+        overall_score=overall_score,
+        scores=scores,
+        comments=comments,
+    )
+
+
+async def reduce_sub_reviews(agent: str, title: Optional[str], sub_reviews: list[SubEvalOut], weights: list[int]) -> Dict[str, Any]:
+    """Reduce: スコアはローカルで集計し、コメントの統合と講評のみを LLM に依頼する"""
+    overall_score, scores = aggregate_sub_reviews(sub_reviews, weights)
+
+    compact_reviews = [
+        {"episode_range": r.episode_range, **r.comments.model_dump()}
+        for r in sub_reviews
+    ]
+    final_scores = {"overall_score": overall_score, "scores": scores.model_dump()}
+    prompt = (
+        prompts.EVAL_FULL_NOVEL_USER_PROMPT
+        .replace("{final_scores}", json.dumps(final_scores, ensure_ascii=False))
+        .replace("{sub_reviews}", json.dumps(compact_reviews, ensure_ascii=False, indent=1))
+    )
+    messages = [{"role": "user", "content": prompt}]
+    result = await LLMAgent(agent).call(messages)
+    summary = FinalSummaryOut.model_validate(extract_json_from_text(result, FinalSummaryOut))
+
+    return {
+        "title": title or sub_reviews[0].title,
+        "overall_score": overall_score,
+        "scores": scores.model_dump(),
+        "comments": summary.comments.model_dump(),
+        "final_summary": summary.final_summary,
+    }
 
 
 ALL_SCRAPERS = ["syosetu", "kakuyomu"]
 
 
+def create_scraper(scraper: str):
+    if scraper == "syosetu":
+        return SyosetuScraper()
+    if scraper == "kakuyomu":
+        return KakuyomuScraper()
+    raise ValueError(f"Invalid scraper: {scraper}")
+
+
+def scraped_work_path(agent: str, scraper: str, work_id: str) -> Path:
+    return Path(f"input/{scraper}/{agent}/{work_id}.json")
+
+
+def save_scraped_work(file_path: Path, data: dict) -> None:
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    # チェックポイントから組み立てた作品データは、エピソードを1話ずつ読み出しながら書き出す
+    with file_path.open("w", encoding="utf-8") as f:
+        write_json(data, f, ensure_ascii=False)
+
+
 def run_scraper_if_needed(agent: str, scraper: str, work_id: str, episodes: int) -> str:
-    file_path = f"input/{scraper}/{agent}/{work_id}.json"
+    file_path = scraped_work_path(agent, scraper, work_id)
 
-    if Path(file_path).exists():
-        return file_path
+    if file_path.exists():
+        return str(file_path)
     else:
-        data = None
-        if scraper == "syosetu":
-            syosetu_scraper = SyosetuScraper()
-            data = syosetu_scraper.extract_novel_data(work_id, episodes)
-        elif scraper == "kakuyomu":
-            kakuyomu_scraper = KakuyomuScraper()
-            data = kakuyomu_scraper.extract_novel_data(work_id, episodes)
+        work_scraper = create_scraper(scraper)
+        data = work_scraper.extract_novel_data(work_id, episodes)
         if data:
-            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-            Path(file_path).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-            return file_path
+            save_scraped_work(file_path, data)
+            work_scraper.discard_checkpoint()
+            return str(file_path)
         else:
             return None
 
 
-async def run_evaluation(agent: str, work_id: str, episodes: int) -> dict:
-    base_dir = Path(__file__).resolve().parent.parent
-    work_file = Path(f'{base_dir}/storage/works/{work_id}.json')
+def load_work(work_id: str) -> Optional[dict]:
+    """storage/works から作品データを読み込む（存在しなければ None）"""
+    work_file = WORKS_DIR / f"{work_id}.json"
     if not work_file.exists():
+        return None
+    return json.loads(work_file.read_text(encoding="utf-8"))
+
+
+def uses_map_reduce(agent: str) -> bool:
+    """evaluate_novel がチャンクに分けて評価するモデルか（それ以外は一括で評価し、コンテキスト長超過時のみ Map-Reduce）"""
+    return agent == ANTHROPIC or agent == QWEN
+
+
+async def evaluate_novel(agent: str, novel_json: dict, summarizer: Optional[EpisodeSummarizer] = None) -> Dict[str, Any]:
+    """
+    作品データを評価し、EvalOut で検証済みのペイロードを返す。
+    summarizer を指定した場合は、本文の代わりにキャッシュ済みのエピソード要約で評価する。
+    """
+    if summarizer is not None:
+        novel_json = await summarizer.summarize_novel(novel_json)
+    if uses_map_reduce(agent):
+        payload = await run_claude(novel_json, agent)
+    else:
+        novel_json_str = dumps_novel(novel_json)
+        prompt = prompts.EVAL_NOVEL_USER_PROMPT.replace("{novel_json}", novel_json_str)
+        messages = [{"role": "user", "content": prompt}]
+        try:
+            eval_result = await LLMAgent(agent).call(messages)
+            payload = extract_json_from_text(eval_result)
+        except ContextLengthError as e:
+            # 一括で送れないモデルは、引き下げた予算で Map-Reduce 評価に切り替える
+            print(f"[WARN] コンテキスト長超過のため Map-Reduce 方式で評価します: {e}")
+            tighten_budget(agent, sum(count_tokens(episode["text"]) for episode in novel_json["episodes"]))
+            payload = await run_claude(novel_json, agent)
+    EvalOut.model_validate(payload)
+    return payload
+
+
+def save_output(file_name: str, data: dict) -> Path:
+    output_path = Path("output") / file_name
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    return output_path
+
+
+async def run_evaluation(agent: str, work_id: str, episodes: int, summarizer: Optional[EpisodeSummarizer] = None) -> dict:
+    novel_json = load_work(work_id)
+    if novel_json is None:
         return {
             "error": f"小説データの取得に失敗しました: work id = {work_id}"
         }
-    
-    novel_json = json.loads(Path(work_file).read_text(encoding="utf-8"))
-    novel_json_str = json.dumps(novel_json, ensure_ascii=False, indent=2)
-
 
     try:
-        if agent == ANTHROPIC or agent == QWEN:
-            eval_result = "" # await run_claude(work_file, agent)
-        else:
-            prompt = prompts.EVAL_NOVEL_USER_PROMPT.replace("{novel_json}", novel_json_str)
-            messages = [{"role": "user", "content": prompt}]
-            eval_result = await LLMAgent(agent).call(messages)    
-        payload = extract_json_from_text(eval_result)
-        validated = EvalOut.model_validate(payload)
+        payload = await evaluate_novel(agent, novel_json, summarizer)
 
         # 出力先計算 & 保存
-        output_path = Path(f"output/{work_id}-{agent}.json")
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_json = json.dumps(validated.model_dump(), ensure_ascii=False, indent=2)
-        output_path.write_text(output_json, encoding="utf-8")
+        save_output(f"{work_id}-{agent}.json", EvalOut.model_validate(payload).model_dump())
+        return payload
+    except Exception as e:
+        return {
+            "error": f"Failed to call LLM API: {e}"
+        }
+
+
+# -----------------------------
+# 6) スクリーニング・カスケード
+# -----------------------------
+CASCADE_OUTPUT_TOKENS = 1000  # 評価JSON応答の概算出力トークン数
+CASCADE_CONCURRENCY = 4
+
+
+def score_uncertainty(payload: Dict[str, Any]) -> float:
+    """
+    単一サンプルの不確実性の目安。
+    overall_score と各基準スコア平均（100点換算）の乖離が大きいほど、
+    モデルの採点が自己矛盾している（=信頼しにくい）とみなす。
+    """
+    scores = list(payload["scores"].values())
+    criteria_score = sum(scores) / len(scores) * 10
+    return abs(float(payload["overall_score"]) - criteria_score)
+
+
+def decide_escalation(screen: Optional[Dict[str, Any]], threshold: float, margin: float) -> tuple[bool, str]:
+    """一次評価の結果から、高価なモデルに回すかどうかと理由を返す"""
+    if screen is None:
+        return True, "screen_failed"
+    score = float(screen["overall_score"])
+    if score >= threshold:
+        return True, "above_threshold"
+    if score >= threshold - margin:
+        return True, "borderline"
+    if score_uncertainty(screen) > margin:
+        return True, "uncertain"
+    return False, "below_threshold"
+
+
+async def run_cascade_one(work_id: str, screen_agent: str, agent: str, threshold: float, margin: float, summarizer: Optional[EpisodeSummarizer] = None) -> dict:
+    """1作品分のカスケード評価。ルーティング結果とコスト概算を output/{work_id}-cascade.json に記録する"""
+    novel_json = load_work(work_id)
+    if novel_json is None:
+        return {
+            "work_id": work_id,
+            "error": f"小説データの取得に失敗しました: work id = {work_id}"
+        }
+    if summarizer is not None:
+        # 一次評価・本評価とも同じ要約（キャッシュ）を使うため、先に置き換えておく
+        novel_json = await summarizer.summarize_novel(novel_json)
+
+    novel_json_str = dumps_novel(novel_json)
+    prompt_tokens = count_tokens(prompts.EVAL_NOVEL_USER_PROMPT.replace("{novel_json}", novel_json_str))
+    screen_cost = estimate_cost(screen_agent, prompt_tokens, CASCADE_OUTPUT_TOKENS)
+    expensive_cost = estimate_cost(agent, prompt_tokens, CASCADE_OUTPUT_TOKENS)
+
+    screen: Optional[Dict[str, Any]] = None
+    screen_error = None
+    try:
+        screen = await evaluate_novel(screen_agent, novel_json)
+        save_output(f"{work_id}-{screen_agent}.json", EvalOut.model_validate(screen).model_dump())
+    except Exception as e:
+        screen_error = str(e)
+        print(f"[WARN] 一次評価に失敗しました ({work_id}): {e}")
+
+    escalated, reason = decide_escalation(screen, threshold, margin)
+    result = screen
+    if escalated:
+        result = await run_evaluation(agent, work_id, None, summarizer)
+
+    record = {
+        "work_id": work_id,
+        "screen_agent": screen_agent,
+        "screen_score": screen["overall_score"] if screen else None,
+        "screen_uncertainty": round(score_uncertainty(screen), 2) if screen else None,
+        "screen_error": screen_error,
+        "threshold": threshold,
+        "uncertainty_margin": margin,
+        "escalated": escalated,
+        "reason": reason,
+        "final_agent": agent if escalated else screen_agent,
+        "final_score": (result or {}).get("overall_score"),
+        "prompt_tokens": prompt_tokens,
+        "screen_cost_usd": round(screen_cost, 6),
+        "expensive_cost_usd": round(expensive_cost, 6),
+        # 本評価を省略できた場合は高価なモデルの概算コスト、回した場合は一次評価分が上乗せ
+        "cost_saved_usd": round((0.0 if escalated else expensive_cost) - screen_cost, 6),
+    }
+    save_output(f"{work_id}-cascade.json", record)
+    return {**record, "result": result}
+
+
+async def run_cascade(work_ids: list[str], screen_agent: str, agent: str, threshold: float, margin: float, summarizer: Optional[EpisodeSummarizer] = None) -> list[dict]:
+    """複数作品を一次評価し、閾値以上または不確実な作品のみ本評価に回す"""
+    semaphore = asyncio.Semaphore(CASCADE_CONCURRENCY)
+
+    async def worker(work_id: str) -> dict:
+        async with semaphore:
+            return await run_cascade_one(work_id, screen_agent, agent, threshold, margin, summarizer)
+
+    return await asyncio.gather(*(worker(work_id) for work_id in work_ids))
+
+
+# -----------------------------
+# 7) スクレイピングと評価のストリーミング
+# -----------------------------
+MAP_CONCURRENCY = 2
+
+
+async def run_streaming_evaluation(agent: str, scraper_name: str, work_id: str, episodes: Optional[int], summarizer: Optional[EpisodeSummarizer] = None, update: bool = False, resume: bool = False) -> dict:
+    """
+    スクレイピングと評価を重ねて実行する。
+    チャンクプランナーがトークン予算に達した時点でチャンクを閉じ、その Map 呼び出しを
+    後続エピソードのダウンロード中に開始する。取得済みの作品は通常の評価を行う。
+    チャンクを先行して評価するのは evaluate_novel が Map-Reduce で評価するモデルだけで、それ以外のモデルは
+    取得後に evaluate_novel と同じく一括で評価する（通常の評価とスコアの算出方法を揃えるため）。
+    summarizer を指定した場合、各エピソードの要約も取得と並行して作成し、要約をチャンクに詰める。
+    update=True の場合、取得済みの作品は追加・改稿されたエピソードだけを取得し直してから評価する。
+    resume=True の場合、中断した取得をエピソードのチェックポイントから再開する。
+    """
+    file_path = scraped_work_path(agent, scraper_name, work_id)
+    if file_path.exists():
+        novel_json = json.loads(file_path.read_text(encoding="utf-8"))
+        if update:
+            updated = await create_scraper(scraper_name).aupdate_novel_data(work_id, novel_json, episodes)
+            if updated:
+                novel_json = updated
+                save_scraped_work(file_path, novel_json)
+        payload = await evaluate_novel(agent, novel_json, summarizer)
+        save_output(f"{work_id}-{agent}.json", EvalOut.model_validate(payload).model_dump())
         return payload
+
+    scraper = create_scraper(scraper_name)
+    planner = ChunkPlanner(agent=agent) if uses_map_reduce(agent) else None
+    semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+    map_tasks: list[asyncio.Task] = []
+    # 要約中のエピソード（掲載順）。先頭から完了したものだけをプランナーに渡す
+    summary_tasks: list[asyncio.Task] = []
+    weights: list[int] = []
+    scraped_episodes: list[dict] = []
+
+    async def map_with_limit(sub_novel: dict) -> SubEvalOut:
+        async with semaphore:
+            return await map_sub_novel(agent, sub_novel)
+
+    def start_map(chunk: tuple[list[dict], int]) -> None:
+        chunk_episodes, token_count = chunk
+        sub_novel = {**scraper.work_info, "episodes": chunk_episodes}
+        if summarizer is not None:
+            sub_novel["episode_text"] = "summary"
+        print(f"[MAP] エピソード {episode_range_of(sub_novel)} の評価を開始します")
+        map_tasks.append(asyncio.create_task(map_with_limit(sub_novel)))
+        weights.append(token_count)
+
+    def plan(episode: dict) -> None:
+        if planner is None:
+            return
+        chunk = planner.add(episode)
+        if chunk:
+            start_map(chunk)
+
+    try:
+        async for episode in scraper.aiter_novel_episodes(work_id, episodes, resume):
+            scraped_episodes.append(episode)
+            if summarizer is None:
+                plan(episode)
+                continue
+            summary_tasks.append(asyncio.create_task(summarizer.summarize_episode(episode)))
+            while summary_tasks and summary_tasks[0].done():
+                plan(summary_tasks.pop(0).result())
+        while summary_tasks:
+            plan(await summary_tasks.pop(0))
+        last_chunk = planner.flush() if planner is not None else None
+
+        if scraper.work_info is None or not scraped_episodes:
+            raise RuntimeError(f"小説データの取得に失敗しました: work id = {work_id}")
+
+        novel_json = scraper.build_novel_data(scraped_episodes)
+        save_scraped_work(file_path, novel_json)
+        scraper.discard_checkpoint()
+
+        if not map_tasks:
+            # 1チャンクに収まる作品と、一括で評価するモデルは通常の評価
+            payload = await evaluate_novel(agent, novel_json, summarizer)
+        else:
+            start_map(last_chunk)
+            sub_reviews = await asyncio.gather(*map_tasks)
+            payload = await reduce_sub_reviews(agent, novel_json.get("title"), list(sub_reviews), weights)
+    except BaseException:
+        for task in map_tasks + summary_tasks:
+            task.cancel()
+        raise
+
+    save_output(f"{work_id}-{agent}.json", EvalOut.model_validate(payload).model_dump())
+    return payload
+
+
+# -----------------------------
+# 8) 自己一貫性アンサンブル
+# -----------------------------
+ENSEMBLE_MIN_SAMPLES = 3
+ENSEMBLE_MAX_SAMPLES = 7
+ENSEMBLE_BATCH = 2  # 収束していない場合に追加で同時に取るサンプル数
+ENSEMBLE_VARIANCE_THRESHOLD = 0.1  # 各基準スコア平均の分散（10点満点の2乗）
+
+
+def _mean(values: list[float]) -> float:
+    return sum(values) / len(values)
+
+
+def _variance(values: list[float]) -> float:
+    """不偏分散（サンプル1件なら 0）"""
+    if len(values) < 2:
+        return 0.0
+    mean = _mean(values)
+    return sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+
+
+def ensemble_spread(samples: list[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    サンプル間のばらつき。
+    std は各スコアの標準偏差、mean_variance は平均値の分散（不偏分散 / サンプル数）。
+    """
+    columns = {"overall_score": [float(s["overall_score"]) for s in samples]}
+    for field in Scores.model_fields:
+        columns[field] = [float(s["scores"][field]) for s in samples]
+    return {
+        "std": {k: round(_variance(v) ** 0.5, 3) for k, v in columns.items()},
+        "mean_variance": {k: round(_variance(v) / len(v), 4) for k, v in columns.items()},
+    }
+
+
+def ensemble_converged(samples: list[Dict[str, Any]], threshold: float, min_samples: int = ENSEMBLE_MIN_SAMPLES) -> bool:
+    """全基準について、平均値の分散が閾値を下回ったら収束とみなす"""
+    if len(samples) < max(min_samples, 2):
+        return False
+    mean_variance = ensemble_spread(samples)["mean_variance"]
+    return all(mean_variance[field] <= threshold for field in Scores.model_fields)
+
+
+def combine_samples(samples: list[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    サンプルのスコアを平均し、コメント・講評は平均に最も近いサンプルのものを採用する。
+    """
+    scores = {
+        field: round(_mean([float(s["scores"][field]) for s in samples]), 2)
+        for field in Scores.model_fields
+    }
+    overall_score = round(_mean([float(s["overall_score"]) for s in samples]), 2)
+
+    def distance(sample: Dict[str, Any]) -> float:
+        return abs(float(sample["overall_score"]) - overall_score) / 10 + sum(
+            abs(float(sample["scores"][field]) - scores[field]) for field in Scores.model_fields
+        )
+
+    representative = min(samples, key=distance)
+    return {**representative, "overall_score": overall_score, "scores": scores}
+
+
+async def run_ensemble(
+    agent: str,
+    novel_json: dict,
+    max_samples: int = ENSEMBLE_MAX_SAMPLES,
+    threshold: float = ENSEMBLE_VARIANCE_THRESHOLD,
+    summarizer: Optional[EpisodeSummarizer] = None,
+) -> Dict[str, Any]:
+    """
+    同じ作品を複数回評価し、スコアを平均する。
+    最初に ENSEMBLE_MIN_SAMPLES 件を同時に取り、各基準の平均値の分散が閾値を下回るまで
+    ENSEMBLE_BATCH 件ずつ追加する（max_samples 件で打ち切り）。
+    """
+    if summarizer is not None:
+        novel_json = await summarizer.summarize_novel(novel_json)
+
+    samples: list[Dict[str, Any]] = []
+    failures = 0
+    converged = False
+    while len(samples) + failures < max_samples:
+        wanted = ENSEMBLE_MIN_SAMPLES - len(samples) if len(samples) < ENSEMBLE_MIN_SAMPLES else ENSEMBLE_BATCH
+        batch = min(max(wanted, 1), max_samples - len(samples) - failures)
+        results = await asyncio.gather(
+            *(evaluate_novel(agent, novel_json) for _ in range(batch)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                failures += 1
+                print(f"[WARN] アンサンブルのサンプル取得に失敗しました: {result}")
+            else:
+                samples.append(result)
+        converged = ensemble_converged(samples, threshold)
+        print(f"[ENSEMBLE] サンプル {len(samples)} 件（失敗 {failures} 件）: 平均値の分散 {ensemble_spread(samples)['mean_variance'] if samples else '-'}")
+        if converged:
+            break
+
+    if not samples:
+        raise RuntimeError("アンサンブルの全サンプルの取得に失敗しました。")
+
+    payload = combine_samples(samples)
+    EvalOut.model_validate(payload)
+    return {
+        **payload,
+        "ensemble": {
+            "samples": len(samples),
+            "failed_samples": failures,
+            "max_samples": max_samples,
+            "variance_threshold": threshold,
+            "converged": converged,
+            **ensemble_spread(samples),
+            "sample_scores": [s["overall_score"] for s in samples],
+        },
+    }
+
+
+async def run_ensemble_evaluation(agent: str, work_id: str, max_samples: int, threshold: float, summarizer: Optional[EpisodeSummarizer] = None) -> dict:
+    """storage/works の作品をアンサンブル評価し、output/{work_id}-{agent}-ensemble.json に保存する"""
+    novel_json = load_work(work_id)
+    if novel_json is None:
+        return {
+            "error": f"小説データの取得に失敗しました: work id = {work_id}"
+        }
+
+    try:
+        payload = await run_ensemble(agent, novel_json, max_samples, threshold, summarizer)
     except Exception as e:
         return {
             "error": f"Failed to call LLM API: {e}"
         }
+    result = {**EvalOut.model_validate(payload).model_dump(), "ensemble": payload["ensemble"]}
+    save_output(f"{work_id}-{agent}-ensemble.json", result)
+    return result
+
+
+# -----------------------------
+# 9) 短編のまとめ評価
+# -----------------------------
+PACK_MAX_TOKENS = 8000  # この本文トークン数以下の作品をまとめ評価の対象にする
+PACK_MAX_WORKS = 8  # 1リクエストあたりの最大作品数（出力の長さを抑える）
+PACK_CONCURRENCY = 2
+
+
+def novel_tokens(novel_json: dict) -> int:
+    return sum(count_tokens(episode["text"]) for episode in novel_json.get("episodes", []))
+
+
+def plan_packs(works: list[tuple[str, dict, int]], budget_tokens: int, max_works: int = PACK_MAX_WORKS) -> list[list[tuple[str, dict, int]]]:
+    """(work_id, 作品データ, トークン数) をトークン予算と作品数の上限内で順にまとめる"""
+    packs: list[list[tuple[str, dict, int]]] = []
+    current: list[tuple[str, dict, int]] = []
+    current_tokens = 0
+    for work in works:
+        if current and (current_tokens + work[2] > budget_tokens or len(current) >= max_works):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(work)
+        current_tokens += work[2]
+    if current:
+        packs.append(current)
+    return packs
+
+
+async def evaluate_pack(agent: str, pack: list[tuple[str, dict, int]]) -> Dict[str, Dict[str, Any]]:
+    """
+    複数作品を1回の呼び出しで評価し、EvalOut として検証に通った作品だけを返す。
+    返却: {work_id: 評価ペイロード}
+    """
+    works_json = json.dumps([{"work_id": work_id, **prompt_novel(novel_json)} for work_id, novel_json, _ in pack], ensure_ascii=False, indent=2)
+    prompt = (
+        prompts.EVAL_BATCH_USER_PROMPT
+        .replace("{work_count}", str(len(pack)))
+        .replace("{works_json}", works_json)
+    )
+    messages = [{"role": "user", "content": prompt}]
+    result = await LLMAgent(agent).call(messages)
+    items = extract_batch_items(result)
+
+    payloads: Dict[str, Dict[str, Any]] = {}
+    for work_id, _, _ in pack:
+        item = items.get(work_id)
+        if item is None:
+            print(f"[WARN] まとめ評価の応答に {work_id} が含まれていません")
+            continue
+        try:
+            payloads[work_id] = EvalOut.model_validate(item).model_dump()
+        except ValidationError as e:
+            print(f"[WARN] まとめ評価の {work_id} がスキーマに合いません: {e.error_count()} 件のエラー")
+    return payloads
+
+
+async def run_packed_evaluation(agent: str, work_ids: list[str], max_tokens: int = PACK_MAX_TOKENS, summarizer: Optional[EpisodeSummarizer] = None) -> list[dict]:
+    """
+    短編（本文 max_tokens 以下）をモデルのチャンク予算内でまとめて評価する。
+    長い作品と、まとめ評価で検証に通らなかった作品は個別に評価する。
+    """
+    records: Dict[str, dict] = {}
+    short_works: list[tuple[str, dict, int]] = []
+    individual: list[str] = []
+    for work_id in work_ids:
+        novel_json = load_work(work_id)
+        if novel_json is None:
+            records[work_id] = {"work_id": work_id, "mode": "error", "result": {
+                "error": f"小説データの取得に失敗しました: work id = {work_id}"
+            }}
+            continue
+        if summarizer is not None:
+            novel_json = await summarizer.summarize_novel(novel_json)
+        token_count = novel_tokens(novel_json)
+        if token_count <= max_tokens:
+            short_works.append((work_id, novel_json, token_count))
+        else:
+            individual.append(work_id)
+
+    packs = plan_packs(short_works, budget_for(agent))
+    semaphore = asyncio.Semaphore(PACK_CONCURRENCY)
+    fallback: list[str] = []
+
+    async def run_pack(pack: list[tuple[str, dict, int]]) -> None:
+        if len(pack) == 1:
+            individual.append(pack[0][0])
+            return
+        async with semaphore:
+            try:
+                payloads = await evaluate_pack(agent, pack)
+            except Exception as e:
+                print(f"[WARN] まとめ評価に失敗しました（{len(pack)} 作品を個別に評価します）: {e}")
+                payloads = {}
+        for work_id, _, _ in pack:
+            if work_id in payloads:
+                save_output(f"{work_id}-{agent}.json", payloads[work_id])
+                records[work_id] = {"work_id": work_id, "mode": "packed", "pack_size": len(pack), "result": payloads[work_id]}
+            else:
+                fallback.append(work_id)
+
+    await asyncio.gather(*(run_pack(pack) for pack in packs))
+
+    for mode, ids in (("individual", individual), ("fallback", fallback)):
+        for work_id in ids:
+            result = await run_evaluation(agent, work_id, None, summarizer)
+            records[work_id] = {"work_id": work_id, "mode": mode, "result": result}
+
+    multi_packs = sum(1 for pack in packs if len(pack) > 1)
+    print(f"[PACK] まとめ評価 {multi_packs} リクエスト（{sum(len(p) for p in packs if len(p) > 1)} 作品）, 個別評価 {len(individual)} 件, フォールバック {len(fallback)} 件")
+    return [records[work_id] for work_id in work_ids]
+
 
 def main():
     load_dotenv()  # .env を自動読み込み
     parser = argparse.ArgumentParser(description="ライトノベル評価")
     parser.add_argument("--scraper", choices=ALL_SCRAPERS, required=True, help="使用するスクレイパー")
-    parser.add_argument("--work_id", required=True, help="小説ID (例: n2596la)")
+    parser.add_argument("--work_id", nargs="+", required=True, help="小説ID (例: n2596la) - 複数指定可")
     parser.add_argument("--episodes", type=int, default=None, help="話数制限 (例: 5) - 省略可能")
     parser.add_argument("--model", choices=ALL_MODELS, required=True, help=f"使用する生成AI: {', '.join(ALL_MODELS)}")
-    
+    parser.add_argument("--stream", action="store_true", help="未取得の作品をスクレイピングしながら、チャンク単位で並行して評価する（チャンクに分けて評価するのは claude / qwen のみ。他のモデルは取得後に一括で評価）")
+    parser.add_argument("--update", action="store_true", help="--stream で取得済みの作品も目次を確認し、追加・改稿されたエピソードだけを取得し直す")
+    parser.add_argument("--resume", action="store_true", help="--stream で中断した取得を、エピソードのチェックポイントから再開する")
+    parser.add_argument("--summaries", action="store_true", help="本文の代わりにキャッシュ済みのエピソード要約で評価する（長編・小コンテキストのモデル向け）")
+    parser.add_argument("--summary_model", choices=ALL_MODELS, default=os.environ.get("SUMMARY_AGENT", LOCAL), help="エピソード要約に使う生成AI")
+    parser.add_argument("--cascade", action="store_true", help="安価なモデルで一次評価し、閾値以上または不確実な作品のみ --model で本評価する")
+    parser.add_argument("--screen_model", choices=ALL_MODELS, default=os.environ.get("CASCADE_SCREEN_MODEL", LOCAL), help="カスケードの一次評価に使う生成AI")
+    parser.add_argument("--threshold", type=float, default=float(os.environ.get("CASCADE_THRESHOLD", 60)), help="本評価に回す一次評価スコア（100点満点）")
+    parser.add_argument("--pack", action="store_true", help="短編を複数まとめて1回の呼び出しで評価する（検証に失敗した作品は個別に評価）")
+    parser.add_argument("--pack_max_tokens", type=int, default=int(os.environ.get("PACK_MAX_TOKENS", PACK_MAX_TOKENS)), help="まとめ評価の対象とする作品の最大本文トークン数")
+    parser.add_argument("--ensemble", action="store_true", help="同じ作品を複数回評価してスコアを平均する（ばらつきが収束した時点で打ち切り）")
+    parser.add_argument("--max_samples", type=int, default=int(os.environ.get("ENSEMBLE_MAX_SAMPLES", ENSEMBLE_MAX_SAMPLES)), help="アンサンブルの最大サンプル数")
+    parser.add_argument("--variance_threshold", type=float, default=float(os.environ.get("ENSEMBLE_VARIANCE_THRESHOLD", ENSEMBLE_VARIANCE_THRESHOLD)), help="収束とみなす各基準スコア平均の分散")
+    parser.add_argument("--uncertainty_margin", type=float, default=float(os.environ.get("CASCADE_UNCERTAINTY_MARGIN", 5)), help="閾値近傍・自己矛盾とみなす幅（点）")
+
     args = parser.parse_args()
 
     import asyncio
@@ -456,9 +1253,35 @@ def main():
     if sys.platform.startswith("win"):
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
+    summarizer = EpisodeSummarizer(args.summary_model) if args.summaries else None
+
     try:
-        out_path = asyncio.run(run_evaluation(args.model, args.scraper, args.work_id, args.episodes))
-        print(f"[OK] 出力完了: {out_path}")
+        if args.cascade:
+            records = asyncio.run(run_cascade(args.work_id, args.screen_model, args.model, args.threshold, args.uncertainty_margin, summarizer))
+            escalated = sum(1 for r in records if r.get("escalated"))
+            saved = sum(r.get("cost_saved_usd", 0.0) for r in records)
+            for r in records:
+                print(f"[CASCADE] {r['work_id']}: {r.get('reason', 'error')} → {r.get('final_agent')} (score={r.get('final_score')})")
+            print(f"[OK] 本評価 {escalated}/{len(records)} 件, 概算削減コスト ${saved:.4f}")
+        elif args.pack:
+            records = asyncio.run(run_packed_evaluation(args.model, args.work_id, args.pack_max_tokens, summarizer))
+            for r in records:
+                print(f"[PACK] {r['work_id']}: {r['mode']} (score={r['result'].get('overall_score')})")
+        elif args.ensemble:
+            for work_id in args.work_id:
+                result = asyncio.run(run_ensemble_evaluation(args.model, work_id, args.max_samples, args.variance_threshold, summarizer))
+                if "ensemble" in result:
+                    stats = result["ensemble"]
+                    print(f"[ENSEMBLE] {work_id}: 平均 {result['overall_score']} (標準偏差 {stats['std']['overall_score']}, {stats['samples']} サンプル)")
+                print(f"[OK] 出力完了: {result}")
+        elif args.stream:
+            for work_id in args.work_id:
+                out_path = asyncio.run(run_streaming_evaluation(args.model, args.scraper, work_id, args.episodes, summarizer, args.update, args.resume))
+                print(f"[OK] 出力完了: {out_path}")
+        else:
+            for work_id in args.work_id:
+                out_path = asyncio.run(run_evaluation(args.model, work_id, args.episodes, summarizer))
+                print(f"[OK] 出力完了: {out_path}")
     except Exception as e:
         print(f"[ERR] {e}", file=sys.stderr)
         sys.exit(2)
@@ -24,8 +24,79 @@ GEMINI = "gemini"
 QWEN = "qwen"
 PHI = "phi"
 DEEPSEEK = "deepseek"
+LOCAL = "local"
+
+ALL_MODELS = [OPENAI, ANTHROPIC, GEMINI, QWEN, PHI, DEEPSEEK, LOCAL]
+
+# 概算単価（USD / 100万トークン: 入力, 出力）
+# 環境変数 <AGENT>_COST_PER_MTOK="入力,出力"（例: CLAUDE_COST_PER_MTOK="3,15"）で上書き可能
+DEFAULT_COST_PER_MTOK = {
+    OPENAI: (0.15, 0.6),
+    ANTHROPIC: (3.0, 15.0),
+    GEMINI: (1.25, 5.0),
+    QWEN: (0.2, 0.6),
+    PHI: (0.07, 0.14),
+    DEEPSEEK: (0.27, 1.1),
+    LOCAL: (0.0, 0.0),
+}
+
+
+def estimate_cost(agent: str, input_tokens: int, output_tokens: int = 0) -> float:
+    """トークン数から概算コスト（USD）を算出"""
+    input_price, output_price = DEFAULT_COST_PER_MTOK.get(agent, (0.0, 0.0))
+    override = os.environ.get(f"{agent.upper()}_COST_PER_MTOK")
+    if override:
+        try:
+            input_price, output_price = (float(v) for v in override.split(","))
+        except ValueError:
+            print(f"[WARN] {agent.upper()}_COST_PER_MTOK の形式が不正です: {override}")
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+class ContextLengthError(RuntimeError):
+    """プロンプトがモデルのコンテキスト長・リクエストサイズ上限を超えて拒否された"""
+
+
+# 各プロバイダのコンテキスト長超過エラーに含まれる文言（小文字・バッククォートを除いて比較）
+# パラメータの範囲エラー（"temperature must be <= 2" など）と取り違えないよう、断片ではなく各社の文言全体で照合する
+_CONTEXT_LENGTH_MARKERS = (
+    "context_length_exceeded",      # OpenAI
+    "maximum context length",       # OpenAI / DeepSeek / vLLM
+    "prompt is too long",           # Anthropic
+    "request_too_large",            # Anthropic (413)
+    "exceeds the maximum number of tokens",  # Gemini
+    "inputs tokens + max_new_tokens must be <=",  # Hugging Face TGI
+    "exceeds the available context size",  # llama.cpp
+)
+
+
+def is_context_length_error(status_code: Optional[int], message: str) -> bool:
+    """HTTP ステータスとエラーメッセージから、コンテキスト長・ペイロードサイズ超過かを判定する"""
+    if status_code == 413:
+        return True
+    if status_code is not None and status_code not in (400, 422):
+        return False
+    lowered = message.lower().replace("`", "")
+    return any(marker in lowered for marker in _CONTEXT_LENGTH_MARKERS)
+
+
+# エージェントごとのモデル名の環境変数
+MODEL_ENV_NAMES = {
+    OPENAI: "OPENAI_MODEL",
+    ANTHROPIC: "ANTHROPIC_MODEL",
+    GEMINI: "GEMINI_MODEL",
+    QWEN: "QWEN_MODEL",
+    PHI: "PHI_MODEL",
+    DEEPSEEK: "DEEPSEEK_MODEL",
+    LOCAL: "LOCAL_MODEL",
+}
+
+
+def model_name(agent: str) -> str:
+    """agent が呼び出すモデル名（API キーが無くても解決できる。要約キャッシュのキーなどに使う）"""
+    load_dotenv()
+    default = "qwen2.5:7b-instruct" if agent == LOCAL else "gpt-4o-mini"
+    return os.environ.get(MODEL_ENV_NAMES.get(agent, "OPENAI_MODEL"), default)
 
-ALL_MODELS = [OPENAI, ANTHROPIC, GEMINI, QWEN, PHI, DEEPSEEK]
 
 class LLMAgent:
     def __init__(self, agent: str):
@@ -45,37 +116,39 @@ class LLMAgent:
             return await self._call_phi(prompts)
         elif self.agent == DEEPSEEK:
             return await self._call_deepseek(prompts)
+        elif self.agent == LOCAL:
+            return await self._call_local(prompts)
         else:
             raise ValueError(f"Invalid agent: {self.agent}")
 
     def _load_config(self, agent: str) -> dict:
         load_dotenv()
         api_key_name = "OPENAI_API_KEY"
-        model_name = "OPENAI_MODEL"
         if agent == ANTHROPIC:
             api_key_name = "ANTHROPIC_API_KEY"
-            model_name = "ANTHROPIC_MODEL"
         elif agent == GEMINI:
             api_key_name = "GOOGLE_API_KEY"
-            model_name = "GEMINI_MODEL"
         elif agent == QWEN:
             api_key_name = "QWEN_API_KEY"
-            model_name = "QWEN_MODEL"
         elif agent == PHI:
             api_key_name = "PHI_API_KEY"
-            model_name = "PHI_MODEL"
         elif agent == DEEPSEEK:
             api_key_name = "DEEPSEEK_API_KEY"
-            model_name = "DEEPSEEK_MODEL"
+        elif agent == LOCAL:
+            # OpenAI 互換のローカル推論サーバ（Ollama / llama.cpp / vLLM など）。API キーは任意
+            return {
+                "api_key": os.environ.get("LOCAL_API_KEY", ""),
+                "model": model_name(agent),
+                "base_url": os.environ.get("LOCAL_BASE_URL", "http://localhost:11434/v1").rstrip("/"),
+            }
 
         api_key = os.environ.get(api_key_name)
         if not api_key:
             raise RuntimeError(f"{api_key_name} が設定されていません。")
-        model = os.environ.get(model_name, "gpt-4o-mini")
 
         return {
             "api_key": api_key,
-            "model": model
+            "model": model_name(agent)
         }
     
     async def _call_openai(self, prompts) -> str:
@@ -92,12 +165,17 @@ class LLMAgent:
         if anthropic is None:
             raise RuntimeError("anthropic パッケージがインストールされていません。")
         client = anthropic.Anthropic(api_key=self.config["api_key"])
-        msg = client.messages.create(
-            model=self.config["model"],
-            max_tokens=4096,
-            temperature=0.2,
-            messages=prompts,
-        )
+        try:
+            msg = client.messages.create(
+                model=self.config["model"],
+                max_tokens=4096,
+                temperature=0.2,
+                messages=prompts,
+            )
+        except anthropic.APIStatusError as e:
+            if is_context_length_error(e.status_code, str(e)):
+                raise ContextLengthError(str(e)) from e
+            raise
         return "".join(part.text for part in msg.content if getattr(part, "type", "") == "text")
     
     def _call_gemini(self, prompts) -> str:
@@ -108,7 +186,12 @@ class LLMAgent:
         user_prompt = "".join(prompt["content"] for prompt in prompts if prompt["role"] == "user")
         # for m in genai.list_models():
         #     pprint.pprint(m)
-        response = model.generate_content(user_prompt)
+        try:
+            response = model.generate_content(user_prompt)
+        except Exception as e:
+            if is_context_length_error(getattr(e, "code", None), str(e)):
+                raise ContextLengthError(str(e)) from e
+            raise
         if hasattr(response, "text") and response.text:
             return response.text
         return "\n".join([p.text for c in (response.candidates or []) for p in c.content.parts if getattr(p, "text", None)])
@@ -149,12 +232,27 @@ class LLMAgent:
         }
         return await self._call_api(url, headers, payload)
 
+    async def _call_local(self, prompts) -> str:
+        url = f"{self.config['base_url']}/chat/completions"
+        headers = {"Content-Type": "application/json"}
+        if self.config["api_key"]:
+            headers["Authorization"] = f"Bearer {self.config['api_key']}"
+        payload = {
+            "model": self.config["model"],
+            "messages": prompts,
+            "temperature": 0.2,
+        }
+        return await self._call_api(url, headers, payload)
+
     async def _call_api(self, url, headers, payload) -> str:
         async with httpx.AsyncClient(timeout=TIMEOUT_MAX) as client:
             for attempt in range(MAX_RETRIES):
                 response = await client.post(url, headers=headers, json=payload)
-                print("API Response: ", response.json())
                 status_code = response.status_code
+                if is_context_length_error(status_code, response.text):
+                    # 413 は JSON 以外の本文のこともあるため、応答の表示より先に判定する
+                    raise ContextLengthError(f"{status_code}: {response.text[:500]}")
+                print("API Response: ", response.json())
                 if status_code == 200:
                     data = response.json()
                     return data["choices"][0]["message"]["content"]
@@ -79,35 +79,20 @@ EVAL_SUB_NOVEL_USER_PROMPT = """あなたはライトノベル編集者です。
 
 EVAL_FULL_NOVEL_USER_PROMPT = """あなたはライトノベル編集者です。
 
-以下に、複数のサブエピソード範囲ごとのレビュー結果があります。  
-各レビューは小説の部分的な評価ですが、ここではそれらを総合して **作品全体の最終レビュー** を作成してください。  
+以下に、作品をエピソード範囲ごとに分割して評価したサブレビューのコメントと、  
+それらを文量で加重平均して算出済みの最終スコアがあります。  
+ここではそれらを総合して **作品全体の最終コメントと講評** を作成してください。  
 
 ### 指示
+- 最終スコアは算出済みです。スコアの再計算や変更は行わないでください。  
 - すべてのサブレビューを読み込み、重複や矛盾を整理して統合してください。  
-- 評価スコアは各サブレビューの内容を平均・補正し、全体的な印象に基づいて最終スコアを決定してください。  
 - 強み・弱みのコメントは、各部分レビューで繰り返し指摘された要素を優先しつつ、重要なポイントを抽出してください。  
-- 最後に **総合的な講評** を簡潔にまとめてください。  
+- 最後に **総合的な講評** を、最終スコアと矛盾しないよう簡潔にまとめてください。  
 - ⚠️ **出力は必ずJSON形式のみで行い、説明文や補足などJSON以外の文字列を絶対に含めないこと。**
 
-### 評価基準（1〜10点）
-- 物語のテンポ  
-- キャラクターの魅力  
-- 文体の読みやすさ  
-- 世界観の独自性  
-- 読者ターゲット適合度  
-
 ### 出力フォーマット
 
 {
-  "title": "",
-  "overall_score": 数値（100点満点換算）,
-  "scores": {
-    "tempo": 数値,
-    "characters": 数値,
-    "style": 数値,
-    "worldbuilding": 数値,
-    "target_fit": 数値
-  },
   "comments": {
     "strengths": ["強み1", "強み2", "強み3"],
     "weaknesses": ["改善点1", "改善点2", "改善点3"]
@@ -115,6 +100,72 @@ EVAL_FULL_NOVEL_USER_PROMPT = """あなたはライトノベル編集者です
   "final_summary": "小説全体の総合的な講評をここに記述する"
 }
 
+### 最終スコア（算出済み）
+{final_scores}
+
 ### サブエピソードレビュー
 {sub_reviews}
-"""
\ No newline at end of file
+"""
+
+# 要約プロンプトを変更したら上げる（要約キャッシュのキーに含まれ、古い要約は使われなくなる）
+EPISODE_SUMMARY_PROMPT_VERSION = 1
+
+EPISODE_SUMMARY_USER_PROMPT = """あなたはライトノベル編集者のアシスタントです。
+
+以下は小説の1エピソードの本文です。後で作品全体を評価する編集者が、本文の代わりに読むための要約を作成してください。
+
+### 指示
+- あらすじ（出来事・登場人物の行動と感情の変化）を400字程度で時系列にまとめてください。  
+- 続けて「文体」として、語り口・視点・会話の比率・テンポの特徴を1〜2文で記述してください。  
+- 最後に「引用」として、文体がよく分かる原文の一文を1つだけそのまま引用してください。  
+- 評価や感想は書かないでください。  
+- ⚠️ **出力は要約テキストのみとし、前置きや説明は含めないこと。**
+
+### エピソードタイトル
+{episode_title}
+
+### 本文
+{episode_text}
+"""
+
+EVAL_BATCH_USER_PROMPT = """あなたはライトノベル編集者です。
+
+以下のJSON配列には、互いに無関係な複数の短編小説が含まれています。各作品は "work_id" で識別されます。
+作品ごとに独立して内容を読み、作品全体を評価してください。他の作品と比較・混同しないこと。
+
+### 評価基準（1〜10点）
+
+- 物語のテンポ  
+- キャラクターの魅力  
+- 文体の読みやすさ  
+- 世界観の独自性  
+- 読者ターゲット適合度  
+
+### 出力フォーマット (⚠️ **出力は必ずJSON配列のみで行い、説明文や補足などJSON以外の文字列を絶対に含めないこと。**）
+
+入力のすべての作品について、入力と同じ順序で1件ずつ評価を出力してください。"work_id" は入力の値をそのまま記載してください。
+
+[
+  {{
+    "work_id": "入力の work_id",
+    "title": "",
+    "overall_score": 数値（100点満点換算）,
+    "scores": {{
+      "tempo": 数値,
+      "characters": 数値,
+      "style": 数値,
+      "worldbuilding": 数値,
+      "target_fit": 数値
+    }},
+    "comments": {{
+      "strengths": ["強み1", "強み2", "強み3"],
+      "weaknesses": ["改善点1", "改善点2", "改善点3"]
+    }},
+    "final_summary": "作品全体の総合的な講評をここに記述する"
+  }}
+]
+
+### 小説データ（{work_count} 作品）
+
+{works_json}
+"""
@@ -3,15 +3,110 @@
 import sys
 import json
 import io
-from scrapers.syosetu.scraper import SyosetuScraper
+from scrapers.checkpoint import write_json
+from scrapers.reextract import SCRAPERS
 from pathlib import Path
 
+WORKS_DIR = Path(__file__).resolve().parent.parent / "storage" / "works"
+
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+def re_extract(args):
+    """python scrap.py re-extract [workId ...] [--workers N]"""
+    from scrapers.reextract import reextract_all
+
+    workers = None
+    if '--workers' in args:
+        index = args.index('--workers')
+        workers = int(args[index + 1])
+        args = args[:index] + args[index + 2:]
+
+    results = reextract_all(args or None, workers)
+    result = {
+        "success": bool(results) and all(r['success'] for r in results),
+        "message": "re-extract completed" if results else "no archived works",
+        "works": results,
+    }
+
+    print("###JSON-BEGIN###")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print("###JSON-END###")
+
+    return 0 if result["success"] else 1
+
+def pop_option(args, name, default=None):
+    """args から「name 値」を取り除き、(値, 残りの args) を返す"""
+    if name not in args:
+        return default, args
+    index = args.index(name)
+    return args[index + 1], args[:index] + args[index + 2:]
+
+def crawl(args):
+    """python scrap.py crawl add|run|status ..."""
+    from scrapers.scheduler import CrawlQueue, CrawlScheduler, parse_job_lines
+
+    command = args[0] if args else 'status'
+    args = args[1:]
+    queue = CrawlQueue.from_env()
+    try:
+        if command == 'add':
+            job_file, args = pop_option(args, '--file')
+            priority, args = pop_option(args, '--priority', '0')
+            if job_file:
+                jobs = parse_job_lines(Path(job_file).read_text(encoding="utf-8").splitlines())
+            elif len(args) >= 2:
+                limit = int(args[2]) if len(args) > 2 else None
+                jobs = [(args[0], args[1], limit, int(priority))]
+            else:
+                raise ValueError("Missing required parameters: source and workId")
+            for site, work_id, limit, job_priority in jobs:
+                queue.enqueue(site, work_id, limit, job_priority)
+            result = {"success": True, "message": f"{len(jobs)} jobs queued", "queue": queue.counts()}
+        elif command == 'run':
+            works_per_host, args = pop_option(args, '--works_per_host', '1')
+            worker_id, args = pop_option(args, '--worker_id')
+            scheduler = CrawlScheduler(queue, works_per_host=int(works_per_host), update='--update' in args, worker_id=worker_id)
+            report = scheduler.run()
+            counts = queue.counts()
+            result = {
+                "success": not any(c.get('failed') for c in counts.values()),
+                "message": "crawl completed",
+                "throughput": report,
+                "queue": counts,
+            }
+        elif command == 'status':
+            result = {
+                "success": True,
+                "message": "queue status",
+                "queue": queue.counts(),
+                "leases": queue.leases(),
+                "throughput": queue.throughput(),
+            }
+        else:
+            result = {"success": False, "message": f"Unknown crawl command: {command}"}
+    except ValueError as e:
+        result = {"success": False, "message": str(e)}
+    finally:
+        queue.close()
+
+    print("###JSON-BEGIN###")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print("###JSON-END###")
+
+    return 0 if result["success"] else 1
+
 def main():
     # Get command line arguments
     args = sys.argv[1:]
+
+    # Rebuild storage/works from the raw HTML archive (no network access)
+    if args and args[0] == 're-extract':
+        return re_extract(args[1:])
+
+    # Queue-driven crawl of many works across sites (see scrapers/scheduler.py)
+    if args and args[0] == 'crawl':
+        return crawl(args[1:])
     
     # Validate arguments
     if len(args) < 2:
@@ -22,15 +117,36 @@ def main():
         print(json.dumps(result, indent=2))
         return 1
     
+    # --update: re-fetch only new or revised episodes of a work already in storage/works
+    # --resume: continue an interrupted scrape from its episode checkpoint
+    update = '--update' in args
+    resume = '--resume' in args
+    args = [a for a in args if a not in ('--update', '--resume')]
+
     source = args[0]
     workId = args[1]
     episodes = int(args[2]) if len(args) > 2 and args[2].isdigit() else None
 
+    if source not in SCRAPERS:
+        result = {
+            "success": False,
+            "message": f"Unsupported source: {source} (expected one of {', '.join(SCRAPERS)})",
+        }
+        print(json.dumps(result, indent=2))
+        return 1
+
     data = {}
-    if source == 'syosetu':
-        syosetu_scraper = SyosetuScraper()
-        data = syosetu_scraper.extract_novel_data(workId, episodes)
-    
+    http_cache = None
+    stored_path = WORKS_DIR / f"{workId}.json"
+    scraper = SCRAPERS[source]()
+    if update and stored_path.exists():
+        stored = json.loads(stored_path.read_text(encoding="utf-8"))
+        data = scraper.update_novel_data(workId, stored, episodes)
+    else:
+        data = scraper.extract_novel_data(workId, episodes, resume)
+    if scraper.engine.cache is not None:
+        http_cache = scraper.engine.cache.stats
+
     result = {
         "success": True,
         "message": "scrap completed",
@@ -41,15 +157,20 @@ def main():
         "source": source,
         "workId": workId,
         "episodes": episodes,
+        "http_cache": http_cache,
     }
 
+    # Episodes read from the checkpoint are streamed one at a time into the output
     output_path = Path(f"input/{workId}.json")
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    with output_path.open("w", encoding="utf-8") as f:
+        write_json(data, f, ensure_ascii=False)
 
     print("###JSON-BEGIN###")
-    print(json.dumps(result, indent=2))
+    write_json(result, sys.stdout)
+    print()
     print("###JSON-END###")
+    scraper.discard_checkpoint()
 
     return 0
 
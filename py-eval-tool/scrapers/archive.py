@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+archive.py
+取得した生HTMLの圧縮アーカイブ
+
+ページ本文は SHA-256 をキーに gzip 圧縮して一度だけ保存し（内容アドレス方式）、
+作品ごとのマニフェストに「URL → ハッシュ」を記録します。
+抽出・クリーニング処理を改善したときは、ネットワークを使わずにアーカイブから作品データを作り直せます
+（scrapers/reextract.py）。
+
+設定（環境変数）:
+    SCRAPER_ARCHIVE      0 で無効（既定: 有効）
+    SCRAPER_ARCHIVE_DIR  保存先（既定: storage/archive）
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+ARCHIVE_DIR = Path(__file__).resolve().parent.parent.parent / "storage" / "archive"
+
+
+class RawArchive:
+    """生HTMLの内容アドレス型ストアと、作品ごとのマニフェスト"""
+
+    def __init__(self, archive_dir: Path = ARCHIVE_DIR):
+        self.archive_dir = Path(archive_dir)
+        # 現在のクロールで取得したページ（URL → ハッシュ）
+        self.pages: Dict[str, str] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["RawArchive"]:
+        """環境変数から生成する（SCRAPER_ARCHIVE=0 のときは None）"""
+        if os.environ.get("SCRAPER_ARCHIVE", "1") == "0":
+            return None
+        return cls(Path(os.environ.get("SCRAPER_ARCHIVE_DIR", ARCHIVE_DIR)))
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.archive_dir / "blobs" / digest[:2] / f"{digest}.html.gz"
+
+    def _manifest_path(self, site: str, work_id: str) -> Path:
+        return self.archive_dir / "works" / site / f"{work_id}.json"
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        # 途中で中断されても壊れたファイルを残さない
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    # -----------------------------
+    # 保存
+    # -----------------------------
+    def begin(self) -> None:
+        """作品ごとのクロール開始時に呼ぶ"""
+        self.pages = {}
+
+    def put_blob(self, content: bytes) -> str:
+        """本文を保存してハッシュを返す（同じ内容は一度だけ保存する）"""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            self._atomic_write(path, gzip.compress(content, compresslevel=6))
+        return digest
+
+    def record(self, url: str, content: bytes) -> None:
+        self.pages[url] = self.put_blob(content)
+
+    def save_manifest(self, site: str, work_id: str, limit: Optional[int], merge: bool = False) -> Path:
+        """
+        現在のクロールで取得したページを作品のマニフェストとして保存する。
+        merge=True（差分更新）の場合は、保存済みのマニフェストに今回のページを上書きで追加する。
+        """
+        pages = dict(self.pages)
+        if merge:
+            previous = self.load_manifest(site, work_id)
+            if previous is not None:
+                pages = {**previous["pages"], **pages}
+        manifest = {
+            "site": site,
+            "work_id": work_id,
+            "limit": limit,
+            "archived_at": datetime.now().isoformat(),
+            "pages": pages,
+        }
+        path = self._manifest_path(site, work_id)
+        self._atomic_write(path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+        return path
+
+    # -----------------------------
+    # 参照
+    # -----------------------------
+    def read_blob(self, digest: str) -> bytes:
+        return gzip.decompress(self._blob_path(digest).read_bytes())
+
+    def load_manifest(self, site: str, work_id: str) -> Optional[Dict]:
+        path = self._manifest_path(site, work_id)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def iter_manifests(self) -> Iterator[Dict]:
+        for path in sorted((self.archive_dir / "works").glob("*/*.json")):
+            yield json.loads(path.read_text(encoding="utf-8"))
@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+base.py
+スクレイパー共通の基底クラス
+取得ループ（FetchEngine による並行取得）、ボイラープレート除去、analysis_scope・metrics の算出、
+統合JSONの構築を共通化します。サイト固有の処理はサブクラス（プラグイン）で実装します:
+    site_name           サイト名（'syosetu' / 'kakuyomu'）
+    fetch_work_index()  作品情報とエピソード一覧の取得
+    parse_episode()     エピソードページの解析（本文のクリーニングまで）
+"""
+
+import asyncio
+import math
+import re
+import sys
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup
+
+from scrapers.archive import RawArchive
+from scrapers.boilerplate import BoilerplateRules
+from scrapers.checkpoint import CheckpointEpisodes, EpisodeCheckpoint
+from scrapers.engine import FetchEngine
+from scrapers.http_cache import HttpCache
+from scrapers.parse_pool import ParsePool, parse_workers_from_env
+from scrapers.parsing import parse_html
+from scrapers.politeness import DEFAULT_MIN_INTERVAL, HostPoliteness
+
+
+class BaseScraper:
+    site_name = ""
+    # サイトごとの既定のリクエスト間隔（秒）
+    default_min_interval = DEFAULT_MIN_INTERVAL
+
+    def __init__(self, concurrency: Optional[int] = None, politeness: Optional[HostPoliteness] = None, engine: Optional[FetchEngine] = None, use_checkpoint: bool = True, parse_workers: Optional[int] = None):
+        self.engine = engine or FetchEngine(
+            politeness or HostPoliteness.from_env(min_interval=self.default_min_interval),
+            concurrency,
+            cache=HttpCache.from_env(),
+            archive=RawArchive.from_env(),
+        )
+        # エピソード単位のチェックポイント（aiter_novel_episodes が作品ごとに開く）
+        self.use_checkpoint = use_checkpoint
+        self.checkpoint: Optional[EpisodeCheckpoint] = None
+        # aiter_novel_episodes が設定する作品情報と除去カテゴリの集計
+        self.work_info: Optional[Dict] = None
+        self.removed_categories_aggregate: Dict[str, int] = {}
+        # エピソードページを解析するプロセス数（0 ならワーカースレッドで解析）。プールは _begin_crawl で起動する
+        self.parse_workers = parse_workers_from_env() if parse_workers is None else parse_workers
+        self.parse_pool: Optional[ParsePool] = None
+        # クリーニング用のルール（scrapers/rules/{site_name}.json）
+        self.boilerplate = BoilerplateRules.for_site(self.site_name)
+
+    # -----------------------------
+    # サイト固有（サブクラスで実装）
+    # -----------------------------
+    async def fetch_work_index(self, work_id: str) -> Tuple[Dict, List[Dict]]:
+        """作品情報（title, author, work_url, overview）とエピソード一覧 [{'title', 'url', ...}] を返す"""
+        raise NotImplementedError
+
+    def parse_episode(self, html: bytes, url: str) -> Optional[Dict]:
+        """
+        エピソードページを解析し、{'episode_title', 'content', 'removed_categories', ...} を返す。
+        解析プロセス（scrapers/parse_pool.py）で実行されることがあり、インスタンスへの変更は呼び出し元に反映されない（解析結果の集計は _on_episode_parsed で行う）
+        """
+        raise NotImplementedError
+
+    def _on_episode_parsed(self, data: Dict) -> None:
+        """
+        エピソードの解析結果を集計する場合に実装する（小説家になろうの本文セレクタのヒット率など）。
+        チェックポイントから再開したエピソードでは、本文（content）を除いた解析結果が渡される。
+        """
+
+    # -----------------------------
+    # 取得
+    # -----------------------------
+    async def fetch_soup(self, url: str) -> BeautifulSoup:
+        """ページを取得して BeautifulSoup を返す（解析はワーカースレッドで行い、イベントループを塞がない）"""
+        response = await self.engine.get(url)
+        return await asyncio.to_thread(parse_html, response.content)
+
+    async def scrape_episode(self, url: str) -> Optional[Dict]:
+        """エピソードページを取得して解析する（解析は解析プロセスまたはワーカースレッドで行う）。失敗した場合は None"""
+        try:
+            response = await self.engine.get(url)
+        except Exception as e:
+            print(f"リクエストエラー: {e}")
+            return None
+        try:
+            if self.parse_pool is not None:
+                return await self.parse_pool.parse_episode(type(self), response.content, url)
+            return await asyncio.to_thread(self.parse_episode, response.content, url)
+        except Exception as e:
+            print(f"解析エラー: {e}")
+            return None
+
+    async def aiter_novel_episodes(self, work_id: str, limit: Optional[int] = None, resume: bool = False) -> AsyncIterator[Dict]:
+        """作品情報を self.work_info に格納し、取得できたエピソードを掲載順に1話ずつ返す
+
+        エピソードはホストごとのアクセス制御の範囲で並行に取得し、解析したものから順にチェックポイントに追記する。
+        resume=True なら、チェックポイントに保存済みで改稿されていないエピソードは取得せずにそれを返す。
+        取得に失敗した作品では self.work_info は None のまま、何も返さない。
+        """
+        self._begin_crawl()
+        results = None
+        try:
+            work_info, episodes = await self.fetch_work_index(work_id)
+            total_episodes = len(episodes)
+
+            # エピソード数チェック
+            if limit and limit > total_episodes:
+                print(f"エラー: 指定されたエピソード数({limit})が総エピソード数({total_episodes})を超えています", file=sys.stderr)
+                return
+
+            # 制限適用
+            if limit:
+                episodes = episodes[:limit]
+                print(f"話数制限: {limit}話まで取得します")
+
+            self.work_info = {
+                **work_info,
+                'total_episodes': total_episodes,
+                'site': {'name': self.site_name},
+            }
+
+            checkpoint = self.checkpoint = EpisodeCheckpoint.for_work(self.site_name, work_id) if self.use_checkpoint else None
+            reused = set()
+            if checkpoint is not None:
+                checkpoint.open(resume)
+                reused = {ep['url'] for ep in episodes if checkpoint.reusable(ep)}
+                if reused:
+                    print(f"チェックポイントから再開: 保存済み {len(reused)} 話 / 取得 {len(episodes) - len(reused)} 話")
+
+            targets = [ep for ep in episodes if ep['url'] not in reused]
+            results = self.engine.map_in_order(lambda ep: self.scrape_episode(ep['url']), targets)
+            for i, episode in enumerate(episodes, 1):
+                if episode['url'] in reused:
+                    record, parsed = checkpoint.load(episode['url'])
+                    # 取得し直したエピソードと同じく、サイトごとの集計（_on_episode_parsed）と除去カテゴリの集計を行う
+                    self._on_episode_parsed(parsed)
+                    self._count_removed_categories(parsed.get('removed_categories', []))
+                    yield {**record, 'number': episode.get('number', i)}
+                    continue
+
+                data = await results.__anext__()
+                print(f"[{i}/{len(episodes)}] エピソードを処理中: {episode['title']}{self._rate_label(episode['url'])}")
+                if not data:
+                    print(f"警告: エピソード {i} の取得に失敗しました")
+                    continue
+                record = self._episode_record(i, episode, data)
+                if checkpoint is not None:
+                    checkpoint.append(record, {k: v for k, v in data.items() if k != 'content'})
+                yield record
+
+            await self._save_archive(work_id, limit, merge=bool(reused))
+        finally:
+            if results is not None:
+                await results.aclose()
+            if self.checkpoint is not None:
+                self.checkpoint.close()
+            await self._finish_crawl()
+
+    async def aextract_novel_data(self, work_id: str, limit: Optional[int] = None, resume: bool = False) -> Optional[Dict]:
+        """作品IDから統合JSONデータを抽出（エピソード本文も含む）
+
+        チェックポイントが有効な場合、エピソードはメモリに溜めない。統合JSONの episodes は
+        チェックポイントから掲載順に読み出す CheckpointEpisodes になるため、checkpoint.write_json で保存し、
+        保存し終えたら discard_checkpoint() でチェックポイントを削除すること。
+        """
+        try:
+            scraped_episodes: Sequence[Dict] = []
+            numbers: List[Tuple[str, int]] = []
+            async for episode in self.aiter_novel_episodes(work_id, limit, resume):
+                if self.checkpoint is not None:
+                    numbers.append((episode['url'], episode['number']))
+                else:
+                    scraped_episodes.append(episode)
+            if self.work_info is None:
+                return None
+
+            if self.checkpoint is not None:
+                scraped_episodes = CheckpointEpisodes(self.checkpoint, numbers)
+
+            if not scraped_episodes:
+                print("エラー: 取得できたエピソードがありません", file=sys.stderr)
+                return None
+
+            return self.build_novel_data(scraped_episodes)
+
+        except Exception as e:
+            print(f"エラー: 統合データの取得に失敗しました - {e}", file=sys.stderr)
+            if self.checkpoint is not None and self.checkpoint.entries:
+                print(f"取得済みの {len(self.checkpoint.entries)} 話はチェックポイント（{self.checkpoint.path}）に保存されています。--resume で続きから取得できます", file=sys.stderr)
+            return None
+
+    def extract_novel_data(self, work_id: str, limit: Optional[int] = None, resume: bool = False) -> Optional[Dict]:
+        """aextract_novel_data の同期版（CLI・scrap.py 用）"""
+        return asyncio.run(self.aextract_novel_data(work_id, limit, resume))
+
+    def discard_checkpoint(self) -> None:
+        """統合JSONを保存し終えたら、作品のチェックポイントを削除する"""
+        if self.checkpoint is not None:
+            self.checkpoint.discard()
+            self.checkpoint = None
+
+    async def aupdate_novel_data(self, work_id: str, stored: Dict, limit: Optional[int] = None) -> Optional[Dict]:
+        """保存済みの作品データと現在の目次を比較し、追加・改稿されたエピソードだけを取得して統合する
+
+        エピソードは URL で対応付け、目次に更新日時（updated_at）があればその変化を改稿とみなす。
+        目次から消えたエピソードは除き、取得に失敗したエピソードは保存済みの本文を残す。
+        """
+        self._begin_crawl()
+        try:
+            work_info, toc = await self.fetch_work_index(work_id)
+            total_episodes = len(toc)
+            if limit:
+                toc = toc[:limit]
+
+            stored_by_url = {ep['url']: ep for ep in stored.get('episodes', [])}
+            targets = [ep for ep in toc if ep['url'] not in stored_by_url or stored_by_url[ep['url']].get('updated_at') != ep.get('updated_at')]
+            added = sum(1 for ep in targets if ep['url'] not in stored_by_url)
+            print(f"差分: 追加 {added} 話 / 改稿 {len(targets) - added} 話 / 変更なし {len(toc) - len(targets)} 話")
+
+            self.work_info = {
+                **work_info,
+                'total_episodes': total_episodes,
+                'site': {'name': self.site_name},
+            }
+
+            fetched: Dict[str, Dict] = {}
+            results = self.engine.map_in_order(lambda ep: self.scrape_episode(ep['url']), targets)
+            i = 0
+            async for data in results:
+                episode = targets[i]
+                i += 1
+                print(f"[{i}/{len(targets)}] エピソードを処理中: {episode['title']}{self._rate_label(episode['url'])}")
+                if not data:
+                    print(f"警告: エピソード {episode['url']} の取得に失敗しました")
+                    continue
+                fetched[episode['url']] = data
+
+            merged: List[Dict] = []
+            for number, episode in enumerate(toc, 1):
+                if episode['url'] in fetched:
+                    merged.append(self._episode_record(number, episode, fetched[episode['url']]))
+                elif episode['url'] in stored_by_url:
+                    # 取得しないエピソードの除去カテゴリは、保存済みのエピソードに記録したものを集計する
+                    record = stored_by_url[episode['url']]
+                    self._count_removed_categories(record.get('removed_categories', []))
+                    merged.append({**record, 'number': episode.get('number', number)})
+            if not merged:
+                print("エラー: 取得できたエピソードがありません", file=sys.stderr)
+                return None
+
+            # 作品ページからタイトル・作者を取れなかった場合は、保存済みの値を使う
+            for key in ('title', 'author'):
+                if self.work_info.get(key) in (None, '', 'Unknown') and stored.get(key):
+                    self.work_info[key] = stored[key]
+
+            await self._save_archive(work_id, limit, merge=True)
+            return self.build_novel_data(merged)
+
+        except Exception as e:
+            print(f"エラー: 作品データの更新に失敗しました - {e}", file=sys.stderr)
+            return None
+        finally:
+            await self._finish_crawl()
+
+    def update_novel_data(self, work_id: str, stored: Dict, limit: Optional[int] = None) -> Optional[Dict]:
+        """aupdate_novel_data の同期版（CLI・scrap.py 用）"""
+        return asyncio.run(self.aupdate_novel_data(work_id, stored, limit))
+
+    def _begin_crawl(self) -> None:
+        self.work_info = None
+        self.checkpoint = None
+        self.removed_categories_aggregate = {}
+        self.parse_pool = ParsePool.shared(self.parse_workers)
+        if self.engine.cache is not None:
+            self.engine.cache.reset_stats()
+        if self.engine.archive is not None:
+            self.engine.archive.begin()
+
+    async def _save_archive(self, work_id: str, limit: Optional[int], merge: bool = False) -> None:
+        if self.engine.archive is not None:
+            path = await asyncio.to_thread(self.engine.archive.save_manifest, self.site_name, work_id, limit, merge)
+            print(f"生HTMLを保存しました: {path}")
+
+    async def _finish_crawl(self) -> None:
+        await self.engine.aclose()
+        if self.engine.cache is not None:
+            print(f"HTTPキャッシュ: {self.engine.cache.summary()}")
+
+    def _rate_label(self, url: str) -> str:
+        """進捗表示に添える現在の取得ペース（適応制御が無効なら表示しない）"""
+        politeness = self.engine.politeness
+        if not politeness.adaptive:
+            return ''
+        label = politeness.describe(url)
+        return f"（{label}）" if label else ''
+
+    def _episode_record(self, number: int, episode: Dict, data: Dict) -> Dict:
+        """目次の項目と解析結果から、統合JSONのエピソードを作る（除去カテゴリも集計する）"""
+        self._on_episode_parsed(data)
+        self._count_removed_categories(data.get('removed_categories', []))
+        record = {
+            # 目次が話数を持つ場合（小説家になろう）はそれを使う
+            'number': episode.get('number', number),
+            'title': data['episode_title'],
+            'url': episode['url'],
+            'text': data['content'],
+            'length': len(data['content']),
+            # 差分更新で、取得しないエピソードの除去カテゴリを集計し直すために残す（評価プロンプトからは除く）
+            'removed_categories': data.get('removed_categories', []),
+        }
+        # 差分更新で改稿を判定するため、目次の更新日時を残す
+        if episode.get('updated_at'):
+            record['updated_at'] = episode['updated_at']
+        return record
+
+    def _count_removed_categories(self, categories: List[str]) -> None:
+        for cat in categories:
+            self.removed_categories_aggregate[cat] = self.removed_categories_aggregate.get(cat, 0) + 1
+
+    # -----------------------------
+    # 統合JSON
+    # -----------------------------
+    def build_novel_data(self, scraped_episodes: Sequence[Dict]) -> Dict:
+        """aiter_novel_episodes の結果（リストか CheckpointEpisodes）から統合JSONを構築"""
+        # analysis_scope の生成
+        analysis_scope = self._build_analysis_slices(scraped_episodes)
+
+        # metrics の算出
+        metrics = self._compute_metrics(scraped_episodes)
+
+        info = self.work_info
+        # 統合JSONを構築
+        result = {
+            'title': info['title'],
+            'author': info['author'],
+            'work_url': info['work_url'],
+            'overview': info['overview'],
+            'total_episodes': info['total_episodes'],
+            'scraped_episodes': len(scraped_episodes),
+            'episodes': scraped_episodes,
+            'analysis_scope': analysis_scope,
+            'cleaning': {
+                'removed_boilerplates': bool(self.removed_categories_aggregate),
+                'notes': [f"removed: {cat} ({cnt})" for cat, cnt in sorted(self.removed_categories_aggregate.items(), key=lambda x: (-x[1], x[0]))]
+            },
+            'site': info['site'],
+            'metrics': metrics
+        }
+        return result
+
+    def _clean_episode_text(self, text: str) -> Tuple[str, List[str]]:
+        """エピソード本文から評価依頼やSNS誘導などのボイラープレートを除去し、除去カテゴリを返す。
+
+        単純な段落フィルタリングで安全側に。強ヒット（footer_heading 等）や複数ヒットで除去。
+        """
+        if not text:
+            return text, []
+
+        normalized = re.sub(r"\r\n?", "\n", text).strip()
+        if not normalized:
+            return "", []
+
+        original_len = len(normalized)
+        MIN_CHARS = 600
+        MIN_RATIO = 0.6
+
+        # 各行のヒットカテゴリは1回だけ判定し、厳格・非厳格の両方の判定に使う
+        lines = re.split(r"\n+", normalized)
+        hits = [self.boilerplate.classify(ln) for ln in lines]
+        strong_categories = self.boilerplate.strong_categories
+
+        def perform_cleaning(strict: bool) -> Tuple[str, List[str]]:
+            removed: List[str] = []
+            cleaned_lines: List[str] = []
+            total = len(lines)
+            for idx, (ln, hit) in enumerate(zip(lines, hits)):
+                strong = any(cat in strong_categories for cat in hit)
+                if strict:
+                    is_edge = (idx < 3) or (total - idx <= 3)
+                    should_remove = strong or (is_edge and hit) or (len(hit) >= 2)
+                else:
+                    should_remove = strong
+
+                if should_remove:
+                    removed.extend(hit if hit else ["misc"])
+                    continue
+                cleaned_lines.append(ln)
+
+            cleaned_text = "\n\n".join(cleaned_lines).strip()
+            cleaned_text = re.sub(r"\n{3,}", "\n\n", cleaned_text)
+            return cleaned_text, sorted(set(removed))
+
+        def is_sufficient(cleaned_text: str) -> bool:
+            cleaned_len = len(cleaned_text)
+            if cleaned_len == 0:
+                return False
+            if original_len >= MIN_CHARS and cleaned_len < MIN_CHARS:
+                return False
+            if cleaned_len < int(original_len * MIN_RATIO):
+                return False
+            return True
+
+        strict_cleaned, strict_removed = perform_cleaning(strict=True)
+        if is_sufficient(strict_cleaned):
+            return strict_cleaned, strict_removed
+
+        strong_cleaned, strong_removed = perform_cleaning(strict=False)
+        if is_sufficient(strong_cleaned):
+            return strong_cleaned, strong_removed
+
+        fallback_text = re.sub(r"\n{3,}", "\n\n", normalized)
+        return fallback_text, []
+
+    def _build_analysis_slices(self, episodes: Sequence[Dict]) -> Dict:
+        """analysis_scope.slices を構築。
+        目安: 各1800字。ep1=hook、中間=turning_point、最終=payoff。
+        """
+        n = len(episodes)
+        if n == 0:
+            return { 'episodes_included': [], 'slices': [] }
+
+        TARGET_SIZE = 1800
+        MIN_EP_LENGTH = 1500
+
+        def normalize_text(value: str) -> str:
+            if not value:
+                return ''
+            text = re.sub(r"\r\n?", "\n", value)
+            text = re.sub(r"\n{3,}", "\n\n", text.strip())
+            return text
+
+        def get_episode_text(idx: int) -> str:
+            if idx < 0 or idx >= n:
+                return ''
+            return normalize_text(episodes[idx].get('text', '') or '')
+
+        # 本文の長さは1回の走査で求め、本文は選んだエピソードの分だけ読み出す
+        episode_lengths = [len(normalize_text(episode.get('text', '') or '')) for episode in episodes]
+
+        def base_indices() -> List[int]:
+            if n >= 10:
+                indices = [0, 4, 9]
+            else:
+                mid = max(0, math.ceil(n / 2) - 1)
+                indices = [0, mid, n - 1]
+            while len(indices) < 3:
+                indices.append(indices[-1])
+            return indices[:3]
+
+        def search_nearest(start_idx: int, avoid_used: bool, min_length: int) -> Optional[int]:
+            offsets = [0]
+            for step in range(1, n):
+                offsets.extend([step, -step])
+
+            best_idx = None
+            best_len = -1
+            for offset in offsets:
+                candidate = start_idx + offset
+                if candidate < 0 or candidate >= n:
+                    continue
+                if avoid_used and candidate in selected_indices:
+                    continue
+                text_len = episode_lengths[candidate]
+                if text_len == 0:
+                    continue
+                if text_len >= min_length:
+                    return candidate
+                if text_len > best_len:
+                    best_len = text_len
+                    best_idx = candidate
+            return best_idx
+
+        def pick_episode(start_idx: int) -> int:
+            attempts = [
+                (True, MIN_EP_LENGTH),      # 1. 未使用で十分な長さ
+                (False, MIN_EP_LENGTH),     # 2. 重複許容だが十分な長さ
+                (False, 1),                 # 3. 最長のもの
+            ]
+            for avoid_used, min_len in attempts:
+                candidate = search_nearest(start_idx, avoid_used=avoid_used, min_length=min_len)
+                if candidate is not None:
+                    return candidate
+            return max(0, min(start_idx, n - 1))
+
+        def extract_chunk(text: str, position: int) -> str:
+            if not text:
+                return ''
+            if len(text) <= TARGET_SIZE:
+                return text
+            if position == 0:
+                start = 0
+            elif position == 1:
+                mid = len(text) // 2
+                start = max(0, min(mid - TARGET_SIZE // 2, len(text) - TARGET_SIZE))
+            else:
+                start = len(text) - TARGET_SIZE
+            end = start + TARGET_SIZE
+            return text[start:end]
+
+        SLICE_MIN = 1500
+        kinds_map = {0: 'hook', 1: 'turning_point', 2: 'payoff'}
+        selected_indices: List[int] = []
+        slices: List[Dict] = []
+        sorted_by_length = sorted(range(n), key=lambda i: episode_lengths[i], reverse=True)
+
+        def choose_fallback(original_idx: int, position: int) -> int:
+            # 1) 未使用かつ十分な長さ
+            for idx in sorted_by_length:
+                if idx == original_idx or idx in selected_indices:
+                    continue
+                if episode_lengths[idx] >= SLICE_MIN:
+                    return idx
+            # 2) 既使用でも十分な長さ
+            for idx in sorted_by_length:
+                if idx == original_idx:
+                    continue
+                if episode_lengths[idx] >= SLICE_MIN:
+                    return idx
+            # 3) 最長（既使用含む）
+            for idx in sorted_by_length:
+                if episode_lengths[idx] > 0:
+                    return idx
+            return original_idx
+
+        for position, base_idx in enumerate(base_indices()):
+            chosen_idx = pick_episode(base_idx)
+            text = get_episode_text(chosen_idx)
+            chunk = extract_chunk(text, position)
+
+            if len(chunk) < SLICE_MIN:
+                fallback_idx = choose_fallback(chosen_idx, position)
+                if fallback_idx != chosen_idx:
+                    chosen_idx = fallback_idx
+                    text = get_episode_text(chosen_idx)
+                    chunk = extract_chunk(text, position)
+
+            if not chunk:
+                fallback_idx = choose_fallback(chosen_idx, position)
+                chosen_idx = fallback_idx
+                text = get_episode_text(chosen_idx)
+                chunk = extract_chunk(text, position)
+
+            selected_indices.append(chosen_idx)
+            ep_number = episodes[chosen_idx].get('number', chosen_idx + 1)
+            slices.append({
+                'ep': ep_number,
+                'kind': kinds_map.get(position, 'slice'),
+                'text': chunk
+            })
+
+        episodes_included: List[int] = []
+        for idx in selected_indices:
+            ep_number = episodes[idx].get('number', idx + 1)
+            if ep_number not in episodes_included:
+                episodes_included.append(ep_number)
+
+        return { 'episodes_included': episodes_included, 'slices': slices }
+
+    def _compute_metrics(self, episodes: Iterable[Dict]) -> Dict:
+        """軽量メトリクスを算出。
+
+        値は本文を連結した文字列（"\n\n" 区切り）に対するもので、エピソードを1話ずつ読みながら求める
+        （チェックポイントから組み立てる場合に、全話の本文を同時にメモリへ載せないため）。
+        """
+        metrics = _TextMetrics()
+        for ep in episodes:
+            if ep.get('text'):
+                metrics.add(ep['text'])
+        return metrics.result()
+
+
+SENTENCE_END = re.compile(r'[。！？!?]')
+
+
+class _TextMetrics:
+    """
+    エピソードの本文を "\n\n" で連結した文字列に対する軽量メトリクス（会話文割合・ユニーク3-gram率・平均文長）を、
+    本文を1話ずつ受け取って求める。連結した文字列を一度に作って数えた場合と同じ値になる。
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.total_chars = 0
+        # 会話文（「…」）: 閉じていない「からの文字数（会話文の外なら None）
+        self.dialogue_len = 0
+        self.open_dialogue: Optional[int] = None
+        # 文（。！？!? で区切った断片）: 書きかけの断片の文字数と、空白以外を含むか
+        self.sentence_count = 0
+        self.sentence_chars = 0
+        self.partial_len = 0
+        self.partial_has_text = False
+        # 3-gram: 開始位置が total_chars - 2 未満のものを数える。まだ確定しない末尾は gram_tail に残す
+        self.grams = set()
+        self.gram_tail = ''
+        self.gram_start = 0
+
+    def add(self, text: str) -> None:
+        chunk = text if self.n == 0 else "\n\n" + text
+        self.n += 1
+        self.total_chars += len(text)
+        self._add_dialogue(chunk)
+        self._add_sentences(chunk)
+
+        buffer = self.gram_tail + chunk
+        ready = self.total_chars - 2 - self.gram_start
+        if ready > 0:
+            self.grams.update(buffer[i:i+3] for i in range(ready))
+            buffer = buffer[ready:]
+            self.gram_start += ready
+        self.gram_tail = buffer
+
+    def _add_dialogue(self, chunk: str) -> None:
+        # re.findall(r'「[^」]*」', 連結した文字列) と同じ範囲を数える
+        pos = 0
+        while True:
+            if self.open_dialogue is None:
+                start = chunk.find('「', pos)
+                if start < 0:
+                    return
+                self.open_dialogue, pos = 0, start
+            end = chunk.find('」', pos)
+            if end < 0:
+                self.open_dialogue += len(chunk) - pos
+                return
+            self.dialogue_len += self.open_dialogue + end + 1 - pos
+            self.open_dialogue, pos = None, end + 1
+
+    def _add_sentences(self, chunk: str) -> None:
+        # re.split(r'[。！？!?]', 連結した文字列) の断片のうち、空白以外を含むものを数える
+        pieces = SENTENCE_END.split(chunk)
+        for i, piece in enumerate(pieces):
+            if i > 0:
+                self._finish_sentence()
+            self.partial_len += len(piece)
+            self.partial_has_text = self.partial_has_text or bool(piece.strip())
+
+    def _finish_sentence(self) -> None:
+        if self.partial_has_text:
+            self.sentence_count += 1
+            self.sentence_chars += self.partial_len
+        self.partial_len, self.partial_has_text = 0, False
+
+    def result(self) -> Dict:
+        total_chars, n = self.total_chars, self.n
+        if total_chars == 0:
+            return { 'total_chars': 0, 'avg_chars_per_episode': 0.0, 'dialogue_ratio': 0.0, 'unique_trigram_ratio': 0.0, 'mean_sentence_len': 0.0 }
+        self._finish_sentence()
+
+        # 会話文割合
+        dialogue_ratio = float(self.dialogue_len) / float(total_chars) if total_chars else 0.0
+
+        # ユニーク3-gram率
+        gram_count = max(0, total_chars - 2)
+        unique_trigram_ratio = (len(self.grams) / gram_count) if gram_count else 0.0
+
+        # 平均文長
+        mean_sentence_len = (self.sentence_chars / self.sentence_count) if self.sentence_count else 0.0
+
+        return {
+            'total_chars': total_chars,
+            'avg_chars_per_episode': round(total_chars / n, 2) if n else 0.0,
+            'dialogue_ratio': round(dialogue_ratio, 6),
+            'unique_trigram_ratio': round(unique_trigram_ratio, 6),
+            'mean_sentence_len': round(mean_sentence_len, 2)
+        }
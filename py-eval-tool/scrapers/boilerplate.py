@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+boilerplate.py
+ボイラープレート（評価依頼・SNS 誘導・あとがきなど）の判定ルール
+
+ルールはサイトごとのデータファイル（scrapers/rules/{site}.json）に、カテゴリ名と正規表現の組として定義します:
+    {
+      "strong_categories": ["footer_heading"],            # 1行だけのヒットでも除去するカテゴリ
+      "patterns": [{"category": "stars_request", "pattern": "[★☆]{1,}|..."}, ...]
+    }
+全カテゴリの正規表現は1つの正規表現（選択 |）にまとめてコンパイルし、各行を1回の検索でふるい分けます。
+どのカテゴリにもヒットしない行（本文のほとんど）はこの1回で判定が終わり、ヒットした行だけカテゴリごとの正規表現で
+ヒットしたカテゴリを特定します（結果はカテゴリを1つずつ検索した場合と同じです）。
+まとめた正規表現は regex モジュール（tiktoken の依存として requirements.txt に含まれる）でコンパイルします。
+標準の re では選択の各分岐を位置ごとに試すため、カテゴリごとに検索するより遅くなります。
+regex が無い環境では、従来どおりカテゴリごとに検索します。
+
+設定（環境変数）:
+    SCRAPER_RULES_DIR  ルールファイルの置き場所（既定: scrapers/rules）
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+try:
+    import regex
+    REGEX_AVAILABLE = True
+except ImportError:
+    REGEX_AVAILABLE = False
+
+RULES_DIR = Path(__file__).resolve().parent / "rules"
+
+
+class BoilerplateRules:
+    """カテゴリごとの正規表現と、それらをまとめた1つの正規表現"""
+
+    def __init__(self, patterns: Sequence[Tuple[str, str]], strong_categories: Sequence[str] = ("footer_heading",)):
+        self.patterns: List[Tuple[str, re.Pattern]] = [(category, re.compile(pattern)) for category, pattern in patterns]
+        self.strong_categories: Tuple[str, ...] = tuple(strong_categories)
+        # 各パターンを (?:...) で囲んで連結する（パターン内のグループ・アンカーはそのまま働く）
+        self.combined = None
+        if patterns and REGEX_AVAILABLE:
+            self.combined = regex.compile("|".join(f"(?:{pattern})" for _, pattern in patterns))
+
+    @classmethod
+    def from_file(cls, path: Path) -> "BoilerplateRules":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(
+            [(rule["category"], rule["pattern"]) for rule in data["patterns"]],
+            data.get("strong_categories", ("footer_heading",)),
+        )
+
+    @classmethod
+    def for_site(cls, site: str) -> "BoilerplateRules":
+        """サイトのルールファイルを読み込む（ファイルが無いサイトはルールなし）"""
+        path = Path(os.environ.get("SCRAPER_RULES_DIR", RULES_DIR)) / f"{site}.json"
+        if not site or not path.exists():
+            return cls([])
+        return cls.from_file(path)
+
+    def classify(self, line: str) -> List[str]:
+        """行がヒットしたカテゴリ（ルールの定義順）。ヒットしなければ空"""
+        if self.combined is not None and not self.combined.search(line):
+            return []
+        return [category for category, pattern in self.patterns if pattern.search(line)]
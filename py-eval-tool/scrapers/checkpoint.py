@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+checkpoint.py
+エピソード単位のチェックポイント（JSONL）
+
+解析したエピソードを1行ずつ storage/checkpoints/{site}/{work_id}.jsonl に追記します。
+取得が途中で失敗したり、プロセスが強制終了されたりしても、それまでのエピソードは残ります。
+再開（resume）時は保存済みのエピソードを読み込み、未取得・改稿されたものだけを取得します。
+再開せずに取得し直す場合、既存のチェックポイントは {work_id}.jsonl.bak に退避します（削除はしません）。
+統合JSONは、チェックポイントからエピソードを掲載順に1話ずつ読み出して組み立て、write_json で書き出します
+（全話の本文を同時にメモリへ載せません）。
+
+設定（環境変数）:
+    SCRAPER_CHECKPOINT      0 で無効（既定: 有効）
+    SCRAPER_CHECKPOINT_DIR  保存先（既定: storage/checkpoints）
+"""
+
+import json
+import os
+from collections.abc import Sequence
+from pathlib import Path
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+CHECKPOINT_DIR = Path(__file__).resolve().parent.parent.parent / "storage" / "checkpoints"
+
+
+class EpisodeCheckpoint:
+    """1作品分のエピソードを追記していく JSONL ファイル"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        # URL → (行の開始位置, 目次の更新日時)。同じ URL が複数あれば後の行を使う
+        self.entries: Dict[str, Tuple[int, Optional[str]]] = {}
+        self._file = None
+
+    @classmethod
+    def for_work(cls, site: str, work_id: str) -> Optional["EpisodeCheckpoint"]:
+        """環境変数から作品のチェックポイントを作る（SCRAPER_CHECKPOINT=0 のときは None）"""
+        if os.environ.get("SCRAPER_CHECKPOINT", "1") == "0":
+            return None
+        return cls(Path(os.environ.get("SCRAPER_CHECKPOINT_DIR", CHECKPOINT_DIR)) / site / f"{work_id}.jsonl")
+
+    def open(self, resume: bool) -> None:
+        """
+        追記用に開く。resume=True なら保存済みの行を読み込み（書きかけの末尾の行は捨てる）、
+        False なら空のファイルから始める（既存のファイルは .bak に退避する）。
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not resume and self.path.exists() and self.path.stat().st_size > 0:
+            os.replace(self.path, self.backup_path)
+            print(f"既存のチェックポイントを {self.backup_path} に退避しました（続きから取得する場合は --resume を付けてください）")
+        self.entries = {}
+        valid_size = 0
+        if resume and self.path.exists():
+            with self.path.open("rb") as f:
+                offset = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    self.entries[entry["record"]["url"]] = (offset, entry["record"].get("updated_at"))
+                    offset += len(line)
+                valid_size = offset
+        self._file = self.path.open("r+b" if resume and self.path.exists() else "wb")
+        self._file.truncate(valid_size)
+        self._file.seek(valid_size)
+
+    def reusable(self, episode: Dict) -> bool:
+        """目次の項目 episode が保存済みで、改稿されていない（更新日時が同じ）か"""
+        entry = self.entries.get(episode["url"])
+        return entry is not None and entry[1] == episode.get("updated_at")
+
+    def append(self, record: Dict, parsed: Dict) -> None:
+        """
+        エピソードを1行追記する（強制終了に備えて行ごとにフラッシュする）。
+        parsed は本文を除いた解析結果（除去カテゴリなど。再開時にスクレイパーの集計をやり直すために残す）。
+        """
+        offset = self._file.tell()
+        line = json.dumps({"record": record, "parsed": parsed}, ensure_ascii=False)
+        self._file.write(line.encode("utf-8") + b"\n")
+        self._file.flush()
+        self.entries[record["url"]] = (offset, record.get("updated_at"))
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_at(self, f, offset: int) -> Dict:
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def load(self, url: str) -> Tuple[Dict, Dict]:
+        """保存済みのエピソードと、本文を除いた解析結果"""
+        with self.path.open("rb") as f:
+            entry = self._read_at(f, self.entries[url][0])
+        # 解析結果を残す前の形式の行は、除去カテゴリだけを持つ
+        parsed = entry.get("parsed") or {"removed_categories": entry.get("removed_categories", [])}
+        return entry["record"], parsed
+
+    def iter_records(self, urls: Iterable[str]) -> Iterator[Dict]:
+        """urls の順に保存済みのエピソードを1件ずつ読み出す"""
+        with self.path.open("rb") as f:
+            for url in urls:
+                yield self._read_at(f, self.entries[url][0])["record"]
+
+    @property
+    def backup_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".bak")
+
+    def discard(self) -> None:
+        """統合JSONを保存し終えたチェックポイント（退避したものを含む）を削除する"""
+        self.close()
+        self.path.unlink(missing_ok=True)
+        self.backup_path.unlink(missing_ok=True)
+
+
+class CheckpointEpisodes(Sequence):
+    """
+    チェックポイントに保存したエピソードを掲載順に並べたシーケンス。
+    本文は保持せず、参照・走査のたびにチェックポイントから読み出す（統合JSONの episodes に使う）。
+    """
+
+    def __init__(self, checkpoint: EpisodeCheckpoint, numbers: List[Tuple[str, int]]):
+        self.checkpoint = checkpoint
+        # 掲載順の (URL, 話数)
+        self.numbers = numbers
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def __getitem__(self, index: int) -> Dict:
+        url, number = self.numbers[index]
+        record, _ = self.checkpoint.load(url)
+        return {**record, 'number': number}
+
+    def __iter__(self) -> Iterator[Dict]:
+        records = self.checkpoint.iter_records(url for url, _ in self.numbers)
+        for record, (_, number) in zip(records, self.numbers):
+            yield {**record, 'number': number}
+
+
+def write_json(value, fp: IO[str], ensure_ascii: bool = True, indent: int = 2, level: int = 0) -> None:
+    """
+    json.dump(value, fp, ensure_ascii=ensure_ascii, indent=indent) と同じ JSON を書き出す。
+    CheckpointEpisodes はエピソードを1話ずつ読み出しながら書くため、全話の本文を同時にメモリへ載せない。
+    """
+    encoder = json.JSONEncoder(ensure_ascii=ensure_ascii, indent=indent)
+    pad = "\n" + " " * (indent * (level + 1))
+    if isinstance(value, dict) and value and all(isinstance(key, str) for key in value):
+        fp.write("{")
+        for i, (key, item) in enumerate(value.items()):
+            fp.write(("," if i else "") + pad + encoder.encode(key) + ": ")
+            write_json(item, fp, ensure_ascii, indent, level + 1)
+        fp.write("\n" + " " * (indent * level) + "}")
+    elif isinstance(value, CheckpointEpisodes):
+        if not value:
+            fp.write("[]")
+            return
+        fp.write("[")
+        for i, item in enumerate(value):
+            fp.write(("," if i else "") + pad + encoder.encode(item).replace("\n", pad))
+        fp.write("\n" + " " * (indent * level) + "]")
+    else:
+        # 文字列中の改行はエスケープされるため、行頭に字下げを足せば入れ子の位置に合う
+        fp.write(encoder.encode(value).replace("\n", "\n" + " " * (indent * level)))
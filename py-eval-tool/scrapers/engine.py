@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+engine.py
+スクレイパー共通の非同期取得エンジン
+httpx.AsyncClient（HTTP/2・コネクションプール）で、ホストごとのアクセス制御・
+リトライ・User-Agent の切り替えを一元化します。サイト固有の解析は各スクレイパー（プラグイン）が担当します。
+
+クライアント（とプール済みの keep-alive 接続）はクロール全体で使い回し、aclose() で閉じます。
+HTTP/2 は h2 パッケージ（pip install "httpx[http2]"）がある場合のみ有効になります。
+
+設定（環境変数）:
+    SCRAPER_ROTATE_UA  1 でリクエストごとに User-Agent ヘッダを切り替える（既定: 0、クロール中は同じ UA）
+"""
+
+import asyncio
+import os
+import random
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, TypeVar
+
+import httpx
+
+from scrapers.archive import RawArchive
+from scrapers.http_cache import HttpCache
+from scrapers.politeness import HostPoliteness, scraper_concurrency
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0 Safari/537.36'
+]
+
+DEFAULT_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ja,en-US;q=0.7,en;q=0.3',
+    'DNT': '1',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# 従来の urllib3 Retry と同じ条件（total=3, backoff_factor=1.2）
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 1.2
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 60
+TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+# アクセス間隔（カクヨムは既定 1 秒）の間も接続を保持する
+KEEPALIVE_EXPIRY = 30.0
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class FetchEngine:
+    """
+    スクレイパー共通の非同期取得エンジン。
+    クライアントはイベントループごとに遅延生成し、クロール終了時に aclose() で閉じる。
+    """
+
+    def __init__(self, politeness: Optional[HostPoliteness] = None, concurrency: Optional[int] = None, http2: bool = True, cache: Optional[HttpCache] = None, archive: Optional[RawArchive] = None, rotate_user_agent: Optional[bool] = None, transport_wrapper: Optional[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]] = None):
+        self.politeness = politeness or HostPoliteness.from_env()
+        # 指定した場合は通信路（httpx のトランスポート）を差し替える（記録・リプレイ用、scrapers/replay.py）
+        self.transport_wrapper = transport_wrapper
+        # 指定した場合は条件付きリクエストでキャッシュ済みのページを再利用する
+        self.cache = cache
+        # 指定した場合は取得したページの生HTMLを保存する
+        self.archive = archive
+        self.concurrency = concurrency or scraper_concurrency()
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.headers = {'User-Agent': random.choice(USER_AGENTS), **DEFAULT_HEADERS}
+        if rotate_user_agent is None:
+            rotate_user_agent = os.environ.get("SCRAPER_ROTATE_UA", "0") == "1"
+        self.rotate_user_agent = rotate_user_agent
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _new_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.concurrency * 2,
+            max_keepalive_connections=self.concurrency * 2,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+        transport = None
+        if self.transport_wrapper is not None:
+            transport = self.transport_wrapper(httpx.AsyncHTTPTransport(http2=self.http2, limits=limits))
+        return httpx.AsyncClient(
+            http2=self.http2,
+            headers=self.headers,
+            limits=limits,
+            timeout=TIMEOUT,
+            follow_redirects=True,
+            transport=transport,
+        )
+
+    def _request_headers(self, headers: Optional[Dict[str, str]] = None) -> Optional[Dict[str, str]]:
+        """リクエストごとのヘッダ（UA の切り替えは接続を張り直さず、ヘッダだけで行う）"""
+        if not self.rotate_user_agent:
+            return headers
+        return {**(headers or {}), 'User-Agent': random.choice(USER_AGENTS)}
+
+    async def _acquire_client(self) -> httpx.AsyncClient:
+        """クロール中に使い回すクライアントを返す（無ければ作る）"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 別のイベントループ（asyncio.run の再呼び出し）では新しいクライアントを使う
+            # （前のループの接続はそのループと共に破棄されている）
+            self._loop = loop
+            self._client = None
+        if self._client is None:
+            self._client = self._new_client()
+        return self._client
+
+    async def get(self, url: str) -> httpx.Response:
+        """
+        ホストごとのアクセス制御の下で GET する。
+        キャッシュがあれば If-None-Match / If-Modified-Since を付け、304 なら保存済みの本文を返す。
+        429/5xx と通信エラーは指数バックオフ（429/503 は Retry-After を優先）で再試行し、
+        最終的に失敗した場合は例外を送出する。
+        """
+        response = await self._get(url)
+        if self.archive is not None:
+            await asyncio.to_thread(self.archive.record, url, response.content)
+        return response
+
+    async def _get(self, url: str) -> httpx.Response:
+        if self.cache is None:
+            return await self._fetch(url)
+
+        entry = await asyncio.to_thread(self.cache.lookup, url)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.stats["hit"] += 1
+            return await asyncio.to_thread(self.cache.to_response, entry)
+
+        response = await self._fetch(url, self.cache.conditional_headers(entry) if entry else None)
+        if response.status_code == 304 and entry is not None:
+            self.cache.stats["revalidated"] += 1
+            await asyncio.to_thread(self.cache.revalidate, entry, response)
+            return await asyncio.to_thread(self.cache.to_response, entry)
+
+        self.cache.stats["miss"] += 1
+        await asyncio.to_thread(self.cache.store, response)
+        return response
+
+    async def _fetch(self, url: str, headers: Optional[dict] = None) -> httpx.Response:
+        """再試行付きで GET する（304 はそのまま返す）"""
+        client = await self._acquire_client()
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with self.politeness.slot(url) as slot:
+                    response = await client.get(url, headers=self._request_headers(headers))
+                    slot.done(response)
+            except httpx.TransportError:
+                if attempt >= MAX_RETRIES:
+                    raise
+                await asyncio.sleep(BACKOFF_FACTOR * (2 ** attempt))
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                delay = BACKOFF_FACTOR * (2 ** attempt)
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = min(float(retry_after), MAX_RETRY_AFTER)
+                print(f"[WARN] {response.status_code} {url} → {delay:.1f} 秒待機して再試行 ({attempt + 1}/{MAX_RETRIES})")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+        raise RuntimeError(f"リトライ回数を超えました: {url}")
+
+    async def map_in_order(self, fn: Callable[[T], Awaitable[R]], items: Iterable[T]) -> AsyncIterator[R]:
+        """
+        items を最大 concurrency 並列で fn に渡し、結果を items の順に返す。
+        先読みは concurrency の2倍までに抑える。
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(item: T) -> R:
+            async with semaphore:
+                return await fn(item)
+
+        iterator = iter(items)
+        pending: deque = deque()
+        try:
+            for item in iterator:
+                pending.append(asyncio.create_task(run(item)))
+                if len(pending) >= self.concurrency * 2:
+                    break
+            while pending:
+                result = await pending.popleft()
+                for item in iterator:
+                    pending.append(asyncio.create_task(run(item)))
+                    break
+                yield result
+        finally:
+            # 途中で打ち切られた場合は未完了の取得を取り消す
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self):
+        """このクロールで使ったクライアント（プール済みの接続）を閉じる"""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+http_cache.py
+スクレイパー共通のディスク HTTP キャッシュ（条件付きリクエスト）
+
+取得したページの本文と ETag / Last-Modified を保存し、次回は If-None-Match / If-Modified-Since を付けて
+リクエストします。304 Not Modified が返った場合は保存済みの本文を使います。
+Cache-Control: max-age の範囲内であればリクエスト自体を省略します。
+合計サイズが上限を超えた場合は、最後に使われた時刻が古いものから削除します。
+
+設定（環境変数）:
+    SCRAPER_HTTP_CACHE         0 で無効（既定: 有効）
+    SCRAPER_HTTP_CACHE_DIR     保存先（既定: storage/http_cache）
+    SCRAPER_HTTP_CACHE_MAX_MB  合計サイズの上限・MB（既定: 512）
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+HTTP_CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "storage" / "http_cache"
+DEFAULT_MAX_MB = 512
+# 保存するレスポンスヘッダ（本文は展開済みで保存するため Content-Encoding などは持たない）
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "date")
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _max_age(cache_control: str) -> Optional[int]:
+    """Cache-Control から再利用してよい秒数を返す（no-cache / no-store は 0）"""
+    directives = cache_control.lower()
+    if "no-cache" in directives or "no-store" in directives:
+        return 0
+    match = re.search(r"max-age\s*=\s*(\d+)", directives)
+    return int(match.group(1)) if match else None
+
+
+class HttpCache:
+    """ETag / Last-Modified による条件付きリクエスト用のディスクキャッシュ"""
+
+    def __init__(self, cache_dir: Path = HTTP_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        # hit: ネットワークを使わずに返した / revalidated: 304 で保存済みの本文を返した / miss: 本文を取得した
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0}
+        self._lock = threading.Lock()
+        # キー → (最終使用時刻, 本文サイズ)。初回の保存時にディレクトリを走査して作る
+        self._index: Optional[Dict[str, tuple]] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["HttpCache"]:
+        """環境変数から生成する（SCRAPER_HTTP_CACHE=0 のときは None）"""
+        if os.environ.get("SCRAPER_HTTP_CACHE", "1") == "0":
+            return None
+        return cls(
+            cache_dir=Path(os.environ.get("SCRAPER_HTTP_CACHE_DIR", HTTP_CACHE_DIR)),
+            max_bytes=int(float(os.environ.get("SCRAPER_HTTP_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+        )
+
+    def reset_stats(self) -> None:
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0}
+
+    def summary(self) -> str:
+        return f"ヒット {self.stats['hit']} / 304 {self.stats['revalidated']} / ミス {self.stats['miss']}"
+
+    def _paths(self, key: str) -> tuple:
+        base = self.cache_dir / key[:2] / key
+        return base.with_suffix(".json"), base.with_suffix(".body")
+
+    # -----------------------------
+    # 参照
+    # -----------------------------
+    def lookup(self, url: str) -> Optional[Dict]:
+        """保存済みのエントリ（メタデータ）を返す。無い・壊れている場合は None"""
+        meta_path, body_path = self._paths(url_key(url))
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        try:
+            entry = json.loads(meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            return None
+        return entry if entry.get("url") == url else None
+
+    def is_fresh(self, entry: Dict) -> bool:
+        """Cache-Control: max-age の範囲内であれば True（再検証せずに使える）"""
+        max_age = _max_age(entry["headers"].get("cache-control", ""))
+        return bool(max_age) and time.time() - entry["stored_at"] < max_age
+
+    @staticmethod
+    def conditional_headers(entry: Dict) -> Dict[str, str]:
+        headers = {}
+        if entry["headers"].get("etag"):
+            headers["If-None-Match"] = entry["headers"]["etag"]
+        if entry["headers"].get("last-modified"):
+            headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+        return headers
+
+    def to_response(self, entry: Dict) -> httpx.Response:
+        """保存済みの本文から 200 のレスポンスを組み立てる（最終使用時刻も更新する）"""
+        key = url_key(entry["url"])
+        meta_path, body_path = self._paths(key)
+        content = body_path.read_bytes()
+        now = time.time()
+        os.utime(meta_path, (now, now))
+        with self._lock:
+            if self._index is not None and key in self._index:
+                self._index[key] = (now, self._index[key][1])
+        return httpx.Response(200, headers=entry["headers"], content=content, request=httpx.Request("GET", entry["url"]))
+
+    # -----------------------------
+    # 保存
+    # -----------------------------
+    def store(self, response: httpx.Response) -> None:
+        """検証子（ETag / Last-Modified）か max-age を持つ 200 のレスポンスを保存する"""
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        cache_control = headers.get("cache-control", "").lower()
+        if response.status_code != 200 or "no-store" in cache_control:
+            return
+        if not (headers.get("etag") or headers.get("last-modified") or _max_age(cache_control)):
+            # 条件付きリクエストにも鮮度判定にも使えないため保存しない
+            return
+        url = str(response.request.url)
+        self._write(url, headers, response.content)
+
+    def revalidate(self, entry: Dict, response: httpx.Response) -> None:
+        """304 で返ったヘッダ（新しい検証子・max-age）をエントリに反映する"""
+        for name in STORED_HEADERS:
+            if name in response.headers:
+                entry["headers"][name] = response.headers[name]
+        entry["stored_at"] = time.time()
+        meta_path, _ = self._paths(url_key(entry["url"]))
+        self._atomic_write(meta_path, json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+    def _write(self, url: str, headers: Dict[str, str], content: bytes) -> None:
+        key = url_key(url)
+        meta_path, body_path = self._paths(key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"url": url, "headers": headers, "stored_at": time.time(), "size": len(content)}
+        # 本文を先に書き、メタデータの存在を「保存完了」の印にする
+        self._atomic_write(body_path, content)
+        self._atomic_write(meta_path, json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            index = self._load_index()
+            index[key] = (time.time(), len(content))
+            self._evict(index)
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        # 途中で中断されても壊れたキャッシュを残さない
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    # -----------------------------
+    # 容量管理
+    # -----------------------------
+    def _load_index(self) -> Dict[str, tuple]:
+        if self._index is None:
+            self._index = {}
+            for body_path in self.cache_dir.glob("*/*.body"):
+                meta_path = body_path.with_suffix(".json")
+                if meta_path.exists():
+                    self._index[body_path.stem] = (meta_path.stat().st_mtime, body_path.stat().st_size)
+        return self._index
+
+    def _evict(self, index: Dict[str, tuple]) -> None:
+        """合計サイズが上限を超えていれば、最後に使われた時刻が古いものから削除する"""
+        total = sum(size for _, size in index.values())
+        if total <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(index.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                path.unlink(missing_ok=True)
+            del index[key]
+            total -= size
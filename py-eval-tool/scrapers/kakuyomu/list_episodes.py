@@ -3,6 +3,8 @@
 """
 list_episodes.py
 作品IDからカクヨム作品トップを取得し、全エピソードURLを列挙します。
+作品ページに埋め込まれたデータ（__NEXT_DATA__ の Apollo ステート）があれば1リクエストで目次と作品情報を取得し、
+無い場合のみ目次ページを辿ります。
 
 使用例:
     python list_episodes.py 16818792439429953221
@@ -10,42 +12,35 @@ list_episodes.py
 
 出力:
     既定ではURLを1行ずつ標準出力へ。--json でJSONを出力。
+
+設定（環境変数）:
+    SCRAPER_DEBUG  1 で目次ページの巡回状況（ページごとの件数・次ページの検出）を標準エラーに表示する（既定: 表示しない）
 """
 
 import argparse
+import asyncio
+import json
+import os
 import sys
 import re
-import time
-import random
 from urllib.parse import urljoin
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime
 
-import requests
+import httpx
 from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from scrapers.engine import FetchEngine
+from scrapers.parsing import parse_html
 
 
 BASE_URL = "https://kakuyomu.jp/"
+DEBUG = os.environ.get("SCRAPER_DEBUG", "0") == "1"
 
 
-def create_session() -> requests.Session:
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36'
-    })
-    # リトライ設定を追加
-    retries = Retry(
-        total=3,
-        backoff_factor=1.2,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
-    )
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
-    return session
+def _debug(message: str) -> None:
+    if DEBUG:
+        print(f"デバッグ: {message}", file=sys.stderr)
 
 
 def build_work_url(work_id: str) -> str:
@@ -83,9 +78,66 @@ def extract_episodes_from_soup(soup: BeautifulSoup, work_id: str) -> List[Dict[s
     return found
 
 
-def follow_pagination_and_collect(session: requests.Session, work_url: str, work_id: str, initial_soup: BeautifulSoup | None = None) -> List[Dict[str, str]]:
+def _resolve(state: Dict, value):
+    """Apollo ステートの参照（{"__ref": "Episode:..."}）を実体に解決する"""
+    if isinstance(value, dict) and '__ref' in value:
+        return state.get(value['__ref'])
+    return value
+
+
+def extract_embedded_index(soup: BeautifulSoup, work_id: str) -> Optional[Dict]:
+    """作品トップに埋め込まれた __NEXT_DATA__ から目次と作品情報を抽出する。
+
+    返却: {"title", "author", "catchphrase", "introduction", "episodes": [{"episode_id", "url", "title"}]}
+    データが無い・形式が違う場合は None（目次ページのクロールにフォールバックする）
+    """
+    script = soup.find('script', id='__NEXT_DATA__')
+    if not script or not script.string:
+        return None
+    try:
+        data = json.loads(script.string)
+    except ValueError:
+        return None
+
+    state = data.get('props', {}).get('pageProps', {}).get('__APOLLO_STATE__')
+    if not isinstance(state, dict):
+        return None
+    work = state.get(f"Work:{work_id}")
+    if not isinstance(work, dict):
+        return None
+
+    episodes: List[Dict[str, str]] = []
+    seen = set()
+    for toc_ref in work.get('tableOfContents') or []:
+        toc = _resolve(state, toc_ref) or {}
+        for episode_ref in toc.get('episodeUnions') or toc.get('episodes') or []:
+            episode = _resolve(state, episode_ref) or {}
+            episode_id = str(episode.get('id') or '')
+            if not episode_id or episode_id in seen:
+                continue
+            seen.add(episode_id)
+            episodes.append({
+                'episode_id': episode_id,
+                'url': urljoin(BASE_URL, f"works/{work_id}/episodes/{episode_id}"),
+                'title': episode.get('title') or '',
+            })
+    if not episodes:
+        return None
+
+    author = _resolve(state, work.get('author')) or {}
+    return {
+        'title': work.get('title') or '',
+        'author': author.get('activityName') or author.get('name') or '',
+        'catchphrase': work.get('catchphrase') or '',
+        'introduction': work.get('introduction') or '',
+        'episodes': episodes,
+    }
+
+
+async def follow_pagination_and_collect(engine: FetchEngine, work_url: str, work_id: str, initial_soup: BeautifulSoup | None = None) -> List[Dict[str, str]]:
     """作品トップのページネーションを辿りつつ全エピソードURLを収集する。
     rel="next" または クエリ付きの次ページリンク（例: ?page=2）に対応。
+    ページ間の待機は取得エンジンのアクセス制御に任せる。
     """
     all_items: List[Dict[str, str]] = []
     seen_urls = set()
@@ -96,26 +148,21 @@ def follow_pagination_and_collect(session: requests.Session, work_url: str, work
     
     while next_url:
         if next_url in seen_urls:
-            print(f"デバッグ: 既に処理済みのURLに到達しました: {next_url}", file=sys.stderr)
+            _debug(f"既に処理済みのURLに到達しました: {next_url}")
             break
         seen_urls.add(next_url)
         page_count += 1
 
-        print(f"デバッグ: ページ {page_count} を処理中: {next_url}", file=sys.stderr)
+        _debug(f"ページ {page_count} を処理中: {next_url}")
         if use_initial:
             soup = initial_soup  # 先頭1回目のみ外部から受領したSoupを使用
             use_initial = False
         else:
-            resp = session.get(next_url, timeout=(5, 20))
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.content, 'html.parser')
-            # 一覧ページ取得後にランダム待機
-            delay = random.uniform(1.0, 2.5)
-            print(f"デバッグ: 次ページまで待機 {delay:.1f}s", file=sys.stderr)
-            time.sleep(delay)
+            resp = await engine.get(next_url)
+            soup = parse_html(resp.content)
 
         items = extract_episodes_from_soup(soup, work_id)
-        print(f"デバッグ: このページで {len(items)} 個のエピソードを発見", file=sys.stderr)
+        _debug(f"このページで {len(items)} 個のエピソードを発見")
         
         # 掲載順を保ったまま重複排除
         existing = {item['url'] for item in all_items}
@@ -126,20 +173,20 @@ def follow_pagination_and_collect(session: requests.Session, work_url: str, work
                 existing.add(item['url'])
                 new_items += 1
         
-        print(f"デバッグ: 新規追加: {new_items} 個、累計: {len(all_items)} 個", file=sys.stderr)
+        _debug(f"新規追加: {new_items} 個、累計: {len(all_items)} 個")
 
         # 次ページ探索（rel="next" 優先）
         next_link = soup.find('link', rel='next')
         if next_link and next_link.get('href'):
             next_url = urljoin(next_url, next_link['href'])
-            print(f"デバッグ: rel='next' で次ページを発見: {next_url}", file=sys.stderr)
+            _debug(f"rel='next' で次ページを発見: {next_url}")
             continue
 
         # フォールバック: 次ページらしきa要素
         a_next = soup.find('a', attrs={'rel': 'next'}) or soup.find('a', string=re.compile(r'次|Next', re.I))
         if a_next and a_next.get('href'):
             next_url = urljoin(next_url, a_next['href'])
-            print(f"デバッグ: a要素で次ページを発見: {next_url}", file=sys.stderr)
+            _debug(f"a要素で次ページを発見: {next_url}")
         else:
             # より積極的な次ページ検索
             page_links = soup.find_all('a', href=re.compile(r'[?&]page=\d+'))
@@ -155,23 +202,37 @@ def follow_pagination_and_collect(session: requests.Session, work_url: str, work
                 
                 if max_page > page_count:
                     next_url = f"{work_url}?page={page_count + 1}"
-                    print(f"デバッグ: クエリパラメータで次ページを発見: {next_url}", file=sys.stderr)
+                    _debug(f"クエリパラメータで次ページを発見: {next_url}")
                 else:
                     next_url = None
-                    print(f"デバッグ: これ以上のページが見つかりませんでした", file=sys.stderr)
+                    _debug("これ以上のページが見つかりませんでした")
             else:
                 next_url = None
-                print(f"デバッグ: 次ページリンクが見つかりませんでした", file=sys.stderr)
+                _debug("次ページリンクが見つかりませんでした")
 
-    print(f"デバッグ: 全 {page_count} ページを処理し、合計 {len(all_items)} 個のエピソードを収集", file=sys.stderr)
+    _debug(f"全 {page_count} ページを処理し、合計 {len(all_items)} 個のエピソードを収集")
     return all_items
 
 
-def list_episodes_with_session(session: requests.Session, work_id: str, initial_soup: BeautifulSoup | None = None) -> Dict:
-    """外部セッションおよび初回ページのBeautifulSoupを受け取り、一覧を収集して返す。"""
+async def list_episodes_with_engine(engine: FetchEngine, work_id: str, initial_soup: BeautifulSoup | None = None) -> Dict:
+    """共通の取得エンジンおよび初回ページのBeautifulSoupを受け取り、一覧を収集して返す。
+
+    埋め込みデータから取得できた場合は 'work' に作品情報（title, author, catchphrase, introduction）を含める。
+    """
     work_url = build_work_url(work_id)
 
-    episodes = follow_pagination_and_collect(session, work_url, work_id, initial_soup=initial_soup)
+    soup = initial_soup
+    if soup is None:
+        resp = await engine.get(work_url)
+        soup = parse_html(resp.content)
+
+    embedded = extract_embedded_index(soup, work_id)
+    if embedded is not None:
+        episodes = embedded.pop('episodes')
+        _debug(f"埋め込みデータから {len(episodes)} 個のエピソードを取得")
+    else:
+        print("埋め込みデータが見つからないため、目次ページを辿ります", file=sys.stderr)
+        episodes = await follow_pagination_and_collect(engine, work_url, work_id, initial_soup=soup)
 
     result = {
         'work_id': work_id,
@@ -179,24 +240,21 @@ def list_episodes_with_session(session: requests.Session, work_id: str, initial_
         'scraped_at': datetime.now().isoformat(),
         'episode_count': len(episodes),
         'episodes': episodes,
+        'work': embedded,
+        'source': 'embedded' if embedded is not None else 'html',
     }
     return result
 
 
 def list_episodes(work_id: str) -> Dict:
-    session = create_session()
-    work_url = build_work_url(work_id)
+    async def run() -> Dict:
+        engine = FetchEngine()
+        try:
+            return await list_episodes_with_engine(engine, work_id)
+        finally:
+            await engine.aclose()
 
-    episodes = follow_pagination_and_collect(session, work_url, work_id)
-
-    result = {
-        'work_id': work_id,
-        'work_url': work_url,
-        'scraped_at': datetime.now().isoformat(),
-        'episode_count': len(episodes),
-        'episodes': episodes,
-    }
-    return result
+    return asyncio.run(run())
 
 
 def main(argv: List[str]) -> int:
@@ -214,7 +272,7 @@ def main(argv: List[str]) -> int:
             for ep in data['episodes']:
                 print(ep['url'])
         return 0
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"HTTPエラー: {e}", file=sys.stderr)
         return 1
     except Exception as e:
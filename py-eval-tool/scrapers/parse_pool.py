@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+parse_pool.py
+エピソードページを解析するプロセスプール
+
+取得したエピソードページの生HTML（bytes）を解析用のワーカープロセスに渡し、抽出・クリーニング済みの
+エピソード（parse_episode の戻り値の dict）を受け取ります。解析の CPU 処理が取得ループと同じプロセスの GIL を
+取り合わないため、並行取得中も通信待ちと解析が重なります。
+ワーカーは起動時にスクレイパー・パーサの import とボイラープレート規則のコンパイルを済ませ（ウォームアップ）、
+以後はスクレイパーのインスタンスを使い回します。プールはプロセス内で共有し、最初のクロールの開始時に起動します。
+共有プールは ParsePool.shutdown_all() で停止します（スケジューラの終了時に呼び、呼ばれなかった場合もプロセスの終了時に停止します）。
+ワーカーが異常終了した場合は、以降の解析をワーカースレッドで行います。
+
+設定（環境変数）:
+    SCRAPER_PARSE_WORKERS  解析プロセス数（既定: CPU コア数 - 1、最大 4。0 でプロセスを使わずワーカースレッドで解析）
+"""
+
+import asyncio
+import atexit
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+# SCRAPER_PARSE_WORKERS を指定しない場合のプロセス数の上限
+MAX_DEFAULT_WORKERS = 4
+
+
+def parse_workers_from_env() -> int:
+    value = os.environ.get("SCRAPER_PARSE_WORKERS")
+    if value is not None:
+        return max(0, int(value))
+    return max(0, min(MAX_DEFAULT_WORKERS, (os.cpu_count() or 1) - 1))
+
+
+# ワーカープロセス側: スクレイパーはクラスごとに1つだけ作って使い回す
+_worker_scrapers: Dict[type, object] = {}
+
+
+def _worker_scraper(scraper_cls: type):
+    scraper = _worker_scrapers.get(scraper_cls)
+    if scraper is None:
+        from scrapers.engine import FetchEngine
+        from scrapers.politeness import HostPoliteness
+        # 解析にだけ使う（取得・キャッシュ・チェックポイントは使わない）
+        engine = FetchEngine(HostPoliteness(min_interval=0.0))
+        scraper = _worker_scrapers[scraper_cls] = scraper_cls(engine=engine, use_checkpoint=False, parse_workers=0)
+    return scraper
+
+
+def _warm_worker() -> None:
+    """ワーカーの起動時に、各スクレイパー・パーサの import とボイラープレート規則のコンパイルを済ませておく"""
+    from scrapers.parsing import parse_html
+    from scrapers.reextract import SCRAPERS
+    for scraper_cls in SCRAPERS.values():
+        _worker_scraper(scraper_cls)
+    parse_html(b"<html><head><title>warm</title></head><body><p>warm</p></body></html>")
+
+
+def _parse_episode(scraper_cls: type, html: bytes, url: str) -> Optional[Dict]:
+    return _worker_scraper(scraper_cls).parse_episode(html, url)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ParsePool:
+    """エピソードページの解析を行うワーカープロセスのプール（プロセス内で共有する）"""
+
+    _shared: Dict[int, "ParsePool"] = {}
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.broken = False
+        # 取得ループのスレッドやイベントループを複製しないよう、ワーカーは spawn で起動する
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+        # ProcessPoolExecutor は必要になるまでワーカーを起動しないため、ここで全員を起動してウォームアップを始める
+        self._warming = [self.executor.submit(_ping) for _ in range(workers)]
+
+    @classmethod
+    def shared(cls, workers: int) -> Optional["ParsePool"]:
+        """プロセス数 workers の共有プール（0 以下なら None = ワーカースレッドで解析）"""
+        if workers <= 0:
+            return None
+        pool = cls._shared.get(workers)
+        if pool is None or pool.broken:
+            if not cls._shared:
+                atexit.register(cls.shutdown_all)
+            if pool is not None:
+                pool.shutdown(wait=False)
+            pool = cls._shared[workers] = cls(workers)
+        return pool
+
+    @classmethod
+    def shutdown_all(cls) -> None:
+        """共有プールをすべて停止する（次に shared() を呼ぶと起動し直す）"""
+        for pool in list(cls._shared.values()):
+            pool.shutdown()
+        atexit.unregister(cls.shutdown_all)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """ワーカープロセスを停止し、共有プールから外す"""
+        if ParsePool._shared.get(self.workers) is self:
+            del ParsePool._shared[self.workers]
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    def wait_until_warm(self) -> None:
+        """全ワーカーの起動とウォームアップが終わるまで待つ（ベンチマーク用）"""
+        for future in self._warming:
+            future.result()
+
+    async def parse_episode(self, scraper_cls: type, html: bytes, url: str) -> Optional[Dict]:
+        """scraper_cls のスクレイパーでエピソードページを解析する"""
+        if not self.broken:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self.executor, _parse_episode, scraper_cls, html, url)
+            except BrokenProcessPool:
+                self.broken = True
+                print("警告: 解析プロセスが異常終了したため、以降の解析はワーカースレッドで行います")
+        return await asyncio.to_thread(_parse_episode, scraper_cls, html, url)
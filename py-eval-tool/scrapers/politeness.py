@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+politeness.py
+スクレイパー共通のアクセス制御
+ホストごとの同時リクエスト数と最小リクエスト間隔を守るためのスロットを管理します
+
+適応制御（AIMD）が有効な場合は、ホストごとに応答を観測して取得ペースを調整します。
+応答が正常で応答時間も安定している間は、同時リクエスト数を 1 ずつ増やし間隔を少しずつ縮め（加算的増加）、
+429 / 503・通信エラー・応答時間の悪化を検出したら、同時リクエスト数を半分に、間隔を倍にします（乗算的減少）。
+
+設定（環境変数）:
+    SCRAPER_CONCURRENCY         同時に処理するエピソード数（既定: 4、1 で従来どおり逐次）
+    SCRAPER_PER_HOST            1ホストあたりの同時リクエスト数の初期値（既定: 2）
+    SCRAPER_MIN_INTERVAL        同一ホストへのリクエスト開始間隔の初期値・秒（既定: 0.5、カクヨムは 1.0）
+    SCRAPER_ADAPTIVE            0 で適応制御を無効にし、上の値で固定する（既定: 1）
+    SCRAPER_PER_HOST_MAX        適応制御で増やす同時リクエスト数の上限（既定: 4）
+    SCRAPER_MIN_INTERVAL_FLOOR  適応制御で縮める間隔の下限・秒（既定: 初期値の半分）
+"""
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+import httpx
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_PER_HOST = 2
+DEFAULT_MIN_INTERVAL = 0.5
+# 間隔に加えるゆらぎ（0〜50%）。一定間隔のアクセスパターンを避ける
+INTERVAL_JITTER = 0.5
+
+# 適応制御（AIMD）
+DEFAULT_PER_HOST_MAX = 4
+# 正常な応答が「同時リクエスト数」件続くごとに、間隔をこの秒数だけ縮める
+INTERVAL_STEP = 0.05
+# 過負荷を検出したときの間隔の倍率・下限・上限（秒）
+BACKOFF_MULTIPLIER = 2.0
+BACKOFF_MIN_INTERVAL = 0.25
+MAX_INTERVAL = 30.0
+# 過負荷とみなすステータス
+OVERLOAD_STATUSES = {429, 503}
+# 応答時間の指数移動平均の係数と、基準値（これまでの最小値、ゆっくり追従）に対して悪化とみなす倍率
+LATENCY_ALPHA = 0.2
+LATENCY_BASELINE_DRIFT = 0.02
+LATENCY_RISE = 2.0
+LATENCY_MIN_SAMPLES = 5
+
+
+def scraper_concurrency() -> int:
+    """環境変数 SCRAPER_CONCURRENCY（既定: 4）"""
+    return max(1, int(os.environ.get("SCRAPER_CONCURRENCY", DEFAULT_CONCURRENCY)))
+
+
+class _HostState:
+    def __init__(self, limit: int, interval: float):
+        # 現在の同時リクエスト数の上限と開始間隔（適応制御で変わる）
+        self.limit = limit
+        self.interval = interval
+        self.in_flight = 0
+        self.waiters: List[asyncio.Future] = []
+        self.next_start = 0.0
+        # 応答時間の指数移動平均と基準値
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.samples = 0
+        # 前回の調整以降に続いた正常な応答の数
+        self.healthy = 0
+        # 直近に減速した時刻（それ以前に送ったリクエストの失敗では重ねて減速しない）
+        self.last_decrease = 0.0
+
+
+class Slot:
+    """slot() が返すリクエスト枠。取得した応答を done() で渡すと、適応制御がそれを観測する"""
+
+    def __init__(self):
+        self.started = 0.0
+        self.response: Optional[httpx.Response] = None
+
+    def done(self, response: httpx.Response) -> None:
+        self.response = response
+
+
+class HostPoliteness:
+    """ホストごとの同時リクエスト数と最小リクエスト間隔を守るためのスロット管理"""
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_PER_HOST,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        adaptive: bool = False,
+        max_per_host: int = DEFAULT_PER_HOST_MAX,
+        min_interval_floor: Optional[float] = None,
+    ):
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_interval = max(0.0, min_interval)
+        self.adaptive = adaptive
+        self.max_per_host = max(self.max_in_flight, max_per_host)
+        self.min_interval_floor = min(self.min_interval, self.min_interval / 2 if min_interval_floor is None else max(0.0, min_interval_floor))
+        self._hosts: Dict[str, _HostState] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls, min_interval: float = DEFAULT_MIN_INTERVAL) -> "HostPoliteness":
+        """環境変数から生成する。min_interval はサイトごとの既定値（SCRAPER_MIN_INTERVAL が優先）"""
+        floor = os.environ.get("SCRAPER_MIN_INTERVAL_FLOOR")
+        return cls(
+            max_in_flight=int(os.environ.get("SCRAPER_PER_HOST", DEFAULT_PER_HOST)),
+            min_interval=float(os.environ.get("SCRAPER_MIN_INTERVAL", min_interval)),
+            adaptive=os.environ.get("SCRAPER_ADAPTIVE", "1") != "0",
+            max_per_host=int(os.environ.get("SCRAPER_PER_HOST_MAX", DEFAULT_PER_HOST_MAX)),
+            min_interval_floor=float(floor) if floor else None,
+        )
+
+    def _host_state(self, host: str) -> _HostState:
+        # 待機キューはイベントループごとに作り直す（asyncio.run を複数回呼ぶ CLI 向け）
+        # 調整済みのペースは引き継ぐ
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            for state in self._hosts.values():
+                state.in_flight = 0
+                state.waiters = []
+                state.next_start = 0.0
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(self.max_in_flight, self.min_interval)
+        return self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """
+        url のホストに対するリクエスト枠を確保する。
+        同時リクエスト数の上限まで待ったうえで、前回の開始時刻から最小間隔が空くまで待機する。
+        枠の中で Slot.done(response) を呼ぶと、適応制御が応答時間とステータスを観測する。
+        """
+        host = urlparse(url).netloc
+        state = self._host_state(host)
+        while state.in_flight >= state.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            state.waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in state.waiters:
+                    state.waiters.remove(waiter)
+        state.in_flight += 1
+
+        slot = Slot()
+        completed = False
+        try:
+            delay = await self._reserve_start(host, state)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            slot.started = time.monotonic()
+            yield slot
+            completed = True
+        except asyncio.CancelledError:
+            slot.started = 0.0
+            raise
+        finally:
+            state.in_flight -= 1
+            if self.adaptive and slot.started:
+                self._observe(host, state, slot, completed)
+            self._wake(state)
+
+    async def _reserve_start(self, host: str, state: _HostState) -> float:
+        """次のリクエストの開始時刻を予約し、それまでの待ち時間（秒）を返す"""
+        now = time.monotonic()
+        start = max(now, state.next_start)
+        # 開始時刻を先に予約する（待機中の他のリクエストはその次の枠を取る）
+        state.next_start = start + state.interval * random.uniform(1.0, 1.0 + INTERVAL_JITTER)
+        return start - now
+
+    def _defer(self, host: str, state: _HostState, seconds: float) -> None:
+        """seconds 秒の間、host への新しいリクエストを始めない（Retry-After）"""
+        state.next_start = max(state.next_start, time.monotonic() + seconds)
+
+    @staticmethod
+    def _wake(state: _HostState) -> None:
+        # 空いた枠の数だけでなく全員を起こし、各自が上限を確認し直す（上限が増えた場合に備える）
+        waiters, state.waiters = state.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    # -----------------------------
+    # 適応制御（AIMD）
+    # -----------------------------
+    def _observe(self, host: str, state: _HostState, slot: Slot, completed: bool) -> None:
+        now = time.monotonic()
+        response = slot.response if completed else None
+
+        if response is None or response.status_code in OVERLOAD_STATUSES:
+            reason = "通信エラー" if response is None else str(response.status_code)
+            retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+            if retry_after.isdigit():
+                # Retry-After の間は同じホストへの新しいリクエストを始めない
+                self._defer(host, state, min(float(retry_after), MAX_INTERVAL))
+            self._decrease(host, state, slot, reason)
+            return
+
+        latency = now - slot.started
+        state.samples += 1
+        state.latency = latency if state.latency is None else state.latency + LATENCY_ALPHA * (latency - state.latency)
+        if state.baseline is None or state.latency < state.baseline:
+            state.baseline = state.latency
+        else:
+            # 応答時間が恒常的に変わった場合は、基準値もゆっくり追従する
+            state.baseline += LATENCY_BASELINE_DRIFT * (state.latency - state.baseline)
+
+        if state.samples >= LATENCY_MIN_SAMPLES and state.latency > state.baseline * LATENCY_RISE:
+            self._decrease(host, state, slot, f"応答時間 {state.latency:.2f}秒")
+            return
+
+        state.healthy += 1
+        if state.healthy >= state.limit:
+            state.healthy = 0
+            state.limit = min(self.max_per_host, state.limit + 1)
+            state.interval = max(self.min_interval_floor, state.interval - INTERVAL_STEP)
+
+    def _decrease(self, host: str, state: _HostState, slot: Slot, reason: str) -> None:
+        state.healthy = 0
+        if slot.started < state.last_decrease:
+            # 減速前に送ったリクエストの結果では重ねて減速しない
+            return
+        state.last_decrease = time.monotonic()
+        state.limit = max(1, state.limit // 2)
+        state.interval = min(MAX_INTERVAL, max(state.interval * BACKOFF_MULTIPLIER, self.min_interval, BACKOFF_MIN_INTERVAL))
+        print(f"[RATE] {host}: {reason} のため減速 → {self._format(state)}")
+
+    @staticmethod
+    def _format(state: _HostState) -> str:
+        label = f"{state.limit}並列・間隔 {state.interval:.2f}秒"
+        if state.latency is not None:
+            label += f"・応答 {state.latency:.2f}秒"
+        return label
+
+    def describe(self, url: str) -> str:
+        """url のホストに対する現在の取得ペース（進捗表示用、まだ取得していなければ空文字）"""
+        state = self._hosts.get(urlparse(url).netloc)
+        return self._format(state) if state is not None else ""
+
+
+
+class SharedHostPoliteness(HostPoliteness):
+    """
+    複数のプロセス・マシンでホストごとのリクエスト間隔を共有するアクセス制御。
+    次のリクエストの開始時刻（壁時計）を SQLite（共有ボリューム上のクロールキューと同じファイル）に予約するため、
+    ワーカーが何台あってもホストへのリクエスト開始間隔は 1 台のときと同じになる。
+    同時リクエスト数と適応制御はワーカーごとに行い、Retry-After による待機は全ワーカーに反映する。
+    """
+
+    def __init__(self, db_path, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.db_path = str(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # 実行中の Retry-After の書き込み（タスクが途中で回収されないよう参照を持つ）
+        self._deferrals: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls, min_interval: float = DEFAULT_MIN_INTERVAL, db_path=None) -> "SharedHostPoliteness":
+        """HostPoliteness.from_env と同じ設定で、db_path の予約表を共有する"""
+        local = HostPoliteness.from_env(min_interval)
+        return cls(
+            db_path,
+            max_in_flight=local.max_in_flight,
+            min_interval=local.min_interval,
+            adaptive=local.adaptive,
+            max_per_host=local.max_per_host,
+            min_interval_floor=local.min_interval_floor,
+        )
+
+    def _update_next_start(self, host: str, update: Callable[[float], float]) -> None:
+        """host の次の開始時刻を update(現在の値) で更新する（プロセス間で排他）"""
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+                self._conn.execute("CREATE TABLE IF NOT EXISTS host_budget (host TEXT PRIMARY KEY, next_start REAL NOT NULL)")
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT next_start FROM host_budget WHERE host = ?", (host,)).fetchone()
+                current = row[0] if row else 0.0
+                self._conn.execute(
+                    "INSERT INTO host_budget (host, next_start) VALUES (?, ?) "
+                    "ON CONFLICT (host) DO UPDATE SET next_start = excluded.next_start",
+                    (host, update(current)),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def _reserve_start(self, host: str, state: _HostState) -> float:
+        interval = state.interval * random.uniform(1.0, 1.0 + INTERVAL_JITTER)
+        reserved = {}
+
+        def update(current: float) -> float:
+            # 排他を取った時点の時刻で予約する
+            reserved["start"] = max(time.time(), current)
+            return reserved["start"] + interval
+
+        await asyncio.to_thread(self._update_next_start, host, update)
+        return reserved["start"] - time.time()
+
+    def _defer(self, host: str, state: _HostState, seconds: float) -> None:
+        # 応答の観測（slot() の後始末）は同期処理のため、予約表の更新はワーカースレッドで行うタスクにする
+        until = time.time() + seconds
+        task = asyncio.get_running_loop().create_task(self._adefer(host, until))
+        self._deferrals.add(task)
+        task.add_done_callback(self._deferrals.discard)
+
+    async def _adefer(self, host: str, until: float) -> None:
+        try:
+            await asyncio.to_thread(self._update_next_start, host, lambda current: max(current, until))
+        except sqlite3.Error as e:
+            print(f"[WARN] {host}: Retry-After を共有できませんでした: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+reextract.py
+生HTMLアーカイブからの作品データの再構築
+
+アーカイブ（scrapers/archive.py）に保存したページをネットワークの代わりに返す ArchiveEngine で
+各スクレイパーをそのまま実行し、storage/works/{work_id}.json を作り直します。
+抽出・クリーニング処理を変更したあとに、再ダウンロードせずに反映するために使います。
+作品単位でプロセスプールに分散し、CPU コアを並列に使います。
+
+使用方法:
+    python scrap.py re-extract [作品ID ...] [--workers N]
+"""
+
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from scrapers.archive import ARCHIVE_DIR, RawArchive
+from scrapers.engine import FetchEngine
+from scrapers.kakuyomu.scraper import KakuyomuScraper
+from scrapers.politeness import HostPoliteness
+from scrapers.syosetu.scraper import SyosetuScraper
+
+WORKS_DIR = Path(__file__).resolve().parent.parent.parent / "storage" / "works"
+
+SCRAPERS = {
+    'syosetu': SyosetuScraper,
+    'kakuyomu': KakuyomuScraper,
+}
+
+
+class ArchiveEngine(FetchEngine):
+    """マニフェストに記録されたページをアーカイブから返す取得エンジン（ネットワークを使わない）"""
+
+    def __init__(self, archive: RawArchive, manifest: Dict):
+        super().__init__(politeness=HostPoliteness(min_interval=0.0))
+        self.source = archive
+        self.manifest_pages: Dict[str, str] = manifest["pages"]
+
+    async def get(self, url: str) -> httpx.Response:
+        digest = self.manifest_pages.get(url)
+        if digest is None:
+            raise httpx.RequestError(f"アーカイブにありません: {url}")
+        content = await asyncio.to_thread(self.source.read_blob, digest)
+        return httpx.Response(200, content=content, request=httpx.Request("GET", url))
+
+
+def reextract_work(archive_dir: str, site: str, work_id: str) -> Dict:
+    """1作品をアーカイブから作り直して storage/works に保存する（プロセスプールのワーカーで実行）"""
+    archive = RawArchive(Path(archive_dir))
+    manifest = archive.load_manifest(site, work_id)
+    if manifest is None:
+        return {'work_id': work_id, 'site': site, 'success': False, 'message': 'アーカイブがありません'}
+
+    # 作品単位でプロセスを分けているため、エピソードの解析はこのプロセス内で行う
+    scraper = SCRAPERS[site](engine=ArchiveEngine(archive, manifest), use_checkpoint=False, parse_workers=0)
+    data = scraper.extract_novel_data(work_id, manifest.get('limit'))
+    if not data:
+        return {'work_id': work_id, 'site': site, 'success': False, 'message': '作品データを構築できませんでした'}
+
+    WORKS_DIR.mkdir(parents=True, exist_ok=True)
+    output_path = WORKS_DIR / f"{work_id}.json"
+    output_path.write_text(json.dumps({**data, 'work_id': work_id}, ensure_ascii=False, indent=2), encoding="utf-8")
+    return {'work_id': work_id, 'site': site, 'success': True, 'episodes': data['scraped_episodes'], 'path': str(output_path)}
+
+
+def reextract_all(work_ids: Optional[List[str]] = None, workers: Optional[int] = None, archive: Optional[RawArchive] = None) -> List[Dict]:
+    """
+    アーカイブ済みの作品（work_ids を指定した場合はその作品のみ）を並列に作り直す。
+    workers の既定値は CPU コア数。
+    """
+    archive = archive or RawArchive(Path(os.environ.get("SCRAPER_ARCHIVE_DIR", ARCHIVE_DIR)))
+    targets = [
+        (m['site'], m['work_id'])
+        for m in archive.iter_manifests()
+        if m['site'] in SCRAPERS and (not work_ids or m['work_id'] in work_ids)
+    ]
+    if work_ids:
+        found = {work_id for _, work_id in targets}
+        for work_id in work_ids:
+            if work_id not in found:
+                print(f"警告: 作品 {work_id} のアーカイブがありません", file=sys.stderr)
+    if not targets:
+        return []
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(targets)))
+    print(f"{len(targets)} 作品をアーカイブから再構築します（{workers} プロセス）")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(reextract_work, str(archive.archive_dir), site, work_id) for site, work_id in targets]
+        results = []
+        for (site, work_id), future in zip(targets, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({'work_id': work_id, 'site': site, 'success': False, 'message': str(e)})
+    return results
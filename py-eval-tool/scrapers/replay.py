@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+replay.py
+HTTP 応答の記録とリプレイ（スクレイパーのベンチマーク・回帰確認用）
+
+RecordingTransport は実際の通信の応答（ステータス・Content-Type・本文）をフィクスチャに記録し、
+ReplayTransport は記録した応答をネットワークを使わずに返します（応答時間は指定した値で模擬）。
+どちらも FetchEngine(transport_wrapper=...) に渡して使います。
+フィクスチャの本文は生HTMLアーカイブと同じ形式（SHA-256 をキーにした gzip）で保存し、
+アーカイブ済みの作品からフィクスチャを作ることもできます（import_archive）。
+
+使用方法は benchmarks/scrape_replay.py を参照してください。
+"""
+
+import asyncio
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from scrapers.archive import RawArchive
+
+# リプレイで再現するヘッダ（本文は復号済みで保存するため、Content-Encoding などは残さない）
+REPLAYED_HEADERS = ("content-type", "location")
+
+
+class FixtureStore:
+    """記録した応答（URL → ステータス・ヘッダ・本文のハッシュ）と、記録した作品の一覧"""
+
+    def __init__(self, fixture_dir: Path):
+        self.fixture_dir = Path(fixture_dir)
+        self.blobs = RawArchive(self.fixture_dir)
+        self.index_path = self.fixture_dir / "index.json"
+        if self.index_path.exists():
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        else:
+            index = {"responses": {}, "works": []}
+        self.responses: Dict[str, Dict] = index["responses"]
+        self.works: List[Dict] = index["works"]
+
+    def save(self) -> None:
+        self.fixture_dir.mkdir(parents=True, exist_ok=True)
+        index = {"responses": self.responses, "works": self.works}
+        self.index_path.write_text(json.dumps(index, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def record(self, url: str, status: int, headers: Dict[str, str], content: bytes) -> None:
+        self.responses[url] = {
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() in REPLAYED_HEADERS},
+            "sha": self.blobs.put_blob(content),
+        }
+
+    def add_work(self, site: str, work_id: str, limit: Optional[int]) -> None:
+        self.works = [w for w in self.works if (w["site"], w["work_id"]) != (site, work_id)]
+        self.works.append({"site": site, "work_id": work_id, "limit": limit})
+
+    def import_archive(self, archive: RawArchive, site: str, work_id: str) -> bool:
+        """生HTMLアーカイブの作品をフィクスチャに取り込む（すべて 200 text/html として記録）"""
+        manifest = archive.load_manifest(site, work_id)
+        if manifest is None:
+            return False
+        for url, digest in manifest["pages"].items():
+            self.record(url, 200, {"content-type": "text/html; charset=utf-8"}, archive.read_blob(digest))
+        self.add_work(site, work_id, manifest.get("limit"))
+        return True
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """実際の通信を行い、応答をフィクスチャに記録するトランスポート"""
+
+    def __init__(self, store: FixtureStore, inner: httpx.AsyncBaseTransport):
+        self.store = store
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        self.store.record(str(request.url), response.status_code, dict(response.headers), content)
+        headers = {k: v for k, v in response.headers.items() if k.lower() in REPLAYED_HEADERS}
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    記録した応答を返すトランスポート。
+    応答ごとに latency 秒（0〜jitter 秒のゆらぎを加算）待ってから返す。記録に無い URL は 404。
+    本文は最初にまとめて展開しておき、リプレイ中の CPU 時間に含めない。
+    """
+
+    def __init__(self, store: FixtureStore, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.missing: List[str] = []
+        self._responses = {
+            url: (entry["status"], entry["headers"], store.blobs.read_blob(entry["sha"]))
+            for url, entry in store.responses.items()
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        delay = self.latency + random.uniform(0.0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        url = str(request.url)
+        if url not in self._responses:
+            self.missing.append(url)
+            return httpx.Response(404, text=f"not recorded: {url}", request=request)
+        status, headers, content = self._responses[url]
+        return httpx.Response(status, headers=headers, content=content, request=request)
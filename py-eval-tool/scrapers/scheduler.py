@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+scheduler.py
+複数作品のクロールキュー
+
+（サイト, 作品ID, 話数制限）のジョブを優先度付きで SQLite に保存し、キューが空になるまで取得します。
+サイト（ホスト）ごとにレーンを分けて並行に処理するため、片方のサイトのジョブが大量にあっても
+もう片方が待たされることはありません。同じホストの作品はアクセス制御（HostPoliteness）を共有します。
+キューの状態はディスクに残るため、中断しても次回の実行で続きから処理します。結果は storage/works/{work_id}.json に保存します
+（一時ファイルに書き出し、リースを保持したまま完了を記録できた場合だけ置き換えます）。
+
+複数のワーカー（プロセス・マシン）で同じキュー（共有ボリューム上の SQLite）を処理できます。
+ワーカーはジョブをリース（有効期限付きの占有）として取得し、ハートビートで期限を延長します。
+期限が切れたリース（ワーカーの停止など）は他のワーカーが取り直します。
+ホストへのリクエスト開始間隔は SharedHostPoliteness で全ワーカー共通の予約表から割り当てます。
+リースの期限は壁時計で判定するため、ワーカー間で時刻を同期しておいてください。
+
+使用方法:
+    python scrap.py crawl add syosetu n2596la [話数] [--priority N]
+    python scrap.py crawl add --file jobs.txt        # 1行に「サイト 作品ID [話数] [優先度]」
+    python scrap.py crawl run [--update] [--works_per_host N] [--worker_id ID]   # ワーカーごとに実行
+    python scrap.py crawl status
+
+設定（環境変数）:
+    SCRAPER_QUEUE_DB   キューの保存先（既定: storage/crawl/queue.sqlite3）
+    SCRAPER_LEASE_TTL  リースの有効期限・秒（既定: 120、ハートビートはその 1/3 ごと）
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from scrapers.checkpoint import write_json
+from scrapers.parse_pool import ParsePool
+from scrapers.politeness import SharedHostPoliteness
+from scrapers.reextract import SCRAPERS, WORKS_DIR
+
+QUEUE_DB = Path(__file__).resolve().parent.parent.parent / "storage" / "crawl" / "queue.sqlite3"
+# 失敗したジョブを未処理に戻す回数の上限
+MAX_ATTEMPTS = 3
+DEFAULT_LEASE_TTL = 120.0
+# 他のワーカーのリースが残っている間、取得できるジョブを確認し直す間隔の上限（秒）
+POLL_INTERVAL = 10.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    site          TEXT    NOT NULL,
+    work_id       TEXT    NOT NULL,
+    episode_limit INTEGER,
+    priority      INTEGER NOT NULL DEFAULT 0,
+    status        TEXT    NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    enqueued_at   REAL    NOT NULL,
+    started_at    REAL,
+    finished_at   REAL,
+    episodes      INTEGER,
+    elapsed       REAL,
+    message       TEXT,
+    worker_id     TEXT,
+    lease_expires REAL,
+    UNIQUE (site, work_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (site, status, priority DESC, id);
+"""
+
+
+class CrawlQueue:
+    """SQLite に保存するクロールジョブのキュー（複数ワーカーからはリースで取得する）"""
+
+    def __init__(self, db_path: Path = QUEUE_DB, lease_ttl: float = DEFAULT_LEASE_TTL):
+        self.db_path = Path(db_path)
+        self.lease_ttl = lease_ttl
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # 他のワーカーが書き込み中の場合は待つ。スケジューラはワーカースレッドから呼ぶため、接続の利用はロックで直列化する
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("worker_id", "TEXT"), ("lease_expires", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    @classmethod
+    def from_env(cls) -> "CrawlQueue":
+        return cls(
+            Path(os.environ.get("SCRAPER_QUEUE_DB", QUEUE_DB)),
+            float(os.environ.get("SCRAPER_LEASE_TTL", DEFAULT_LEASE_TTL)),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return result
+
+    def _execute(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _fetchall(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def enqueue(self, site: str, work_id: str, limit: Optional[int] = None, priority: int = 0) -> None:
+        """
+        ジョブを追加する。同じ作品が既にある場合は、話数制限を更新し、優先度は高いほうを残して未処理に戻す
+        （完了済みの作品を追加し直すと再取得になる）。
+        """
+        if site not in SCRAPERS:
+            raise ValueError(f"未対応のサイトです: {site}")
+        self._execute(
+            """
+            INSERT INTO jobs (site, work_id, episode_limit, priority, enqueued_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (site, work_id) DO UPDATE SET
+                episode_limit = excluded.episode_limit,
+                priority = CASE WHEN status = 'pending' THEN MAX(priority, excluded.priority) ELSE excluded.priority END,
+                status = CASE WHEN status = 'running' THEN status ELSE 'pending' END,
+                attempts = CASE WHEN status = 'running' THEN attempts ELSE 0 END,
+                enqueued_at = excluded.enqueued_at
+            """,
+            (site, work_id, limit, priority, time.time()),
+        )
+
+    def pending_sites(self) -> List[str]:
+        """取得できるジョブ（未処理か、リースの期限切れ）があるサイト"""
+        rows = self._fetchall(
+            "SELECT DISTINCT site FROM jobs WHERE status = 'pending' "
+            "OR (status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)) ORDER BY site",
+            (time.time(),),
+        )
+        return [row["site"] for row in rows]
+
+    def claim(self, site: str, worker_id: str) -> Optional[sqlite3.Row]:
+        """
+        site の取得できるジョブのうち、優先度が最も高い（同じなら先に追加した）ものをリースして返す。
+        期限切れのリースは取り直す（試行回数を使い切ったジョブは失敗にする）。
+        """
+        def claim_job():
+            now = time.time()
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', message = 'リースの期限切れ（試行回数の上限）', worker_id = NULL "
+                "WHERE site = ? AND status = 'running' AND (lease_expires IS NULL OR lease_expires < ?) AND attempts >= ?",
+                (site, now, MAX_ATTEMPTS),
+            )
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE site = ? AND (status = 'pending' "
+                "OR (status = 'running' AND (lease_expires IS NULL OR lease_expires < ?))) "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (site, now),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, worker_id = ?, lease_expires = ? WHERE id = ?",
+                    (now, worker_id, now + self.lease_ttl, row["id"]),
+                )
+            return row
+
+        return self._transaction(claim_job)
+
+    def renew(self, worker_id: str) -> int:
+        """worker_id が持つリースの期限を延長する（ハートビート）"""
+        return self._execute(
+            "UPDATE jobs SET lease_expires = ? WHERE worker_id = ? AND status = 'running'",
+            (time.time() + self.lease_ttl, worker_id),
+        ).rowcount
+
+    def has_leases(self, site: str) -> bool:
+        """site に有効なリースが残っているか（期限が切れれば取り直せる）"""
+        rows = self._fetchall(
+            "SELECT 1 FROM jobs WHERE site = ? AND status = 'running' AND lease_expires >= ? LIMIT 1",
+            (site, time.time()),
+        )
+        return bool(rows)
+
+    def release(self, worker_id: str) -> int:
+        """worker_id が持つリースを未処理に戻す（ワーカーを途中で止めたとき）"""
+        return self._execute(
+            "UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), worker_id = NULL, lease_expires = NULL "
+            "WHERE worker_id = ? AND status = 'running'",
+            (worker_id,),
+        ).rowcount
+
+    def finish(self, job_id: int, worker_id: str, success: bool, episodes: int = 0, elapsed: float = 0.0, message: str = "") -> Optional[str]:
+        """
+        ジョブの結果を記録し、新しい状態を返す（失敗は MAX_ATTEMPTS 回まで未処理に戻す）。
+        リースが他のワーカーに移っていた場合は何もせず None を返す。
+        """
+        def finish_job():
+            row = self._conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND worker_id = ? AND status = 'running'", (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+            if success:
+                status = "done"
+            else:
+                status = "pending" if row["attempts"] < MAX_ATTEMPTS else "failed"
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, episodes = ?, elapsed = ?, message = ?, "
+                "worker_id = NULL, lease_expires = NULL WHERE id = ?",
+                (status, time.time(), episodes, elapsed, message, job_id),
+            )
+            return status
+
+        return self._transaction(finish_job)
+
+    def leases(self) -> List[Dict]:
+        """実行中のジョブとリースの残り時間"""
+        now = time.time()
+        rows = self._fetchall("SELECT site, work_id, worker_id, lease_expires FROM jobs WHERE status = 'running' ORDER BY id")
+        return [
+            {
+                "site": row["site"],
+                "work_id": row["work_id"],
+                "worker_id": row["worker_id"],
+                "expires_in": round(row["lease_expires"] - now, 1) if row["lease_expires"] else None,
+            }
+            for row in rows
+        ]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """サイトごとの状態別ジョブ数"""
+        result: Dict[str, Dict[str, int]] = {}
+        for row in self._fetchall("SELECT site, status, COUNT(*) AS n FROM jobs GROUP BY site, status"):
+            result.setdefault(row["site"], {})[row["status"]] = row["n"]
+        return result
+
+    def throughput(self) -> Dict[str, Dict]:
+        """サイトごとの完了済みジョブの集計（これまでの全実行分）"""
+        result = {}
+        rows = self._fetchall(
+            "SELECT site, COUNT(*) AS works, SUM(episodes) AS episodes, SUM(elapsed) AS elapsed "
+            "FROM jobs WHERE status = 'done' GROUP BY site"
+        )
+        for row in rows:
+            elapsed = row["elapsed"] or 0.0
+            result[row["site"]] = {
+                "works": row["works"],
+                "episodes": row["episodes"] or 0,
+                "episodes_per_min": round((row["episodes"] or 0) * 60 / elapsed, 1) if elapsed else 0.0,
+            }
+        return result
+
+
+class CrawlScheduler:
+    """
+    キューのジョブをサイト（ホスト）ごとのレーンで並行に処理するワーカー。
+    キューの操作（SQLite）は他のワーカーのロック待ちで止まることがあるため、ワーカースレッドで行う。
+    """
+
+    def __init__(self, queue: CrawlQueue, works_per_host: int = 1, update: bool = False, works_dir: Path = WORKS_DIR, worker_id: Optional[str] = None):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.works_per_host = max(1, works_per_host)
+        # 保存済みの作品は差分更新（追加・改稿されたエピソードのみ取得）する
+        self.update = update
+        self.works_dir = Path(works_dir)
+        # ホストごとのアクセス制御は同じサイトの全レーンで共有する
+        self._politeness: Dict[str, SharedHostPoliteness] = {}
+        self._stats: Dict[str, Dict] = {}
+
+    def _site_politeness(self, site: str) -> SharedHostPoliteness:
+        if site not in self._politeness:
+            # 開始間隔の予約表はキューと同じファイルに置き、全ワーカーで共有する
+            self._politeness[site] = SharedHostPoliteness.from_env(min_interval=SCRAPERS[site].default_min_interval, db_path=self.queue.db_path)
+        return self._politeness[site]
+
+    async def _crawl(self, job: sqlite3.Row, scraper) -> Tuple[Optional[Dict], str]:
+        stored_path = self.works_dir / f"{job['work_id']}.json"
+        if self.update and stored_path.exists():
+            stored = json.loads(await asyncio.to_thread(stored_path.read_text, encoding="utf-8"))
+            return await scraper.aupdate_novel_data(job["work_id"], stored, job["episode_limit"]), "update"
+        # 前回の試行（停止したワーカーを含む）が途中まで取得していれば、チェックポイントから再開する
+        return await scraper.aextract_novel_data(job["work_id"], job["episode_limit"], resume=job["attempts"] > 0), "full"
+
+    def _stage(self, work_id: str, data: Dict) -> Path:
+        """作品データをこのワーカー用の一時ファイルに書き出す（リースを保持していると確認してから _publish で置き換える）"""
+        self.works_dir.mkdir(parents=True, exist_ok=True)
+        staged = self.works_dir / f"{work_id}.json.{self.worker_id}.tmp"
+        # チェックポイントから組み立てた作品データは、エピソードを1話ずつ読み出しながら書き出す
+        with staged.open("w", encoding="utf-8") as f:
+            write_json({**data, 'work_id': work_id}, f, ensure_ascii=False)
+        return staged
+
+    def _publish(self, work_id: str, staged: Path, keep: bool) -> None:
+        """keep なら一時ファイルを storage/works/{work_id}.json に置き換え、そうでなければ捨てる"""
+        if keep:
+            os.replace(staged, self.works_dir / f"{work_id}.json")
+        else:
+            staged.unlink(missing_ok=True)
+
+    async def _lane(self, site: str) -> None:
+        stats = self._stats[site]
+        while True:
+            job = await asyncio.to_thread(self.queue.claim, site, self.worker_id)
+            if job is None:
+                if not await asyncio.to_thread(self.queue.has_leases, site):
+                    return
+                # 他のワーカーが処理中。停止したワーカーのリースが切れたら取り直す
+                await asyncio.sleep(min(self.queue.lease_ttl / 3, POLL_INTERVAL))
+                continue
+            print(f"[{site}] {job['work_id']} を取得します（優先度 {job['priority']}、{job['attempts'] + 1} 回目）")
+            started = time.monotonic()
+            scraper = SCRAPERS[job["site"]](politeness=self._site_politeness(job["site"]))
+            try:
+                data, mode = await self._crawl(job, scraper)
+                message = ""
+            except Exception as e:
+                data, mode, message = None, "full", str(e)
+            elapsed = time.monotonic() - started
+            stats["busy"] += elapsed
+
+            if data:
+                # リースが他のワーカーに移っていれば、そのワーカーが保存する作品データを上書きしない
+                staged = await asyncio.to_thread(self._stage, job["work_id"], data)
+                episodes = data.get("scraped_episodes", 0)
+                status = await asyncio.to_thread(self.queue.finish, job["id"], self.worker_id, True, episodes, elapsed, mode)
+                await asyncio.to_thread(self._publish, job["work_id"], staged, status is not None)
+                if status is not None:
+                    # リースが移っていれば、チェックポイントは引き継いだワーカーが使う
+                    await asyncio.to_thread(scraper.discard_checkpoint)
+                    stats["works"] += 1
+                    stats["episodes"] += episodes
+            else:
+                stats["failed"] += 1
+                status = await asyncio.to_thread(self.queue.finish, job["id"], self.worker_id, False, 0, elapsed, message or "作品データを取得できませんでした")
+            if status is None:
+                print(f"[{site}] {job['work_id']}: リースの期限が切れ、他のワーカーに移りました（{elapsed:.1f} 秒）")
+            else:
+                print(f"[{site}] {job['work_id']}: {status}（{elapsed:.1f} 秒）")
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease_ttl / 3)
+            try:
+                await asyncio.to_thread(self.queue.renew, self.worker_id)
+            except sqlite3.Error as e:
+                print(f"[WARN] リースを延長できませんでした: {e}")
+
+    async def arun(self) -> Dict[str, Dict]:
+        """キューが空になるまで処理し、サイトごとのスループットを返す"""
+        sites = await asyncio.to_thread(self.queue.pending_sites)
+        self._stats = {site: {"works": 0, "failed": 0, "episodes": 0, "busy": 0.0} for site in sites}
+        print(f"ワーカー {self.worker_id}: {', '.join(sites) or '取得できるジョブがありません'}")
+
+        started = time.monotonic()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            await asyncio.gather(*(self._lane(site) for site in sites for _ in range(self.works_per_host)))
+        finally:
+            heartbeat.cancel()
+            # 途中で止めた場合は、持っているリースをすぐに他のワーカーへ渡す
+            released = await asyncio.to_thread(self.queue.release, self.worker_id)
+            if released:
+                print(f"処理中のジョブ {released} 件を未処理に戻しました")
+            for politeness in self._politeness.values():
+                politeness.close()
+            # 共有の解析プロセスはこのプロセスのクロールがすべて終わってから止める
+            await asyncio.to_thread(ParsePool.shutdown_all)
+        wall = time.monotonic() - started
+        return self.report(wall)
+
+    def run(self) -> Dict[str, Dict]:
+        """arun の同期版（scrap.py 用）"""
+        return asyncio.run(self.arun())
+
+    def report(self, wall: float) -> Dict[str, Dict]:
+        """今回の実行のサイトごとのスループット（話数/分は実行時間全体に対する値）"""
+        report = {}
+        for site, stats in self._stats.items():
+            report[site] = {
+                "works": stats["works"],
+                "failed": stats["failed"],
+                "episodes": stats["episodes"],
+                "episodes_per_min": round(stats["episodes"] * 60 / wall, 1) if wall else 0.0,
+                "busy_sec": round(stats["busy"], 1),
+            }
+            print(f"スループット [{site}]: {stats['works']} 作品（失敗 {stats['failed']}）/ {stats['episodes']} 話 / {report[site]['episodes_per_min']} 話/分")
+        return report
+
+
+def parse_job_lines(lines: Iterable[str]) -> List[Tuple[str, str, Optional[int], int]]:
+    """「サイト 作品ID [話数] [優先度]」の行（空行と # 以降は無視）をジョブに変換する"""
+    jobs = []
+    for line in lines:
+        fields = line.split("#", 1)[0].split()
+        if not fields:
+            continue
+        if len(fields) < 2:
+            raise ValueError(f"ジョブの形式が不正です: {line.strip()}")
+        limit = int(fields[2]) if len(fields) > 2 and fields[2] not in ("-", "0") else None
+        priority = int(fields[3]) if len(fields) > 3 else 0
+        jobs.append((fields[0], fields[1], limit, priority))
+    return jobs
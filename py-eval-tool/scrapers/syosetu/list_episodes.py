@@ -6,11 +6,19 @@ list_episodes.py
 作品ページからエピソード一覧を抽出します
 """
 
+import asyncio
 import re
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 from typing import List, Dict, Optional
 
+from scrapers.engine import FetchEngine
+from scrapers.parsing import class_names, parse_html, strainer
+
+# 目次で使う要素（リンクと、更新日時を探す目次の項目）だけを解析する
+_TOC_CLASS = re.compile(r'novelindex|p-eplist__sublist|novel_sublist2')
+TOC_PARTS = strainer(lambda name, attrs: name == 'a' or any(_TOC_CLASS.search(c) for c in class_names(attrs)))
+
 def list_episodes(work_id: str) -> Dict:
     """
     作品IDからエピソード一覧を取得
@@ -31,68 +39,21 @@ def list_episodes(work_id: str) -> Dict:
                 ]
             }
     """
-    import requests
-    from requests.adapters import HTTPAdapter
-    from urllib3.util.retry import Retry
-    import random
-    
-    # セッション設定
-    user_agents = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    ]
-    
-    headers = {
-        'User-Agent': random.choice(user_agents),
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'ja,en-US;q=0.7,en;q=0.3',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1'
-    }
-    
-    session = requests.Session()
-    session.headers.update(headers)
-    
-    # リトライ設定
-    retries = Retry(
-        total=3,
-        backoff_factor=1.2,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
-    )
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
-    
-    try:
-        # 作品トップページを取得
-        work_url = f"https://ncode.syosetu.com/{work_id}/"
-        response = session.get(work_url, timeout=(5, 20))
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # エピソード一覧を抽出
-        episodes = _extract_episode_list(soup)
-        
-        return {
-            'episodes': episodes
-        }
-        
-    except Exception as e:
-        print(f"エピソード一覧取得でエラー: {e}")
-        return {'episodes': []}
-    finally:
-        session.close()
+    async def run() -> Dict:
+        engine = FetchEngine()
+        try:
+            return await list_episodes_with_engine(engine, work_id)
+        finally:
+            await engine.aclose()
 
-def list_episodes_with_session(session, work_id: str, initial_soup: Optional[BeautifulSoup] = None) -> Dict:
+    return asyncio.run(run())
+
+async def list_episodes_with_engine(engine: FetchEngine, work_id: str, initial_soup: Optional[BeautifulSoup] = None) -> Dict:
     """
-    既存のセッションを使用してエピソード一覧を取得
+    共通の取得エンジンを使用してエピソード一覧を取得
     
     Args:
-        session: requests.Session オブジェクト
+        engine: scrapers.engine.FetchEngine
         work_id: 作品ID (例: "n2596la")
         initial_soup: 既に取得済みのBeautifulSoupオブジェクト（省略可）
     
@@ -100,18 +61,34 @@ def list_episodes_with_session(session, work_id: str, initial_soup: Optional[Bea
         Dict: エピソード一覧の辞書
     """
     try:
+        work_url = f"https://ncode.syosetu.com/{work_id}/"
         if initial_soup:
             # 既に取得済みのSoupを使用
             soup = initial_soup
         else:
             # 作品トップページを取得
-            work_url = f"https://ncode.syosetu.com/{work_id}/"
-            response = session.get(work_url, timeout=(5, 20))
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = await engine.get(work_url)
+            soup = parse_html(response.content, TOC_PARTS)
         
-        # エピソード一覧を抽出
+        # エピソード一覧を抽出（目次の1ページ目）
         episodes = _extract_episode_list(soup)
+
+        # 目次が複数ページ（?p=2 …）に分かれている場合は、残りのページを並行に取得して掲載順に連結する
+        last_page = _extract_last_page(soup, work_id)
+        if last_page > 1:
+            print(f"目次は {last_page} ページあります。残りのページを取得中...")
+
+            async def fetch_page(page: int) -> List[Dict]:
+                response = await engine.get(f"{work_url}?p={page}")
+                page_soup = await asyncio.to_thread(parse_html, response.content, TOC_PARTS)
+                return _extract_episode_list(page_soup)
+
+            async for page_episodes in engine.map_in_order(fetch_page, range(2, last_page + 1)):
+                episodes.extend(page_episodes)
+
+        # 同じエピソードが複数ページに現れても1件にまとめる（URL の話数で番号を振るため、掲載順は変わらない）
+        seen = set()
+        episodes = [ep for ep in episodes if not (ep['url'] in seen or seen.add(ep['url']))]
         
         return {
             'episodes': episodes
@@ -135,7 +112,7 @@ def _extract_episode_list(soup: BeautifulSoup) -> List[Dict]:
             # フォールバック：ページ全体からエピソードリンクを探す
             episode_links = soup.find_all('a', href=re.compile(r'/\d+/$'))
         
-        for i, link in enumerate(episode_links, 1):
+        for link in episode_links:
             href = link.get('href', '')
             title = link.get_text(strip=True)
             
@@ -150,17 +127,45 @@ def _extract_episode_list(soup: BeautifulSoup) -> List[Dict]:
                 
                 # 相対URLを絶対URLに変換
                 episode_url = urljoin("https://ncode.syosetu.com/", href)
-                episodes.append({
-                    'number': i,
+                episode = {
+                    # 目次のページをまたいでも変わらないよう、URL の話数を番号にする
+                    'number': int(re.search(r'/(\d+)/$', href).group(1)),
                     'title': title,
                     'url': episode_url
-                })
+                }
+                updated_at = _extract_updated_at(link)
+                if updated_at:
+                    episode['updated_at'] = updated_at
+                episodes.append(episode)
                 
     except Exception as e:
         print(f"エピソード一覧の取得でエラー: {e}")
         
     return episodes
 
+def _extract_last_page(soup: BeautifulSoup, work_id: str) -> int:
+    """目次のページャ（?p=N のリンク、「最後へ」を含む）から最終ページ番号を抽出。ページャが無ければ 1"""
+    pattern = re.compile(rf'/{re.escape(work_id)}/\?p=(\d+)', re.I)
+    pages = [int(m.group(1)) for a in soup.find_all('a', href=True) for m in [pattern.search(a['href'])] if m]
+    return max(pages, default=1)
+
+def _extract_updated_at(link) -> Optional[str]:
+    """
+    目次の項目から更新日時を抽出（改稿されていれば改稿日時、なければ掲載日時）
+    例: <div class="p-eplist__update">2024/01/01 12:00<span title="2024/02/01 09:00 改稿">（<u>改</u>）</span></div>
+    """
+    item = link.find_parent(class_=re.compile(r'p-eplist__sublist|novel_sublist2'))
+    if not item:
+        return None
+    update = item.find(class_=re.compile(r'p-eplist__update|long_update'))
+    if not update:
+        return None
+    revised = update.find('span', title=re.compile(r'改稿'))
+    if revised:
+        return revised['title'].replace('改稿', '').strip()
+    match = re.search(r'\d{4}/\d{2}/\d{2} \d{2}:\d{2}', update.get_text(' ', strip=True))
+    return match.group(0) if match else None
+
 if __name__ == "__main__":
     # テスト用
     import sys
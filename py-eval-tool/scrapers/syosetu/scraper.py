@@ -13,24 +13,37 @@ syosetu_scraper.py
     python scraper.py n2596la 5
 
 必要ライブラリ:
-    pip install requests beautifulsoup4 lxml
+    pip install httpx beautifulsoup4
 """
 
-import requests
 from bs4 import BeautifulSoup
+from collections import OrderedDict
 import json
 import re
-import time
-import random
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import os
 import sys
+import threading
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
-import math
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from scrapers.syosetu.list_episodes import list_episodes_with_session
+from scrapers.base import BaseScraper
+from scrapers.parsing import class_names, parse_html, strainer
+from scrapers.syosetu.list_episodes import list_episodes_with_engine
+
+# 作品ごとに覚えておく本文セレクタの数（古いものから捨てる）
+LEARNED_SELECTORS_MAX = 64
+
+# 本文の候補（_extract_episode_content の div#novel_honbun と、class が合う div / section）
+_CONTENT_ID = re.compile(r'novel_honbun', re.I)
+_CONTENT_CLASS = re.compile(r'(novel|honbun|text|body)', re.I)
+
+# エピソードページで使う要素（<title>・h1・本文の候補）だけを解析する
+EPISODE_PARTS = strainer(lambda name, attrs: name in ('title', 'h1') or (
+    name in ('div', 'section') and (
+        bool(_CONTENT_ID.search(attrs.get('id') or ''))
+        or any(_CONTENT_CLASS.search(c) for c in class_names(attrs))
+    )
+))
 
 def save_novel_json(data: Dict, work_id: str) -> str:
     """統合JSONをoutputフォルダに保存"""
@@ -47,84 +60,21 @@ def save_novel_json(data: Dict, work_id: str) -> str:
     print(f"統合JSONを {filename} に保存しました")
     return filename
 
-class SyosetuScraper:
-    def __init__(self):
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0 Safari/537.36'
-        ]
-        self.headers = {
-            'User-Agent': random.choice(self.user_agents),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ja,en-US;q=0.7,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
-        self._mount_retries(self.session)
-        self.request_count = 0
-        # クリーニング用の正規表現パターン（小説家になろう用）
-        self._bp_patterns: List[Tuple[str, re.Pattern]] = [
-            ("stars_request", re.compile(r"[★☆]{1,}|★で称える|評価(お願いします|ください)|レビュー(を|お願いします)")),
-            ("like_request", re.compile(r"♡|ハート|いいね|応援(しよう|お願いします|して|のお願い)")),
-            ("sns_promo", re.compile(r"SNS|Twitter|X\s*\(|フォロー|宣伝|読了報告")),
-            ("ranking", re.compile(r"(月間|週間|年間).{0,8}(ランキング|順位)|1位|上位|目標")),
-            ("thanks_request", re.compile(r"お礼とお願い|お願い|ギフト|切実")),
-            ("update_notice", re.compile(r"更新告知|次回更新|告知|予告")),
-            ("footer_heading", re.compile(r"^\s*[★☆]{4,}.*[★☆]{4,}\s*$")),
-            ("author_note", re.compile(r"作者のコメント|あとがき|作者より|お疲れ様でした")),
-            ("copyright_notice", re.compile(r"当サイトの内容、テキスト、画像等の無断転載・無断使用を固く禁じます|Unauthorized copying and replication of the contents of this site, text and images are strictly prohibited")),
-        ]
-    
-    def _mount_retries(self, session: requests.Session):
-        """セッションにリトライ設定を追加"""
-        retries = Retry(
-            total=3,
-            backoff_factor=1.2,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "OPTIONS"]
-        )
-        adapter = HTTPAdapter(max_retries=retries)
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
-    
-    def _get_random_delay(self, base_delay: float = 1.0) -> float:
-        """ランダムな待機時間を生成（人間らしいアクセスパターンを模倣）"""
-        return random.uniform(base_delay * 0.8, base_delay * 2.5)
-    
-    def _rotate_user_agent(self):
-        """User-Agentをランダムに切り替え"""
-        new_ua = random.choice(self.user_agents)
-        self.session.headers.update({'User-Agent': new_ua})
-        print(f"User-Agentを切り替えました: {new_ua[:50]}...")
-    
-    def _refresh_session_if_needed(self):
-        """必要に応じてセッションをリフレッシュ"""
-        if self.request_count > 0 and self.request_count % 20 == 0:
-            print("セッションをリフレッシュしています...")
-            self.session.close()
-            self.session = requests.Session()
-            self.session.headers.update(self.headers)
-            self._rotate_user_agent()
-            self._mount_retries(self.session)
-            time.sleep(self._get_random_delay(2.0))
-    
-    def _fetch_work_top_soup(self, work_id: str):
+class SyosetuScraper(BaseScraper):
+    site_name = 'syosetu'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 作品ID → 本文として採用した要素のセレクタ（novel_honbun が使えない作品で、候補の全探索を省く）
+        self._learned_selectors: OrderedDict = OrderedDict()
+        self._learned_lock = threading.Lock()
+        # 本文の抽出元ごとのエピソード数（_begin_crawl でリセット）
+        self.selector_stats: Dict[str, int] = {'primary': 0, 'learned': 0, 'scan': 0}
+
+    async def _fetch_work_top_soup(self, work_id: str):
         """作品トップページを取得して BeautifulSoup を返す"""
-        self.request_count += 1
-        self._refresh_session_if_needed()
-        
         work_url = f"https://ncode.syosetu.com/{work_id}/"
-        resp = self.session.get(work_url, timeout=(5, 20))
-        resp.raise_for_status()
-        return BeautifulSoup(resp.content, 'html.parser')
+        return await self.fetch_soup(work_url)
 
     def _extract_title(self, soup: BeautifulSoup) -> str:
         """作品タイトルを抽出"""
@@ -292,41 +242,38 @@ class SyosetuScraper:
         return ""
 
 
-    def scrape_episode(self, episode_url: str) -> Optional[Dict]:
+    def parse_episode(self, html: bytes, episode_url: str) -> Optional[Dict]:
         """エピソードページから本文を取得"""
-        try:
-            self.request_count += 1
-            self._refresh_session_if_needed()
-            
-            response = self.session.get(episode_url, timeout=(5, 20))
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
+        work_id = urlparse(episode_url).path.strip('/').split('/')[0]
+
+        # 本文・タイトルの要素だけを解析し、本文が見つからなければページ全体を解析し直す
+        for only in (EPISODE_PARTS, None):
+            soup = parse_html(html, only)
+
             # エピソードタイトルを抽出
             episode_title = self._extract_episode_title(soup)
-            
+
             # エピソード本文を抽出
-            content = self._extract_episode_content(soup)
-            
-            if not content:
-                print(f"警告: エピソードの本文が取得できませんでした: {episode_url}")
-                return None
-            
-            # 本文をクリーニング
-            cleaned_content, removed_categories = self._clean_episode_text(content)
-            
-            return {
-                'episode_title': episode_title,
-                'content': cleaned_content,
-                'url': episode_url,
-                'scraped_at': datetime.now().isoformat(),
-                'removed_categories': removed_categories
-            }
-            
-        except Exception as e:
-            print(f"エピソード取得でエラー: {e}")
+            content, content_source = self._extract_episode_content(soup, work_id)
+            if content:
+                break
+
+        if not content:
+            print(f"警告: エピソードの本文が取得できませんでした: {episode_url}")
             return None
 
+        # 本文をクリーニング
+        cleaned_content, removed_categories = self._clean_episode_text(content)
+
+        return {
+            'episode_title': episode_title,
+            'content': cleaned_content,
+            'url': episode_url,
+            'scraped_at': datetime.now().isoformat(),
+            'removed_categories': removed_categories,
+            'content_source': content_source,
+        }
+
     def _extract_episode_title(self, soup: BeautifulSoup) -> str:
         """エピソードタイトルを抽出"""
         try:
@@ -349,8 +296,11 @@ class SyosetuScraper:
             pass
         return "エピソードタイトル不明"
 
-    def _extract_episode_content(self, soup: BeautifulSoup) -> str:
-        """エピソード本文を抽出（novel_honbun優先、改行保持）"""
+    def _extract_episode_content(self, soup: BeautifulSoup, work_id: str = '') -> Tuple[str, str]:
+        """
+        エピソード本文を抽出（novel_honbun優先、改行保持）。(本文, 抽出元) を返す。
+        抽出元は 'primary'（div#novel_honbun）、'learned'（作品ごとに学習したセレクタ）、'scan'（候補の全探索）。
+        """
 
         def normalize_node(node) -> str:
             try:
@@ -378,7 +328,18 @@ class SyosetuScraper:
             if primary:
                 text = normalize_node(primary)
                 if is_usable(text):
-                    return text
+                    return text, 'primary'
+
+            # 同じ作品の前のエピソードで本文だった要素のセレクタを先に試す
+            selector = self._learned_selectors.get(work_id)
+            if selector is not None:
+                best_text = ''
+                for node in self._select_learned(soup, selector):
+                    text = normalize_node(node)
+                    if len(text) > len(best_text):
+                        best_text = text
+                if is_usable(best_text):
+                    return best_text, 'learned'
 
             candidates = [
                 ('div', {'id': re.compile(r'novel_honbun', re.I)}),
@@ -387,6 +348,7 @@ class SyosetuScraper:
             ]
 
             best_text = ''
+            best_node = None
             for tag, attrs in candidates:
                 nodes = soup.find_all(tag, attrs=attrs)
                 for node in nodes:
@@ -395,354 +357,93 @@ class SyosetuScraper:
                         continue
                     if len(text) > len(best_text):
                         best_text = text
-            return best_text
+                        best_node = node
+            if best_node is not None and is_usable(best_text):
+                self._learn_selector(work_id, best_node)
+            return best_text, 'scan'
         except Exception:
-            return ""
-
-    def _clean_episode_text(self, text: str) -> Tuple[str, List[str]]:
-        """エピソード本文からノイズを除去し、除去カテゴリを返す"""
-        if not text:
-            return text, []
-
-        normalized = re.sub(r"\r\n?", "\n", text).strip()
-        if not normalized:
-            return "", []
-
-        original_len = len(normalized)
-        MIN_CHARS = 600
-        MIN_RATIO = 0.6
-
-        def perform_cleaning(strict: bool) -> Tuple[str, List[str]]:
-            removed: List[str] = []
-            cleaned_lines: List[str] = []
-            lines = [ln for ln in re.split(r"\n+", normalized) if ln is not None]
-            total = len(lines)
-            for idx, ln in enumerate(lines):
-                hit: List[str] = []
-                for cat, pat in self._bp_patterns:
-                    if pat.search(ln):
-                        hit.append(cat)
-
-                strong = any(cat in ("footer_heading", "copyright_notice") for cat in hit)
-                if strict:
-                    is_edge = (idx < 3) or (total - idx <= 3)
-                    should_remove = strong or (is_edge and hit) or (len(hit) >= 2)
-                else:
-                    should_remove = strong
-
-                if should_remove:
-                    removed.extend(hit if hit else ["misc"])
-                    continue
-                cleaned_lines.append(ln)
-
-            cleaned_text = "\n\n".join(cleaned_lines).strip()
-            cleaned_text = re.sub(r"\n{3,}", "\n\n", cleaned_text)
-            return cleaned_text, sorted(set(removed))
-
-        def is_sufficient(cleaned_text: str) -> bool:
-            cleaned_len = len(cleaned_text)
-            if cleaned_len == 0:
-                return False
-            if original_len >= MIN_CHARS and cleaned_len < MIN_CHARS:
-                return False
-            if cleaned_len < int(original_len * MIN_RATIO):
-                return False
-            return True
-
-        strict_cleaned, strict_removed = perform_cleaning(strict=True)
-        if is_sufficient(strict_cleaned):
-            return strict_cleaned, strict_removed
-
-        strong_cleaned, strong_removed = perform_cleaning(strict=False)
-        if is_sufficient(strong_cleaned):
-            return strong_cleaned, strong_removed
-
-        fallback_text = re.sub(r"\n{3,}", "\n\n", normalized)
-        return fallback_text, []
-
-    def _build_analysis_slices(self, episodes: List[Dict]) -> Dict:
-        """analysis_scope.slices を構築。
-        目安: 各1800字。ep1=hook、中間=turning_point、最終=payoff。
-        """
-        n = len(episodes)
-        if n == 0:
-            return { 'episodes_included': [], 'slices': [] }
-
-        TARGET_SIZE = 1800
-        MIN_EP_LENGTH = 1500
-
-        def normalize_text(value: str) -> str:
-            if not value:
-                return ''
-            text = re.sub(r"\r\n?", "\n", value)
-            text = re.sub(r"\n{3,}", "\n\n", text.strip())
-            return text
+            return "", 'scan'
 
-        def get_episode_text(idx: int) -> str:
-            if idx < 0 or idx >= n:
-                return ''
-            return normalize_text(episodes[idx].get('text', '') or '')
-
-        def base_indices() -> List[int]:
-            if n >= 10:
-                indices = [0, 4, 9]
-            else:
-                mid = max(0, math.ceil(n / 2) - 1)
-                indices = [0, mid, n - 1]
-            while len(indices) < 3:
-                indices.append(indices[-1])
-            return indices[:3]
-
-        def search_nearest(start_idx: int, avoid_used: bool, min_length: int) -> Optional[int]:
-            offsets = [0]
-            for step in range(1, n):
-                offsets.extend([step, -step])
-
-            best_idx = None
-            best_len = -1
-            for offset in offsets:
-                candidate = start_idx + offset
-                if candidate < 0 or candidate >= n:
-                    continue
-                if avoid_used and candidate in selected_indices:
-                    continue
-                text = get_episode_text(candidate)
-                text_len = len(text)
-                if text_len == 0:
-                    continue
-                if text_len >= min_length:
-                    return candidate
-                if text_len > best_len:
-                    best_len = text_len
-                    best_idx = candidate
-            return best_idx
-
-        def pick_episode(start_idx: int) -> int:
-            attempts = [
-                (True, MIN_EP_LENGTH),      # 1. 未使用で十分な長さ
-                (False, MIN_EP_LENGTH),     # 2. 重複許容だが十分な長さ
-                (False, 1),                 # 3. 最長のもの
-            ]
-            for avoid_used, min_len in attempts:
-                candidate = search_nearest(start_idx, avoid_used=avoid_used, min_length=min_len)
-                if candidate is not None:
-                    return candidate
-            return max(0, min(start_idx, n - 1))
-
-        def extract_chunk(text: str, position: int) -> str:
-            if not text:
-                return ''
-            if len(text) <= TARGET_SIZE:
-                return text
-            if position == 0:
-                start = 0
-            elif position == 1:
-                mid = len(text) // 2
-                start = max(0, min(mid - TARGET_SIZE // 2, len(text) - TARGET_SIZE))
-            else:
-                start = len(text) - TARGET_SIZE
-            end = start + TARGET_SIZE
-            return text[start:end]
-
-        SLICE_MIN = 1500
-        kinds_map = {0: 'hook', 1: 'turning_point', 2: 'payoff'}
-        selected_indices: List[int] = []
-        slices: List[Dict] = []
-        episode_lengths = [len(get_episode_text(idx)) for idx in range(n)]
-        sorted_by_length = sorted(range(n), key=lambda i: episode_lengths[i], reverse=True)
-
-        def choose_fallback(original_idx: int, position: int) -> int:
-            # 1) 未使用かつ十分な長さ
-            for idx in sorted_by_length:
-                if idx == original_idx or idx in selected_indices:
-                    continue
-                if episode_lengths[idx] >= SLICE_MIN:
-                    return idx
-            # 2) 既使用でも十分な長さ
-            for idx in sorted_by_length:
-                if idx == original_idx:
-                    continue
-                if episode_lengths[idx] >= SLICE_MIN:
-                    return idx
-            # 3) 最長（既使用含む）
-            for idx in sorted_by_length:
-                if episode_lengths[idx] > 0:
-                    return idx
-            return original_idx
-
-        for position, base_idx in enumerate(base_indices()):
-            chosen_idx = pick_episode(base_idx)
-            text = get_episode_text(chosen_idx)
-            chunk = extract_chunk(text, position)
-
-            if len(chunk) < SLICE_MIN:
-                fallback_idx = choose_fallback(chosen_idx, position)
-                if fallback_idx != chosen_idx:
-                    chosen_idx = fallback_idx
-                    text = get_episode_text(chosen_idx)
-                    chunk = extract_chunk(text, position)
-
-            if not chunk:
-                fallback_idx = choose_fallback(chosen_idx, position)
-                chosen_idx = fallback_idx
-                text = get_episode_text(chosen_idx)
-                chunk = extract_chunk(text, position)
-
-            selected_indices.append(chosen_idx)
-            ep_number = episodes[chosen_idx].get('number', chosen_idx + 1)
-            slices.append({
-                'ep': ep_number,
-                'kind': kinds_map.get(position, 'slice'),
-                'text': chunk
-            })
-
-        episodes_included: List[int] = []
-        for idx in selected_indices:
-            ep_number = episodes[idx].get('number', idx + 1)
-            if ep_number not in episodes_included:
-                episodes_included.append(ep_number)
-
-        return { 'episodes_included': episodes_included, 'slices': slices }
-
-    def _compute_metrics(self, episodes: List[Dict]) -> Dict:
-        """軽量メトリクスを算出。"""
-        texts = [ep.get('text', '') for ep in episodes if ep.get('text')]
-        all_text = "\n\n".join(texts)
-        total_chars = sum(len(t) for t in texts)
-        n = len(texts)
-        if total_chars == 0:
-            return { 'total_chars': 0, 'avg_chars_per_episode': 0.0, 'dialogue_ratio': 0.0, 'unique_trigram_ratio': 0.0, 'mean_sentence_len': 0.0 }
-
-        # 会話文割合
-        dialogue_matches = re.findall(r'「[^」]*」', all_text)
-        dialogue_len = sum(len(m) for m in dialogue_matches)
-        dialogue_ratio = float(dialogue_len) / float(total_chars) if total_chars else 0.0
-
-        # ユニーク3-gram率
-        grams = [all_text[i:i+3] for i in range(max(0, total_chars - 2))]
-        unique_trigram_ratio = (len(set(grams)) / len(grams)) if grams else 0.0
-
-        # 平均文長
-        sentences = re.split(r'[。！？!?]', all_text)
-        sentence_lengths = [len(s) for s in sentences if s and s.strip()]
-        mean_sentence_len = (sum(sentence_lengths) / len(sentence_lengths)) if sentence_lengths else 0.0
-
-        return {
-            'total_chars': total_chars,
-            'avg_chars_per_episode': round(total_chars / n, 2) if n else 0.0,
-            'dialogue_ratio': round(dialogue_ratio, 6),
-            'unique_trigram_ratio': round(unique_trigram_ratio, 6),
-            'mean_sentence_len': round(mean_sentence_len, 2)
+    def _learn_selector(self, work_id: str, node) -> None:
+        """本文として採用した要素のセレクタ（タグ名と id、または class の組）を作品ごとに覚える"""
+        if not work_id:
+            return
+        if node.get('id'):
+            selector = (node.name, 'id', node['id'])
+        else:
+            selector = (node.name, 'class', tuple(node.get('class') or ()))
+        # 解析はワーカースレッドで並行に行われることがある
+        with self._learned_lock:
+            self._learned_selectors[work_id] = selector
+            self._learned_selectors.move_to_end(work_id)
+            while len(self._learned_selectors) > LEARNED_SELECTORS_MAX:
+                self._learned_selectors.popitem(last=False)
+
+    @staticmethod
+    def _select_learned(soup: BeautifulSoup, selector: Tuple[str, str, object]) -> List:
+        """学習したセレクタに一致する要素（class は過不足なく一致するもの）"""
+        name, attr, value = selector
+        if attr == 'id':
+            return soup.find_all(name, id=value)
+        if not value:
+            return []
+        return [node for node in soup.find_all(name, class_=value[0]) if tuple(node.get('class') or ()) == value]
+
+    def _on_episode_parsed(self, data: Dict) -> None:
+        source = data.get('content_source')
+        if source in self.selector_stats:
+            self.selector_stats[source] += 1
+
+    def _begin_crawl(self) -> None:
+        super()._begin_crawl()
+        self.selector_stats = {'primary': 0, 'learned': 0, 'scan': 0}
+
+    async def _finish_crawl(self) -> None:
+        await super()._finish_crawl()
+        stats = self.selector_stats
+        lookups = stats['learned'] + stats['scan']
+        if lookups:
+            print(f"本文セレクタ: novel_honbun {stats['primary']} / 学習済み {stats['learned']} / 全探索 {stats['scan']}"
+                  f"（ヒット率 {stats['learned'] / lookups:.0%}）")
+
+    async def fetch_work_index(self, work_id: str):
+        """作品トップから基本情報とエピソード一覧を取得"""
+        print(f"作品ID {work_id} の基本情報を取得中...", flush=True)
+
+        # 作品トップページを取得
+        top_soup = await self._fetch_work_top_soup(work_id)
+
+        # 基本情報を抽出
+        title = self._extract_title(top_soup)
+        author = self._extract_author(top_soup)
+        overview_title = self._extract_overview_title(top_soup)
+        overview_description = self._extract_overview_description(top_soup)
+
+        # エピソード一覧を取得（モジュールを使用）
+        episodes_data = await list_episodes_with_engine(self.engine, work_id, initial_soup=top_soup)
+        episodes = episodes_data['episodes']
+
+        print(f"基本情報取得完了:")
+        print(f"  タイトル: {title}")
+        print(f"  作者: {author}")
+        print(f"  総エピソード数: {len(episodes)}")
+        clean_overview_title = (overview_title or '').strip()
+        clean_overview_desc = (overview_description or '').strip()
+        if clean_overview_title:
+            print(f"  概要タイトル: {clean_overview_title}")
+        print(f"  概要説明: {clean_overview_desc[:100]}..." if clean_overview_desc else "  概要説明: なし")
+
+        work_info = {
+            'title': title,
+            'author': author,
+            'work_url': f"https://ncode.syosetu.com/{work_id}/",
+            'overview': {
+                'title': clean_overview_title,
+                'description': clean_overview_desc,
+                'length': len(clean_overview_desc)
+            },
         }
-
-    def extract_novel_data(self, work_id: str, limit: Optional[int] = None) -> Optional[Dict]:
-        """作品IDから統合JSONデータを抽出（エピソード本文も含む）"""
-        try:
-            print(f"作品ID {work_id} の基本情報を取得中...", flush=True)
-            
-            # 作品トップページを取得
-            top_soup = self._fetch_work_top_soup(work_id)
-            
-            
-            # 基本情報を抽出
-            title = self._extract_title(top_soup)
-            author = self._extract_author(top_soup)
-            overview_title = self._extract_overview_title(top_soup)
-            overview_description = self._extract_overview_description(top_soup)
-            
-            # エピソード一覧を取得（モジュールを使用）
-            episodes_data = list_episodes_with_session(self.session, work_id, initial_soup=top_soup)
-            episodes = episodes_data['episodes']
-            total_episodes = len(episodes)
-            
-            
-            print(f"基本情報取得完了:")
-            print(f"  タイトル: {title}")
-            print(f"  作者: {author}")
-            print(f"  総エピソード数: {total_episodes}")
-            clean_overview_title = (overview_title or '').strip()
-            clean_overview_desc = (overview_description or '').strip()
-            if clean_overview_title:
-                print(f"  概要タイトル: {clean_overview_title}")
-            print(f"  概要説明: {clean_overview_desc[:100]}..." if clean_overview_desc else "  概要説明: なし")
-            
-            # エピソード数チェック
-            if limit and limit > total_episodes:
-                print(f"エラー: 指定されたエピソード数({limit})が総エピソード数({total_episodes})を超えています", file=sys.stderr)
-                return None
-            
-            # 制限適用
-            if limit:
-                episodes = episodes[:limit]
-                print(f"話数制限: {limit}話まで取得します")
-            
-            # エピソード本文を取得
-            scraped_episodes: List[Dict] = []
-            removed_categories_aggregate: Dict[str, int] = {}
-            
-            for i, episode in enumerate(episodes, 1):
-                print(f"[{i}/{len(episodes)}] エピソードを処理中: {episode['title']}")
-                episode_data = self.scrape_episode(episode['url'])
-                if episode_data:
-                    # 除去されたカテゴリを集計
-                    for cat in episode_data.get('removed_categories', []):
-                        removed_categories_aggregate[cat] = removed_categories_aggregate.get(cat, 0) + 1
-                    
-                    scraped_episodes.append({
-                        'number': i,
-                        'title': episode_data['episode_title'],
-                        'url': episode['url'],
-                        'text': episode_data['content'],
-                        'length': len(episode_data['content'])
-                    })
-                else:
-                    print(f"警告: エピソード {i} の取得に失敗しました")
-                
-                # ランダムな待機時間
-                delay = self._get_random_delay(1.0)
-                print(f"待機中... {delay:.1f}秒")
-                time.sleep(delay)
-            
-            if not scraped_episodes:
-                print("エラー: 取得できたエピソードがありません", file=sys.stderr)
-                return None
-            
-            # analysis_scope の生成
-            analysis_scope = self._build_analysis_slices(scraped_episodes)
-
-            # metrics の算出
-            metrics = self._compute_metrics(scraped_episodes)
-
-            summary_title = (overview_title or '').strip()
-            summary_description = (overview_description or '').strip()
-            overview = {
-                'title': summary_title,
-                'description': summary_description,
-                'length': len(summary_description)
-            }
-
-            # 統合JSONを構築
-            result = {
-                'title': title,
-                'author': author,
-                'work_url': f"https://ncode.syosetu.com/{work_id}/",
-                'overview': overview,
-                'total_episodes': total_episodes,
-                'scraped_episodes': len(scraped_episodes),
-                'episodes': scraped_episodes,
-                'analysis_scope': analysis_scope,
-                'cleaning': {
-                    'removed_boilerplates': bool(removed_categories_aggregate),
-                    'notes': [f"removed: {cat} ({cnt})" for cat, cnt in sorted(removed_categories_aggregate.items(), key=lambda x: (-x[1], x[0]))]
-                },
-                'site': {'name': 'syosetu'},
-                'metrics': metrics
-            }
-            return result
-            
-        except Exception as e:
-            print(f"エラー: 統合データの取得に失敗しました - {e}", file=sys.stderr)
-            return None
+        return work_info, episodes
 
 def print_novel_summary(data: dict) -> None:
     """統合JSONのサマリーを表示"""
@@ -0,0 +1,124 @@
+"""
+summaries.py
+エピソード要約キャッシュ
+
+各エピソードを安価なモデルで一度だけ要約し、本文・要約モデル・要約プロンプトの版から求めたハッシュをキーに保存します。
+評価モデルや評価プロンプトはキーに含まないため、それらを変えても、再評価でも要約を再利用できます。
+要約モデル（SUMMARY_AGENT と *_MODEL）や要約プロンプト（prompts.EPISODE_SUMMARY_PROMPT_VERSION）を変えた場合は要約し直します。
+長大な作品や、コンテキストの小さいモデル（phi など）で本文の代わりに要約を評価に使います。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import prompts
+from llm import LOCAL, LLMAgent, model_name
+
+SUMMARY_CACHE_DIR = Path(__file__).resolve().parent.parent / "storage" / "summaries"
+SUMMARY_CONCURRENCY = 4
+
+
+def summary_key(text: str, agent: str, model: str, prompt_version: int = prompts.EPISODE_SUMMARY_PROMPT_VERSION) -> str:
+    """要約キャッシュのキー（本文・要約モデル・要約プロンプトの版の SHA-256）"""
+    header = f"{agent}\n{model}\nv{prompt_version}\n"
+    return hashlib.sha256((header + text).encode("utf-8")).hexdigest()
+
+
+class EpisodeSummarizer:
+    """エピソード要約の生成とキャッシュ"""
+
+    def __init__(self, agent: Optional[str] = None, cache_dir: Path = SUMMARY_CACHE_DIR, concurrency: int = SUMMARY_CONCURRENCY):
+        self.agent = agent or os.environ.get("SUMMARY_AGENT", LOCAL)
+        self.model = model_name(self.agent)
+        self.cache_dir = cache_dir
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 同じ本文の要約を同時に二重生成しない
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.stats = {"cached": 0, "generated": 0}
+
+    def _cache_path(self, digest: str) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}.json"
+
+    def load(self, digest: str) -> Optional[str]:
+        path = self._cache_path(digest)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))["summary"]
+        except (ValueError, KeyError):
+            return None
+
+    def store(self, digest: str, summary: str) -> None:
+        path = self._cache_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "hash": digest,
+            "summary": summary,
+            "agent": self.agent,
+            "model": self.model,
+            "prompt_version": prompts.EPISODE_SUMMARY_PROMPT_VERSION,
+            "created_at": datetime.now().isoformat(),
+        }
+        # 途中で中断されても壊れたキャッシュを残さない
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def _limiter(self) -> asyncio.Semaphore:
+        # 作品ごとに asyncio.run される場合があるため、イベントループ単位で作り直す
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._inflight = {}
+        return self._semaphore
+
+    async def _generate(self, digest: str, episode: dict) -> str:
+        async with self._limiter():
+            prompt = (
+                prompts.EPISODE_SUMMARY_USER_PROMPT
+                .replace("{episode_title}", episode.get("title", ""))
+                .replace("{episode_text}", episode["text"])
+            )
+            messages = [{"role": "user", "content": prompt}]
+            summary = (await LLMAgent(self.agent).call(messages)).strip()
+        if not summary:
+            raise RuntimeError(f"エピソード要約が空でした: {episode.get('title', '')}")
+        self.store(digest, summary)
+        self.stats["generated"] += 1
+        return summary
+
+    async def summarize_text(self, episode: dict) -> str:
+        """エピソードの要約を返す（キャッシュがあれば API を呼ばない）"""
+        digest = summary_key(episode["text"], self.agent, self.model)
+        cached = self.load(digest)
+        if cached is not None:
+            self.stats["cached"] += 1
+            return cached
+        self._limiter()
+        task = self._inflight.get(digest)
+        if task is None:
+            task = asyncio.ensure_future(self._generate(digest, episode))
+            self._inflight[digest] = task
+        try:
+            return await task
+        finally:
+            self._inflight.pop(digest, None)
+
+    async def summarize_episode(self, episode: dict) -> dict:
+        """本文を要約に置き換えたエピソードを返す"""
+        summary = await self.summarize_text(episode)
+        return {**episode, "text": summary, "length": episode.get("length", len(episode["text"]))}
+
+    async def summarize_novel(self, novel_json: dict) -> dict:
+        """全エピソードの本文を要約に置き換えた作品データを返す"""
+        episodes = await asyncio.gather(*(self.summarize_episode(ep) for ep in novel_json["episodes"]))
+        print(f"[SUMMARY] キャッシュ {self.stats['cached']} 件 / 新規生成 {self.stats['generated']} 件")
+        return {**novel_json, "episodes": list(episodes), "episode_text": "summary"}
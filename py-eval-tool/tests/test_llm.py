@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_llm.py
+コンテキスト長超過エラーの判定（llm.is_context_length_error）のテスト
+
+使用方法（py-eval-tool ディレクトリで実行）:
+    python -m pytest -q
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+import llm
+from llm import ContextLengthError, LLMAgent, is_context_length_error
+
+
+@pytest.mark.parametrize("status_code, message", [
+    (400, "This model's maximum context length is 8192 tokens. However, your messages resulted in 9000 tokens."),
+    (400, '{"error": {"code": "context_length_exceeded"}}'),
+    (400, "prompt is too long: 210000 tokens > 200000 maximum"),
+    (422, "Input validation error: `inputs` tokens + `max_new_tokens` must be <= 4096. Given: 4000 `inputs` tokens and 512 `max_new_tokens`"),
+    (400, "the request exceeds the available context size, try increasing it"),
+    (413, "<html>Request Entity Too Large</html>"),
+])
+def test_context_length_errors(status_code, message):
+    assert is_context_length_error(status_code, message)
+
+
+@pytest.mark.parametrize("status_code, message", [
+    (400, "Invalid value for 'temperature': temperature must be <= 2"),
+    (422, "Input validation error: `max_new_tokens` must be <= 2048"),
+    (400, "max_tokens: too many tokens requested for this model, must be between 1 and 4096"),
+    (400, "Invalid 'context window' parameter"),
+    (500, "maximum context length"),
+])
+def test_other_errors_are_not_context_length(status_code, message):
+    assert not is_context_length_error(status_code, message)
+
+
+def test_parameter_validation_400_raises_http_error(monkeypatch):
+    """コンテキスト長以外の 400 は ContextLengthError にせず、従来どおり HTTP エラーとして送出する"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": {"message": "temperature must be <= 2"}})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(llm.httpx, "AsyncClient", lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs))
+    agent = LLMAgent.__new__(LLMAgent)
+    with pytest.raises(httpx.HTTPStatusError) as excinfo:
+        asyncio.run(agent._call_api("http://llm.test/v1/chat/completions", {}, {"messages": []}))
+    assert not isinstance(excinfo.value, ContextLengthError)
+    assert excinfo.value.response.status_code == 400
+    assert len(calls) == 1